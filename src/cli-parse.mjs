@@ -4,6 +4,8 @@ export function parseOptions(args) {
     const arg = args[i];
     if (arg === "--after-line" && args[i + 1]) {
       options.after_line = parseInt(args[++i], 10);
+    } else if (arg === "--last" && args[i + 1]) {
+      options.last = parseInt(args[++i], 10);
     } else if (arg === "--before-line" && args[i + 1]) {
       options.before_line = parseInt(args[++i], 10);
     } else if (arg === "--start-date" && args[i + 1]) {
@@ -22,12 +24,55 @@ export function parseOptions(args) {
       options.debug = true;
     } else if (arg === "--no-save") {
       options.save = false;
+    } else if (arg === "--cursor" && args[i + 1]) {
+      options.cursor = args[++i];
+    } else if (arg === "--since" && args[i + 1]) {
+      options.since = args[++i];
+    } else if (arg === "--client" && args[i + 1]) {
+      options.client = args[++i];
+    } else if (arg === "--no-count") {
+      options.count = false;
+    } else if (arg === "--no-index") {
+      options.index = false;
     } else if (arg === "--full") {
       options.full = true;
     } else if (arg === "--viewport") {
       options.viewport = true;
     } else if (arg === "--errors") {
       options.errors = true;
+    } else if (arg === "--grep" && args[i + 1]) {
+      // 可重复指定，一次读取同时搜索
+      options.grep = [...(options.grep || []), args[++i]];
+    } else if (arg === "--collapse") {
+      options.collapse = true;
+    } else if (arg === "--max-line-length" && args[i + 1]) {
+      options.max_line_length = parseInt(args[++i], 10);
+    } else if (arg === "--sample" && args[i + 1]) {
+      options.sample = parseInt(args[++i], 10);
+    } else if (arg === "--sessions") {
+      options.sessions = true;
+    } else if (arg === "--session" && args[i + 1]) {
+      const value = args[++i];
+      options.session = /^\d+$/.test(value) ? parseInt(value, 10) : value;
+    } else if (arg === "--stats") {
+      options.stats = true;
+    } else if (arg === "--group") {
+      options.group = true;
+    } else if (arg === "--by-script") {
+      options.by_script = true;
+    } else if (arg === "--follow") {
+      options.follow = true;
+    } else if (arg === "--filter-config" && args[i + 1]) {
+      options.filter_config = args[++i];
+    } else if (arg === "--filter-stats") {
+      options.filter_stats = true;
+    } else if (arg === "--days" && args[i + 1]) {
+      options.days = parseInt(args[++i], 10);
+    } else if (arg === "--max-results" && args[i + 1]) {
+      options.max_results = parseInt(args[++i], 10);
+    } else if (arg === "--parallel") {
+      // 线程数可省略
+      options.parallel = /^\d+$/.test(args[i + 1] || "") ? parseInt(args[++i], 10) : true;
     } else if (arg === "--duration" && args[i + 1]) {
       options.duration = parseInt(args[++i], 10);
     } else if (arg === "--fps" && args[i + 1]) {
@@ -39,6 +84,18 @@ export function parseOptions(args) {
   return options;
 }
 
+// log --grep 只返回搜索结果：输出整形选项（只作用于普通日志输出）与之同时出现时报错，而不是静默忽略
+const GREP_EXCLUSIVE_OPTIONS = { last: "--last", collapse: "--collapse", max_line_length: "--max-line-length", sample: "--sample" };
+
+// 返回 log 命令选项的冲突说明，没有冲突时返回 null
+export function findLogOptionConflict(options) {
+  if (!options.grep) return null;
+  const flags = Object.keys(GREP_EXCLUSIVE_OPTIONS)
+    .filter((key) => options[key] != null && options[key] !== false)
+    .map((key) => GREP_EXCLUSIVE_OPTIONS[key]);
+  return flags.length > 0 ? `--grep 不能与 ${flags.join("、")} 同时使用` : null;
+}
+
 export function getCommandExamples(command) {
   const p = '"D:/project/game.rbxl"';
   const exampleMap = {
@@ -50,7 +107,8 @@ export function getCommandExamples(command) {
     status: `  rspo status ${p}\n\n  Output: { "active": true, "ready": true, "pid": 12345, "hwnd": 67890, "has_modal": false, "log_path": "..." }`,
     modal: `  rspo modal ${p}\n  rspo modal ${p} --close`,
     game: `  rspo game start ${p}\n  rspo game stop ${p}\n  rspo game pause ${p}`,
-    log: `  rspo log ${p}\n  rspo log ${p} --after-line 100 --timestamps\n  rspo log ${p} --errors`,
+    log: `  rspo log ${p}\n  rspo log ${p} --last 50\n  rspo log ${p} --stats\n  rspo log ${p} --sessions\n  rspo log ${p} --collapse --max-line-length 300\n  rspo log ${p} --session last --errors\n  rspo log ${p} --grep "attempt to index" --grep "timeout"\n  rspo log ${p} --after-line 100 --timestamps\n  rspo log ${p} --no-count --cursor <上次结果中的 cursor>\n  rspo log ${p} --since last --client my-agent\n  rspo log ${p} --errors\n  rspo log ${p} --errors --group\n  rspo log ${p} --errors --by-script\n  rspo log ${p} --follow\n  rspo log ${p} --filter-stats\n  rspo log ${p} --errors --parallel 4`,
+    logs: `  rspo logs search "attempt to index nil"\n  rspo logs search "DataStore" --days 3 --context play\n  rspo logs errors --days 7\n\n  Output (NDJSON): { "file": "..._Studio_....log", "session": { "place": "D:/project/game.rbxl", "started": "..." }, "line": 1234, "timestamp": "...", "context": "play", "message": "..." }\n  最后一行: { "summary": { "files": 12, "matchedFiles": 3, "matches": 41 } }`,
     screenshot: `  rspo screenshot ${p}\n  rspo screenshot ${p} my_screenshot.png\n  rspo screenshot ${p} --normal\n  rspo screenshot ${p} --full`,
     toolbar: `  rspo toolbar ${p}\n\n  Output: { "play": "enabled", "pause": "disabled", "stop": "disabled", "game_state": "stopped" }\n\n  rspo toolbar ${p} --debug`,
     save: `  rspo save ${p}`,
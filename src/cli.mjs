@@ -1,13 +1,23 @@
 #!/usr/bin/env node
 
-import { readFileSync, existsSync } from "node:fs";
 import { join } from "node:path";
 import {
   getLogsFromLine,
   findErrors,
+  getLogStats,
+  getLogLastLine,
+  searchLogsFromLine,
+  listPlaySessions,
+  resolvePlaySession,
 } from "./log-utils.mjs";
+import { followLog } from "./log-follow.mjs";
+import { queryFromNamedCursor } from "./log-cursors.mjs";
+import { findErrorsParallel, searchLogsParallel } from "./log-parallel.mjs";
+import { searchAllLogs, findErrorsAllLogs } from "./log-archive.mjs";
+import { searchLogsIndexed } from "./log-index.mjs";
+import { loadFilterRules, findFilterConfig } from "./log-filter.mjs";
 import { detectToolbarState } from "./toolbar-detector.mjs";
-import { parseOptions, getCommandExamples } from "./cli-parse.mjs";
+import { parseOptions, getCommandExamples, findLogOptionConflict } from "./cli-parse.mjs";
 import { ensureScreenshotDir, recordViewport } from "./screenshot-utils.mjs";
 
 let platform;
@@ -75,12 +85,6 @@ async function status(placePath) {
   const modals = p.getModalWindows(session.hwnd, session.pid);
   const hasModal = modals.length > 0;
 
-  let logLastLine = 0;
-  if (session.logPath && existsSync(session.logPath)) {
-    const content = readFileSync(session.logPath, "utf-8");
-    logLastLine = content.split("\n").length;
-  }
-
   return {
     active: true,
     ready: !hasModal,
@@ -88,7 +92,7 @@ async function status(placePath) {
     pid: session.pid,
     hwnd: session.hwnd,
     log_path: session.logPath,
-    log_last_line: logLastLine,
+    log_last_line: getLogLastLine(session.logPath),
     has_modal: hasModal,
     modal_count: modals.length,
     modals: modals.map((m) => ({
@@ -147,28 +151,162 @@ async function game(placePath, action) {
 }
 
 async function log(placePath, options = {}) {
+  const conflict = findLogOptionConflict(options);
+  if (conflict) return { error: conflict };
+
   const sm = await getStudioManager();
   const [ok, msg, session] = await sm.getSession(placePath);
   if (!ok) return { error: msg };
 
+  let filterRules;
+  try {
+    filterRules = loadFilterRules(options.filter_config || findFilterConfig(placePath));
+  } catch (e) {
+    return { error: e.message };
+  }
+
+  if (options.sessions) return listPlaySessions(session.logPath, { filterRules });
+
+  // --session N|last: 只读取该次试玩的范围（从其起点 seek，到结束行为止）
+  let play = null;
+  if (options.session != null) {
+    play = resolvePlaySession(session.logPath, options.session);
+    if (play.error) return { error: play.error };
+  }
+  const playEnd = play && play.beforeLine !== null && !(options.before_line < play.beforeLine);
+
   const logOpts = {
     afterLine: options.after_line,
-    beforeLine: options.before_line,
+    beforeLine: playEnd ? play.beforeLine : options.before_line,
     startDate: options.start_date,
     endDate: options.end_date,
     timestamps: options.timestamps,
     runContext: options.context,
     includeContext: true,
+    filterRules,
+    filterStats: options.filter_stats,
+    cursor: options.cursor,
+    count: options.count,
   };
 
-  if (options.errors) {
-    return findErrors(session.logPath, {
-      ...logOpts,
-      maxErrors: options.max_errors || 100,
+  if (options.stats) {
+    const { beforeLine, startDate, endDate } = logOpts;
+    const afterLine = play ? Math.max(logOpts.afterLine ?? 0, play.session.startLine - 1) : logOpts.afterLine;
+    return withPlaySession(getLogStats(session.logPath, { afterLine, beforeLine, startDate, endDate, filterRules }), play);
+  }
+
+  const query = (cursor) => {
+    const opts = { ...logOpts, cursor: cursor ?? play?.cursor };
+    if (options.grep) {
+      const pattern = options.grep.length === 1 ? options.grep[0] : options.grep;
+      if (options.parallel) {
+        return searchLogsParallel(session.logPath, pattern, {
+          ...opts,
+          ...(typeof options.parallel === "number" && { workers: options.parallel }),
+        });
+      }
+      if (options.index === false) return searchLogsFromLine(session.logPath, pattern, opts);
+      // 该日志已有倒排索引（之前的 logs search 建立）时只读取候选行；不为当前会话新建索引
+      return searchLogsIndexed(session.logPath, pattern, { ...opts, createIndex: false });
+    }
+    if (options.errors) {
+      const errorOpts = {
+        ...opts,
+        maxErrors: options.max_errors || 100,
+        group: options.group,
+        byScript: options.by_script,
+      };
+      if (options.parallel) {
+        return findErrorsParallel(session.logPath, {
+          ...errorOpts,
+          ...(typeof options.parallel === "number" && { workers: options.parallel }),
+        });
+      }
+      return findErrors(session.logPath, errorOpts);
+    }
+    return getLogsFromLine(session.logPath, {
+      ...opts,
+      last: options.last,
+      collapse: options.collapse,
+      maxLineLength: options.max_line_length,
+      sample: options.sample,
     });
+  };
+
+  // --since last: 从该客户端上次读到的位置继续，并把游标前移
+  if (options.since) {
+    if (options.since !== "last") return { error: `--since 目前只支持 last，收到: ${options.since}` };
+    return withPlaySession(await queryFromNamedCursor(options.client, session.logPath, query), play);
   }
+  return withPlaySession(await query(options.cursor), play);
+}
 
-  return getLogsFromLine(session.logPath, logOpts);
+// 限定到某次试玩时在结果中附带该试玩的信息
+function withPlaySession(result, play) {
+  return play && !result.error ? { session: play.session, ...result } : result;
+}
+
+// --follow: 持续输出新增日志（每行一个 JSON），直到 Ctrl+C
+async function logFollow(placePath, options = {}) {
+  const sm = await getStudioManager();
+  const [ok, msg, session] = await sm.getSession(placePath);
+  if (!ok) return { error: msg };
+
+  let filterRules;
+  try {
+    filterRules = loadFilterRules(options.filter_config || findFilterConfig(placePath));
+  } catch (e) {
+    return { error: e.message };
+  }
+
+  const follower = followLog(
+    session.logPath,
+    {
+      afterLine: options.after_line ?? null,
+      startDate: options.start_date,
+      endDate: options.end_date,
+      runContext: options.context,
+      errorsOnly: options.errors,
+      filterRules,
+    },
+    (entries) => {
+      for (const entry of entries) process.stdout.write(JSON.stringify(entry) + "\n");
+    },
+  );
+  process.once("SIGINT", follower.stop);
+  process.once("SIGTERM", follower.stop);
+  await follower.done;
+  return null;
+}
+
+// logs search / errors：跨 LOG_DIR 全部 Studio 日志，逐条输出命中（NDJSON，带文件、行号、会话），最后一行为汇总
+async function logsCmd(action, pattern, options = {}) {
+  let filterRules;
+  try {
+    filterRules = loadFilterRules(options.filter_config || findFilterConfig());
+  } catch (e) {
+    return { error: e.message };
+  }
+
+  const scanOpts = {
+    days: options.days,
+    startDate: options.start_date,
+    endDate: options.end_date,
+    runContext: options.context,
+    filterRules,
+    maxResults: options.max_results || 100,
+    useIndex: options.index !== false,
+    ...(typeof options.parallel === "number" && { workers: options.parallel }),
+  };
+  const onFile = ({ file, session, hits }) => {
+    for (const hit of hits) process.stdout.write(JSON.stringify({ file, session, ...hit }) + "\n");
+  };
+
+  const summary =
+    action === "search" ? await searchAllLogs(pattern, scanOpts, onFile) : await findErrorsAllLogs(scanOpts, onFile);
+  if (summary.error) return summary;
+  process.stdout.write(JSON.stringify({ summary }) + "\n");
+  return null;
 }
 
 async function screenshotCmd(placePath, options = {}) {
@@ -315,12 +453,24 @@ async function record(placePath, options = {}) {
 // ============ 命令定义 ============
 
 const LOG_OPTIONS = [
+  "  --last <n>          只取最后 n 条日志（从文件末尾倒序读取）",
   "  --after-line <n>    从指定行号之后开始",
   "  --before-line <n>   到指定行号之前结束",
   "  --start-date <date> 开始日期 (YYYY-MM-DD HH:MM:SS)",
   "  --end-date <date>   结束日期 (YYYY-MM-DD HH:MM:SS)",
   "  --timestamps        显示时间戳",
   "  --context <ctx>     过滤运行上下文 (play/edit)",
+  "  --follow            持续输出新增日志（NDJSON，Ctrl+C 结束）",
+  "  --filter-config <f> 过滤规则配置文件（默认查找 place 同目录或当前目录的 rspo-log-filter.json）",
+  "  --filter-stats      输出每条过滤规则移除的行数",
+  "  --collapse          连续相同或近似相同（只有数字、实例路径不同）的消息合并为一行 \"message (xN, lines a–b)\"",
+  "  --max-line-length <n> 截断超过 n 个字符的消息（标注省略的字符数）",
+  "  --sample <n>        同一消息每秒最多输出 n 行，其余丢弃并计入 dropped",
+  "  --cursor <c>        从上次结果返回的 cursor 处继续读取",
+  "  --session <n|last>  只读取第 n 次（或最后一次）试玩的日志 / 错误（试玩编号见 --sessions）",
+  "  --since last        从本客户端上次读到的位置继续（游标按客户端与日志文件持久化，每次查询后前移）",
+  "  --client <id>       --since last 使用的客户端 ID（默认 default）",
+  "  --no-count          页满即停止，不统计剩余条数（只读取本页覆盖的范围）",
 ];
 
 const COMMANDS = {
@@ -366,9 +516,31 @@ const COMMANDS = {
     options: [
       "  --errors            检测错误输出（Roblox 特定错误模式）",
       "  --max-errors <n>    最多返回的错误数量（默认 100，配合 --errors）",
+      "  --group             按签名聚合重复错误（去掉数字、实例路径、GUID），按次数降序（配合 --errors）",
+      "  --sessions          列出所有试玩会话（编号、行范围、时间范围、时长、错误数）",
+      "  --stats             只输出统计摘要（类别 / 级别计数、每秒行数、play 会话数、输出与过滤字节数）",
+      "  --grep <pattern>    按消息搜索（正则，忽略大小写）；可重复指定，一次读取分别返回每个模式的命中行号与计数；不能与 --last / --collapse / --max-line-length / --sample 同时使用",
+      "  --by-script         按脚本和行号统计错误次数（错误位置取自 Lua 堆栈，配合 --errors）",
+      "  --parallel [n]      多线程扫描大日志（配合 --errors 或 --grep，默认 CPU 核数 - 1）",
+      "  --no-index          --grep 不使用已有的倒排索引",
       ...LOG_OPTIONS,
     ],
   },
+  logs: {
+    args: "<search <regex>|errors> [options]",
+    desc: "跨会话搜索 / 检测 LOG_DIR 中全部 Studio 日志（多线程，NDJSON 流式输出）",
+    subcommands: ["search <regex>", "errors"],
+    options: [
+      "  --days <n>          只扫描最近 n 天内写入过的日志",
+      "  --max-results <n>   每个日志文件最多输出的条数（默认 100，汇总中的计数不受限制）",
+      "  --parallel <n>      worker 线程数（默认 CPU 核数 - 1）",
+      "  --start-date <date> 开始日期 (YYYY-MM-DD HH:MM:SS)",
+      "  --end-date <date>   结束日期 (YYYY-MM-DD HH:MM:SS)",
+      "  --context <ctx>     过滤运行上下文 (play/edit)",
+      "  --filter-config <f> 过滤规则配置文件（默认查找当前目录的 rspo-log-filter.json）",
+      "  --no-index          search 不使用倒排索引（默认在 LOG_DIR 下增量维护并用于收窄候选行）",
+    ],
+  },
   screenshot: {
     args: "<place_path> [filename]",
     desc: "截取 Studio 窗口截图",
@@ -426,6 +598,10 @@ Commands:
   日志分析:
     log <place_path>                获取日志
     log <place_path> --errors       检测错误
+    log <place_path> --grep <regex> 搜索当前会话日志（可重复 --grep）
+    log <place_path> --sessions     列出试玩会话（配合 --session N 读取某一次）
+    logs search <regex>             跨会话搜索全部日志
+    logs errors [--days 7]          跨会话汇总错误
 
   工具栏检测:
     toolbar <place_path>            检测工具栏状态
@@ -596,10 +772,31 @@ async function main() {
           console.log(JSON.stringify({ error: "缺少 place_path 参数" }));
           process.exit(1);
         }
+        if (options.follow) {
+          result = await logFollow(placePath, options);
+          if (!result) return;
+          break;
+        }
         result = await log(placePath, options);
         break;
       }
 
+      case "logs": {
+        const action = args[1];
+        if (!["search", "errors"].includes(action)) {
+          console.log(JSON.stringify({ error: "用法: rspo logs <search <regex>|errors> [options]" }));
+          process.exit(1);
+        }
+        const pattern = action === "search" ? args[2] : null;
+        if (action === "search" && (!pattern || pattern.startsWith("-"))) {
+          console.log(JSON.stringify({ error: "缺少搜索模式参数" }));
+          process.exit(1);
+        }
+        result = await logsCmd(action, pattern, options);
+        if (!result) return;
+        break;
+      }
+
       case "screenshot": {
         const placePath = args[1];
         if (!placePath || placePath.startsWith("-")) {
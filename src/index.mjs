@@ -1,7 +1,14 @@
 // Main entry point - re-export all modules
 export * from "./studio-manager.mjs";
 export * from "./log-utils.mjs";
+export * from "./log-reader.mjs";
+export * from "./log-compress.mjs";
+export * from "./log-follow.mjs";
+export * from "./log-parallel.mjs";
+export * from "./log-index.mjs";
+export * from "./log-archive.mjs";
 export * from "./log-filter.mjs";
+export * from "./log-cursors.mjs";
 export * as platform from "./platform/index.mjs";
 export { detectToolbarState, detectToolbarStateFromFile } from "./toolbar-detector.mjs";
 export { getSessionScreenshotDir, ensureScreenshotDir, recordViewport } from "./screenshot-utils.mjs";
@@ -0,0 +1,91 @@
+import { statSync, existsSync, readdirSync } from "node:fs";
+import { basename, join } from "node:path";
+import { DEFAULT_RULE_SET } from "./log-filter.mjs";
+import { LOG_DIR, compileSearchPattern, compileTimeRange } from "./log-utils.mjs";
+import { findLatestStudioLogs } from "./studio-manager.mjs";
+import { runWorkerPool, defaultWorkerCount } from "./log-parallel.mjs";
+import { statLog } from "./log-compress.mjs";
+
+// 跨会话日志分析：对 LOG_DIR 中的全部 Studio 日志同时搜索 / 检测错误。
+// 每个文件交给有界 worker 池中的一个线程完整扫描，结果按会话时间顺序（旧 → 新）流式交付。
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// cleanOldLogs 归档模式压缩的日志（保留原日志的修改时间）
+function listArchivedLogs() {
+  if (!existsSync(LOG_DIR)) return [];
+  return readdirSync(LOG_DIR)
+    .filter((f) => f.includes("Studio") && /\.log\.(gz|zst)$/.test(f))
+    .map((f) => join(LOG_DIR, f));
+}
+
+// LOG_DIR 中的 Studio 日志（含压缩归档），按修改时间从旧到新；days 限定最近 N 天内有写入的文件。size 为原始大小
+export function listStudioLogs({ days = null } = {}) {
+  const since = days ? Date.now() - days * DAY_MS : 0;
+  const files = [];
+  for (const path of [...findLatestStudioLogs(Infinity), ...listArchivedLogs()]) {
+    try {
+      const { mtimeMs, size } = statLog(path);
+      if (mtimeMs >= since) files.push({ path, mtime: mtimeMs, size });
+    } catch {}
+  }
+  return files.sort((a, b) => a.mtime - b.mtime);
+}
+
+// onFile({ file, path, session, count, hits }) 按文件顺序回调：某个文件扫描完成且它之前的文件都已交付时立即交付。
+// 返回汇总 { files, matchedFiles, matches }。
+async function scanAllLogs(
+  task,
+  { files = null, days = null, startDate = null, endDate = null, workers = defaultWorkerCount(), maxResults = 100 },
+  onFile,
+) {
+  let logs = files ? files.map((path) => ({ path, mtime: statSync(path).mtimeMs })) : listStudioLogs({ days });
+  // 最后写入早于起始时间的文件不可能包含窗口内的行
+  const range = compileTimeRange(startDate, endDate);
+  if (range && range.start) logs = logs.filter((f) => new Date(f.mtime).toISOString() >= range.start);
+
+  const tasks = logs.map(({ path }) => ({
+    kind: "scanFile",
+    logPath: path,
+    startDate,
+    endDate,
+    maxHits: maxResults,
+    ...task,
+  }));
+
+  const summary = { files: tasks.length, matchedFiles: 0, matches: 0 };
+  const ready = new Array(tasks.length);
+  let nextEmit = 0;
+  const emitReady = () => {
+    while (nextEmit < tasks.length && ready[nextEmit]) {
+      const { session, count, hits, missing } = ready[nextEmit];
+      const path = tasks[nextEmit].logPath;
+      ready[nextEmit++] = true;
+      if (missing) continue;
+      if (count > 0) summary.matchedFiles++;
+      summary.matches += count;
+      onFile({ file: basename(path), path, session, count, hits });
+    }
+  };
+
+  await runWorkerPool(tasks, Math.max(1, workers), (result, i) => {
+    ready[i] = result;
+    emitReady();
+  });
+  return summary;
+}
+
+function filterTask({ categories = null, applyFilter = true, runContext = null, filterRules = DEFAULT_RULE_SET }) {
+  return { categories, applyFilter, runContext, rules: filterRules === DEFAULT_RULE_SET ? null : filterRules.rules };
+}
+
+// useIndex（默认开启）：借助各日志的倒排索引（log-index.mjs）只读取候选行，归档日志的重复搜索无需全文扫描
+export async function searchAllLogs(pattern, options = {}, onFile = () => {}) {
+  if (!compileSearchPattern(pattern)) return { error: `Invalid regex pattern: ${pattern}` };
+  const { useIndex = true, indexDir } = options;
+  return scanAllLogs({ ...filterTask(options), pattern, useIndex, ...(indexDir && { indexDir }) }, options, onFile);
+}
+
+export async function findErrorsAllLogs(options = {}, onFile = () => {}) {
+  return scanAllLogs({ ...filterTask(options), errorsOnly: true }, options, onFile);
+}
@@ -0,0 +1,195 @@
+import zlib from "node:zlib";
+import {
+  openSync,
+  readSync,
+  writeSync,
+  closeSync,
+  fstatSync,
+  statSync,
+  existsSync,
+  readFileSync,
+  writeFileSync,
+  renameSync,
+  unlinkSync,
+  utimesSync,
+} from "node:fs";
+import { basename } from "node:path";
+
+// 压缩归档：原始日志按 BLOCK_SIZE 字节切块，每块独立压缩为一个 gzip member / zstd frame 后直接拼接，
+// 结果仍是标准的 .gz / .zst 文件（gunzip、zstd -d 可直接解压）。旁路元数据 <archive>.meta.json 记录块表
+// （原始偏移 → 压缩偏移）与会话信息，读取时按块随机访问，偏移、行号、检查点和游标都与原始日志一致。
+
+const BLOCK_SIZE = 1024 * 1024;
+const META_VERSION = 1;
+
+// zstd 需要 Node 22.15+ 的 zlib，旧版本只提供 gzip
+export const LOG_COMPRESSION_FORMATS = {
+  gzip: { ext: ".gz", compress: (buf) => zlib.gzipSync(buf), decompress: (buf) => zlib.gunzipSync(buf) },
+  ...(typeof zlib.zstdCompressSync === "function" && {
+    zstd: { ext: ".zst", compress: (buf) => zlib.zstdCompressSync(buf), decompress: (buf) => zlib.zstdDecompressSync(buf) },
+  }),
+};
+
+function formatOf(path) {
+  if (path.endsWith(".gz")) return "gzip";
+  if (path.endsWith(".zst")) return "zstd";
+  return null;
+}
+
+export function isCompressedLog(path) {
+  return formatOf(path) !== null;
+}
+
+export function logMetaPath(archivePath) {
+  return archivePath + ".meta.json";
+}
+
+// 读取归档的旁路元数据；不存在、损坏或与归档文件大小不符时返回 null
+export function readLogMeta(archivePath) {
+  try {
+    const meta = JSON.parse(readFileSync(logMetaPath(archivePath), "utf-8"));
+    if (meta.version !== META_VERSION || meta.compressedSize !== statSync(archivePath).size) return null;
+    return meta;
+  } catch {
+    return null;
+  }
+}
+
+// 压缩 logPath 为同目录下的 <logPath>.gz / .zst 并写入元数据（info 中的字段原样写入，如 place、时间范围、错误数），
+// 保留原文件的修改时间，成功后删除原文件。返回 { path, size, compressedSize } 或 { error }。
+// 中途失败（磁盘已满、读取出错等）时删除临时文件与元数据，原日志保持不变。
+export function compressLog(logPath, { format = "gzip", info = {} } = {}) {
+  const codec = LOG_COMPRESSION_FORMATS[format];
+  if (!codec) return { error: `Unsupported compression format: ${format}` };
+  const archivePath = logPath + codec.ext;
+  const tmpPath = archivePath + ".tmp";
+
+  let renamed = false;
+  try {
+    const { mtime, atime } = statSync(logPath);
+    const blocks = [];
+    let size = 0;
+    let compressedSize = 0;
+    const input = openSync(logPath, "r");
+    try {
+      const output = openSync(tmpPath, "w");
+      try {
+        const buf = Buffer.allocUnsafe(BLOCK_SIZE);
+        let n;
+        while ((n = readSync(input, buf, 0, BLOCK_SIZE, size)) > 0) {
+          const packed = codec.compress(buf.subarray(0, n));
+          writeSync(output, packed);
+          blocks.push([size, compressedSize]);
+          size += n;
+          compressedSize += packed.length;
+        }
+      } finally {
+        closeSync(output);
+      }
+    } finally {
+      closeSync(input);
+    }
+
+    const meta = { version: META_VERSION, format, source: basename(logPath), ...info, size, compressedSize, blocks };
+    writeFileSync(logMetaPath(archivePath), JSON.stringify(meta));
+    renameSync(tmpPath, archivePath);
+    renamed = true;
+    utimesSync(archivePath, atime, mtime);
+    unlinkSync(logPath);
+    return { path: archivePath, size, compressedSize };
+  } catch (e) {
+    if (!renamed) {
+      for (const p of [tmpPath, logMetaPath(archivePath)]) {
+        try {
+          unlinkSync(p);
+        } catch {}
+      }
+    }
+    return { error: `Failed to compress ${logPath}: ${e.message}` };
+  }
+}
+
+// ============ 统一读取 ============
+// 数据源：read(buf, length, position) 按原始偏移读取，size 为原始大小。普通文件直接 readSync，
+// 归档按块解压（缓存最近一块，顺序与倒序读取都只解压每块一次）。
+
+export function fdLogSource(fd) {
+  return {
+    get size() {
+      return fstatSync(fd).size;
+    },
+    read: (buf, length, position) => readSync(fd, buf, 0, length, position),
+    close() {},
+  };
+}
+
+function compressedLogSource(path) {
+  const codec = LOG_COMPRESSION_FORMATS[formatOf(path)];
+  if (!codec) throw new Error(`Unsupported compression format: ${basename(path)}`);
+  const meta = readLogMeta(path);
+  // 没有元数据（外部压缩的文件）时整体解压为一块
+  if (!meta) {
+    const data = codec.decompress(readFileSync(path));
+    return { size: data.length, read: (buf, length, position) => data.copy(buf, 0, position, position + length), close() {} };
+  }
+
+  const fd = openSync(path, "r");
+  const { blocks, size, compressedSize } = meta;
+  let cached = -1;
+  let data = null;
+  const load = (i) => {
+    if (i === cached) return;
+    const start = blocks[i][1];
+    const end = i + 1 < blocks.length ? blocks[i + 1][1] : compressedSize;
+    const packed = Buffer.allocUnsafe(end - start);
+    readSync(fd, packed, 0, packed.length, start);
+    data = codec.decompress(packed);
+    cached = i;
+  };
+  return {
+    size,
+    read(buf, length, position) {
+      let copied = 0;
+      while (copied < length && position + copied < size) {
+        const at = position + copied;
+        // 二分查找包含 at 的块
+        let lo = 0;
+        let hi = blocks.length - 1;
+        while (lo < hi) {
+          const mid = (lo + hi + 1) >> 1;
+          if (blocks[mid][0] <= at) lo = mid;
+          else hi = mid - 1;
+        }
+        load(lo);
+        copied += data.copy(buf, copied, at - blocks[lo][0], at - blocks[lo][0] + length - copied);
+      }
+      return copied;
+    },
+    close() {
+      closeSync(fd);
+    },
+  };
+}
+
+export function openLogSource(path) {
+  if (isCompressedLog(path)) return compressedLogSource(path);
+  const fd = openSync(path, "r");
+  return Object.assign(fdLogSource(fd), { close: () => closeSync(fd) });
+}
+
+// 原始大小与修改时间：归档取元数据中的原始大小，没有元数据时需要整体解压
+export function statLog(path) {
+  const stat = statSync(path);
+  if (!isCompressedLog(path)) return { size: stat.size, mtimeMs: stat.mtimeMs };
+  const meta = readLogMeta(path);
+  if (meta) return { size: meta.size, mtimeMs: stat.mtimeMs };
+  const source = openLogSource(path);
+  return { size: source.size, mtimeMs: stat.mtimeMs };
+}
+
+// 删除归档及其元数据
+export function removeLogArchive(archivePath) {
+  for (const p of [archivePath, logMetaPath(archivePath)]) {
+    if (existsSync(p)) unlinkSync(p);
+  }
+}
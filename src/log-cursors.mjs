@@ -0,0 +1,67 @@
+import { readFileSync, existsSync, mkdirSync } from "node:fs";
+import { join, basename } from "node:path";
+import { createHash } from "node:crypto";
+import { getLogStateDir, encodeLogCursor, decodeLogCursor, writeFileAtomic } from "./log-utils.mjs";
+
+// 命名游标：按客户端 ID 和日志文件持久化上次读到的位置（字节偏移、行号、游戏状态），
+// CLI 与 MCP 服务共用同一存储。查询带 since: "last" 时从该位置继续并在成功后前移，
+// 客户端不必自己保存 lastLine，重启之后也不会从头重读。
+// 每个客户端一个文件（文件名取客户端 ID 的哈希），原子替换写入，不同客户端同时保存互不覆盖：
+// { client, cursors: { [日志文件名]: { path, offset, line, state, updated } } }
+
+export const DEFAULT_CURSOR_CLIENT = "default";
+const cursorStoreDir = () => join(getLogStateDir(), ".rspo_log_cursors");
+
+function cursorFilePath(storeDir, clientId) {
+  return join(storeDir, createHash("sha1").update(clientId).digest("hex") + ".json");
+}
+
+function loadClientCursors(storeDir, clientId) {
+  const path = cursorFilePath(storeDir, clientId);
+  if (!existsSync(path)) return {};
+  try {
+    const data = JSON.parse(readFileSync(path, "utf-8"));
+    return data.client === clientId ? data.cursors || {} : {};
+  } catch {
+    return {};
+  }
+}
+
+// 存放目录的上级（默认为 Roblox 日志目录）不存在时不保存
+function saveClientCursors(storeDir, clientId, cursors) {
+  try {
+    if (!existsSync(join(storeDir, ".."))) return;
+    mkdirSync(storeDir, { recursive: true });
+    writeFileAtomic(cursorFilePath(storeDir, clientId), JSON.stringify({ client: clientId, cursors }));
+  } catch {}
+}
+
+// 返回 clientId 在该日志上的游标（与查询结果中的 cursor 相同的格式）；没有或已失效（日志被截断、替换）时返回 null
+export function readNamedCursor(clientId, logPath, { storeDir = cursorStoreDir() } = {}) {
+  const saved = loadClientCursors(storeDir, clientId)[basename(logPath)];
+  if (!saved || saved.path !== logPath) return null;
+  const cursor = encodeLogCursor(logPath, saved);
+  return decodeLogCursor(logPath, cursor) ? cursor : null;
+}
+
+// 保存查询结果返回的 cursor（写入前重新读取该客户端的文件再合并）；同时清理该客户端名下已不存在的日志的游标
+export function writeNamedCursor(clientId, logPath, cursor, { storeDir = cursorStoreDir() } = {}) {
+  const pos = decodeLogCursor(logPath, cursor);
+  if (!pos) return false;
+  const cursors = loadClientCursors(storeDir, clientId);
+  for (const [name, saved] of Object.entries(cursors)) {
+    if (!existsSync(saved.path)) delete cursors[name];
+  }
+  cursors[basename(logPath)] = { path: logPath, ...pos, updated: new Date().toISOString() };
+  saveClientCursors(storeDir, clientId, cursors);
+  return true;
+}
+
+// since: "last"：以命名游标为 cursor 执行 query(cursor)（可为 async），成功后把结果的 cursor 存回。
+// 第一次查询（或游标已失效）时从日志开头读取。
+export async function queryFromNamedCursor(clientId, logPath, query, options = {}) {
+  const client = clientId || DEFAULT_CURSOR_CLIENT;
+  const result = await query(readNamedCursor(client, logPath, options));
+  if (result && !result.error && result.cursor) writeNamedCursor(client, logPath, result.cursor, options);
+  return result;
+}
@@ -1,3 +1,6 @@
+import { readFileSync, existsSync, statSync } from "node:fs";
+import { dirname, join } from "node:path";
+
 const EXCLUDE_PREFIXES = [
   "Info:",
   "RobloxGitHash:",
@@ -52,20 +55,247 @@ const EXCLUDE_CONTAINS = [
   "load failed:",
 ];
 
-export function shouldExclude(message) {
-  if (!message || !message.trim()) return true;
+// ============ 规则编译 ============
+// 前缀规则编译为字符前缀树，子串规则编译为 Aho-Corasick 自动机，
+// 每条消息只需从头扫描一遍即可判断是否命中任一规则，与规则数量无关。
+
+const TERMINAL = -1;
+
+// 返回 { root }：节点为 Map<charCode, node>，TERMINAL 键保存规则序号
+export function compilePrefixTrie(prefixes) {
+  const root = new Map();
+  prefixes.forEach((prefix, ruleIndex) => {
+    let node = root;
+    for (let i = 0; i < prefix.length; i++) {
+      const c = prefix.charCodeAt(i);
+      let child = node.get(c);
+      if (!child) {
+        child = new Map();
+        node.set(c, child);
+      }
+      node = child;
+    }
+    if (!node.has(TERMINAL)) node.set(TERMINAL, ruleIndex);
+  });
+  return { root };
+}
+
+// 返回命中的（最短）前缀规则序号，未命中返回 -1
+export function matchPrefix(trie, message) {
+  let node = trie.root;
+  if (node.has(TERMINAL)) return node.get(TERMINAL);
+  for (let i = 0; i < message.length; i++) {
+    node = node.get(message.charCodeAt(i));
+    if (!node) return -1;
+    if (node.has(TERMINAL)) return node.get(TERMINAL);
+  }
+  return -1;
+}
+
+// 返回 { delta, next, fail, output }：状态以数组下标表示，output[s] 为在状态 s 结束（含 fail 链）的规则序号，无则 -1。
+// ASCII 字符的转移预先展开为稠密 DFA 表 delta[s * 128 + c]，匹配时无需回溯 fail 链；
+// 非 ASCII 字符（如中文规则）走 next/fail 稀疏转移。
+export function compileAhoCorasick(patterns) {
+  const next = [new Map()];
+  const fail = [0];
+  const output = [-1];
+
+  patterns.forEach((pattern, ruleIndex) => {
+    let state = 0;
+    for (let i = 0; i < pattern.length; i++) {
+      const c = pattern.charCodeAt(i);
+      let to = next[state].get(c);
+      if (to === undefined) {
+        to = next.length;
+        next.push(new Map());
+        fail.push(0);
+        output.push(-1);
+        next[state].set(c, to);
+      }
+      state = to;
+    }
+    if (output[state] === -1) output[state] = ruleIndex;
+  });
+
+  // BFS 计算失配指针，同时按层展开 ASCII 转移表
+  const delta = new Int32Array(next.length * 128);
+  for (const [c, to] of next[0]) if (c < 128) delta[c] = to;
+  const queue = [...next[0].values()];
+  for (let q = 0; q < queue.length; q++) {
+    const state = queue[q];
+    for (const [c, to] of next[state]) {
+      let f = fail[state];
+      while (f !== 0 && !next[f].has(c)) f = fail[f];
+      const target = next[f].get(c);
+      fail[to] = target !== undefined && target !== to ? target : 0;
+      if (output[to] === -1) output[to] = output[fail[to]];
+      queue.push(to);
+    }
+    for (let c = 0; c < 128; c++) {
+      const to = next[state].get(c);
+      delta[state * 128 + c] = to !== undefined ? to : delta[fail[state] * 128 + c];
+    }
+  }
+
+  return { delta, next, fail, output: Int32Array.from(output) };
+}
+
+// 返回 text 中最先出现的子串规则序号，未命中返回 -1
+export function matchAhoCorasick(ac, text) {
+  const { delta, next, fail, output } = ac;
+  if (output[0] !== -1) return output[0];
+  let state = 0;
+  for (let i = 0; i < text.length; i++) {
+    const c = text.charCodeAt(i);
+    if (c < 128) {
+      state = delta[(state << 7) | c];
+    } else {
+      let to = next[state].get(c);
+      while (to === undefined && state !== 0) {
+        state = fail[state];
+        to = next[state].get(c);
+      }
+      state = to === undefined ? 0 : to;
+    }
+    if (output[state] !== -1) return output[state];
+  }
+  return -1;
+}
+
+// ============ 规则集 ============
+// 规则：{ action: "exclude" | "include", type: "prefix" | "contains" | "regex", pattern, flags?, source }。
+// include 规则优先：命中 include 的消息即使同时命中 exclude 也会保留。
+// 项目可在 place 文件同目录（或当前目录）放置 rspo-log-filter.json 追加规则：
+//   { "exclude": [{ "prefix": "[Heartbeat]" }, { "contains": "tick" }, { "regex": "^Pos: ", "flags": "i" }],
+//     "include": [{ "prefix": "Player data" }] }
+
+export const FILTER_CONFIG_NAME = "rspo-log-filter.json";
+export const EMPTY_MESSAGE = -2;
+
+const RULE_TYPES = ["prefix", "contains", "regex"];
+
+const BUILTIN_RULES = [
+  ...EXCLUDE_PREFIXES.map((pattern) => ({ action: "exclude", type: "prefix", pattern, source: "builtin" })),
+  ...EXCLUDE_CONTAINS.map((pattern) => ({ action: "exclude", type: "contains", pattern, source: "builtin" })),
+];
+
+function compileMatchers(rules, action) {
+  const prefixes = [];
+  const prefixIds = [];
+  const substrings = [];
+  const substringIds = [];
+  const regexes = [];
+  rules.forEach((rule, id) => {
+    if (rule.action !== action) return;
+    if (rule.type === "prefix") {
+      prefixes.push(rule.pattern);
+      prefixIds.push(id);
+    } else if (rule.type === "contains") {
+      substrings.push(rule.pattern);
+      substringIds.push(id);
+    } else {
+      regexes.push({ re: new RegExp(rule.pattern, (rule.flags || "").replace(/[gy]/g, "")), id });
+    }
+  });
+  return {
+    count: prefixes.length + substrings.length + regexes.length,
+    trie: compilePrefixTrie(prefixes),
+    prefixIds,
+    ac: compileAhoCorasick(substrings),
+    substringIds,
+    regexes,
+  };
+}
 
-  for (const prefix of EXCLUDE_PREFIXES) {
-    if (message.startsWith(prefix)) return true;
+function matchAny(matchers, message) {
+  const p = matchPrefix(matchers.trie, message);
+  if (p !== -1) return matchers.prefixIds[p];
+  const c = matchAhoCorasick(matchers.ac, message);
+  if (c !== -1) return matchers.substringIds[c];
+  for (const { re, id } of matchers.regexes) {
+    if (re.test(message)) return id;
   }
+  return -1;
+}
+
+export function compileRuleSet(rules) {
+  return {
+    rules,
+    exclude: compileMatchers(rules, "exclude"),
+    include: compileMatchers(rules, "include"),
+  };
+}
+
+export const DEFAULT_RULE_SET = compileRuleSet(BUILTIN_RULES);
+
+// 返回排除该消息的规则序号；空消息返回 EMPTY_MESSAGE；保留返回 -1
+export function matchExcludeRule(message, ruleSet = DEFAULT_RULE_SET) {
+  if (!message || !message.trim()) return EMPTY_MESSAGE;
+  const id = matchAny(ruleSet.exclude, message);
+  if (id === -1) return -1;
+  if (ruleSet.include.count > 0 && matchAny(ruleSet.include, message) !== -1) return -1;
+  return id;
+}
+
+export function shouldExclude(message, ruleSet = DEFAULT_RULE_SET) {
+  return matchExcludeRule(message, ruleSet) !== -1;
+}
+
+export function filterLogs(messages, ruleSet = DEFAULT_RULE_SET) {
+  return messages.filter((msg) => !shouldExclude(msg, ruleSet));
+}
+
+// hits: Map<规则序号, 命中次数>，按命中次数降序输出
+export function summarizeFilterStats(ruleSet, hits) {
+  return [...hits.entries()]
+    .map(([id, count]) => {
+      if (id === EMPTY_MESSAGE) return { type: "empty", pattern: "", source: "builtin", hits: count };
+      const { type, pattern, source } = ruleSet.rules[id];
+      return { type, pattern, source, hits: count };
+    })
+    .sort((a, b) => b.hits - a.hits);
+}
 
-  for (const substr of EXCLUDE_CONTAINS) {
-    if (message.includes(substr)) return true;
+function parseConfigRules(config, source) {
+  const rules = [];
+  for (const action of ["exclude", "include"]) {
+    for (const entry of config[action] || []) {
+      const type = RULE_TYPES.find((t) => typeof entry?.[t] === "string");
+      if (!type) throw new Error(`invalid ${action} rule ${JSON.stringify(entry)}`);
+      rules.push({ action, type, pattern: entry[type], flags: entry.flags, source });
+    }
   }
+  return rules;
+}
+
+// 编译结果按配置文件路径 + mtime 缓存，文件修改后下次调用自动重新加载
+const ruleSetCache = new Map();
+
+export function loadFilterRules(configPath = null) {
+  if (!configPath || !existsSync(configPath)) return DEFAULT_RULE_SET;
+  const mtime = statSync(configPath).mtimeMs;
+  const cached = ruleSetCache.get(configPath);
+  if (cached && cached.mtime === mtime) return cached.ruleSet;
 
-  return false;
+  let ruleSet;
+  try {
+    const config = JSON.parse(readFileSync(configPath, "utf-8"));
+    ruleSet = compileRuleSet([...BUILTIN_RULES, ...parseConfigRules(config, configPath)]);
+  } catch (e) {
+    throw new Error(`Invalid filter config ${configPath}: ${e.message}`);
+  }
+  ruleSetCache.set(configPath, { mtime, ruleSet });
+  return ruleSet;
 }
 
-export function filterLogs(messages) {
-  return messages.filter((msg) => !shouldExclude(msg));
+// 查找项目过滤配置：place 文件所在目录优先，其次当前工作目录
+export function findFilterConfig(placePath = null) {
+  const dirs = [];
+  if (placePath && !placePath.startsWith("cloud:")) dirs.push(dirname(placePath));
+  dirs.push(process.cwd());
+  for (const dir of dirs) {
+    const p = join(dir, FILTER_CONFIG_NAME);
+    if (existsSync(p)) return p;
+  }
+  return null;
 }
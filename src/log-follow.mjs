@@ -0,0 +1,139 @@
+import { openSync, closeSync, fstatSync, watch } from "node:fs";
+import { DEFAULT_RULE_SET } from "./log-filter.mjs";
+import { readLogLines } from "./log-reader.mjs";
+import {
+  createLogLineMatcher,
+  PAST_TIME_RANGE,
+  compileTimeRange,
+  buildGameStateIndex,
+  getRunContextForLine,
+  getRunContextForState,
+  parseGameStateChange,
+  locateLine,
+} from "./log-utils.mjs";
+
+const POLL_INTERVAL = 500;
+
+// 持续跟踪日志追加内容：保持文件打开，fs.watch 触发即时读取，轮询兜底（部分文件系统上 watch 不可靠）。
+// 只处理以换行结束的完整行，未写完的末行留到下次读取；每批过滤后的条目通过 onEntries 回调交付。
+// afterLine 为空时从文件末尾开始，否则从 afterLine 之后续读。
+export function followLog(
+  logPath,
+  {
+    afterLine = null,
+    startDate = null,
+    endDate = null,
+    categories = null,
+    applyFilter = true,
+    runContext = null,
+    errorsOnly = false,
+    filterRules = DEFAULT_RULE_SET,
+    pollInterval = POLL_INTERVAL,
+  } = {},
+  onEntries = () => {},
+) {
+  const match = createLogLineMatcher({
+    errorsOnly,
+    categories,
+    range: compileTimeRange(startDate, endDate),
+    applyFilter,
+    filterRules,
+  });
+  const start = locateLine(logPath, afterLine);
+  let offset = start.offset;
+  let lineNum = start.line;
+  let ctx = getRunContextForLine(lineNum, buildGameStateIndex(logPath));
+
+  const fd = openSync(logPath, "r");
+  let stopped = false;
+  let watcher = null;
+  let timer = null;
+  let resolveDone;
+  const done = new Promise((r) => (resolveDone = r));
+
+  function readAppended() {
+    if (stopped) return;
+    const { size } = fstatSync(fd);
+    if (size < offset) {
+      // 日志被截断或重写，从头开始
+      offset = 0;
+      lineNum = 1;
+      ctx = "edit";
+    }
+    if (size === offset) return;
+
+    const entries = [];
+    for (const l of readLogLines(logPath, { startOffset: offset, startLine: lineNum, fd })) {
+      if (l.next === null) break;
+      offset = l.next;
+      lineNum = l.lineNum + 1;
+
+      const newState = parseGameStateChange(l.text);
+      if (newState) ctx = getRunContextForState(newState);
+
+      const entry = match(l.text, l.lineNum);
+      // 跟踪模式不会提前结束，越过时间窗口末尾的行同样只是丢弃
+      if (!entry || entry === PAST_TIME_RANGE) continue;
+      if (runContext && ctx !== runContext) continue;
+
+      entries.push({
+        line: l.lineNum,
+        offset: l.offset,
+        timestamp: entry.timestamp,
+        level: entry.level,
+        category: entry.category,
+        context: ctx,
+        message: entry.message,
+      });
+    }
+
+    if (entries.length > 0) onEntries(entries, { lastLine: lineNum - 1, offset });
+  }
+
+  function stop() {
+    if (stopped) return;
+    stopped = true;
+    if (watcher) watcher.close();
+    clearInterval(timer);
+    closeSync(fd);
+    resolveDone({ lastLine: lineNum - 1, offset });
+  }
+
+  function tick() {
+    try {
+      readAppended();
+    } catch {
+      stop();
+    }
+  }
+
+  try {
+    watcher = watch(logPath, { persistent: true }, tick);
+    watcher.on("error", () => {
+      watcher.close();
+      watcher = null;
+    });
+  } catch {
+    watcher = null;
+  }
+  timer = setInterval(tick, pollInterval);
+  setImmediate(tick);
+
+  return { stop, done };
+}
+
+// 长轮询：等待 afterLine 之后出现新的过滤后条目，或超时返回。供 MCP 等一次性请求使用。
+export function waitForLogs(logPath, { timeoutMs = 10000, ...options } = {}) {
+  return new Promise((resolve) => {
+    let timeout = null;
+    const follower = followLog(logPath, options, (entries, pos) => {
+      clearTimeout(timeout);
+      follower.stop();
+      resolve({ entries, lastLine: pos.lastLine, timedOut: false });
+    });
+    follower.done.then((pos) => {
+      resolve({ entries: [], lastLine: pos.lastLine, timedOut: true });
+    });
+    timeout = setTimeout(() => follower.stop(), timeoutMs);
+  });
+}
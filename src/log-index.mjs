@@ -0,0 +1,725 @@
+import { openSync, readSync, closeSync, existsSync, mkdirSync, readFileSync, writeFileSync, rmSync } from "node:fs";
+import { join, basename, dirname } from "node:path";
+import { readLogLines } from "./log-reader.mjs";
+import { openLogSource, statLog } from "./log-compress.mjs";
+import { DEFAULT_RULE_SET } from "./log-filter.mjs";
+import {
+  getSearchIndexDir,
+  readLogFingerprint,
+  matchesLogFingerprint,
+  writeFileAtomic,
+  PAST_TIME_RANGE,
+  locateLogCategory,
+  parseLogLineAt,
+  compileSearchPattern,
+  compileSearchPatterns,
+  compileTimeRange,
+  createLogLineMatcher,
+  createTextCollector,
+  createPatternCollector,
+  buildGameStateIndex,
+  getRunContextForState,
+  encodeLogCursor,
+  decodeLogCursor,
+  searchLogsFromLine,
+} from "./log-utils.mjs";
+
+// 全文倒排索引：词 → 行号 postings，按日志文件持久化在 getSearchIndexDir()/<日志文件名>/。
+// 索引由不可变的段（segment）组成，每段覆盖一段连续的完整行；日志增长时只为新增的行写新段，
+// 小段按大小逐级合并，段数保持对数级。查询时从正则中提取必须出现的字面量词，
+// 用 postings 求出候选行，再只读取这些行跑完整的过滤管线与正则。
+//
+// 段文件：[u32 头长度][头 JSON][postings 字节]
+//   头 { firstLine, lastLine, terms: [按码元排序], entries: [offset, length, count, last, ...],
+//        blockLines: [...], blockOffsets: [...] }
+//   每个词的 postings 为行号差值的 varint 序列（首个值相对 0），blockLines/blockOffsets 每 BLOCK_LINES 行
+//   记录一次行首字节偏移，用于直接定位候选行。
+
+const INDEX_VERSION = 1;
+const SEGMENT_LINES = 1_000_000;
+const MAX_MERGED_LINES = 4_000_000;
+const BLOCK_LINES = 64;
+const MIN_PARTIAL_TERM = 3;
+// 候选行已足够少时不再用代价更高的部分匹配约束继续收窄
+const ENOUGH_CANDIDATES = 256;
+// 候选行超过索引行数的这一比例时逐行定位不如顺序扫描
+const MAX_CANDIDATE_RATIO = 1 / 8;
+
+// ============ 分词 ============
+
+const TOKEN_RE = /[\p{L}\p{N}_]+/gu;
+const NOISY_RE = /(?:\p{N}\P{N}*){4}/u;
+const DIGITS_RE = /\p{N}+/u;
+
+// 数字较多的词（数值、GUID、哈希）只索引其中的非数字片段，避免词典随日志线性膨胀
+function forEachTerm(message, emit) {
+  for (const [token] of message.toLowerCase().matchAll(TOKEN_RE)) {
+    if (!NOISY_RE.test(token)) emit(token);
+    else for (const part of token.split(DIGITS_RE)) if (part) emit(part);
+  }
+}
+
+// ============ 查询规划 ============
+
+const SPECIAL_ESCAPES = "dDwWsSBnrtfv0cxukpP123456789";
+
+function skipEscape(pattern, i) {
+  const c = pattern[i];
+  if (c === "x") return i + 2;
+  if (c === "c") return i + 1;
+  if ((c === "u" || c === "p" || c === "P") && pattern[i + 1] === "{") {
+    const close = pattern.indexOf("}", i);
+    return close === -1 ? pattern.length : close;
+  }
+  if (c === "u") return i + 4;
+  if (c === "k") {
+    const close = pattern.indexOf(">", i);
+    return close === -1 ? pattern.length : close;
+  }
+  while (c >= "0" && c <= "9" && pattern[i + 1] >= "0" && pattern[i + 1] <= "9") i++;
+  return i;
+}
+
+function dropLastChar(s) {
+  const code = s.charCodeAt(s.length - 1);
+  return s.slice(0, code >= 0xdc00 && code <= 0xdfff ? -2 : -1);
+}
+
+// 拆出正则顶层必然出现的字面量片段；分组内容、字符类、可选字符一律视为未知
+function literalSegments(pattern) {
+  const segments = [];
+  let text = "";
+  let leftClosed = false;
+  let depth = 0;
+  const end = (rightClosed) => {
+    if (text) segments.push({ text, leftClosed, rightClosed });
+    text = "";
+    leftClosed = false;
+  };
+  const skipLazy = (i) => (pattern[i + 1] === "?" ? i + 1 : i);
+
+  for (let i = 0; i < pattern.length; i++) {
+    const c = pattern[i];
+    if (c === "\\") {
+      const n = pattern[++i];
+      if (n === undefined) break;
+      if (depth > 0) {
+        i = skipEscape(pattern, i);
+      } else if (n === "b") {
+        // \b 只把 ASCII [A-Za-z0-9_] 视为单词字符，而索引按 Unicode 字母 / 数字分词：
+        // \bpée 可以命中 "Épée"，\bid 可以命中 "éid"，因此 \b 两侧都不能当作词的边界
+        end(false);
+      } else if (SPECIAL_ESCAPES.includes(n)) {
+        end(false);
+        i = skipEscape(pattern, i);
+      } else {
+        text += n;
+      }
+    } else if (c === "[") {
+      end(false);
+      for (i++; i < pattern.length && pattern[i] !== "]"; i++) if (pattern[i] === "\\") i++;
+    } else if (c === "(") {
+      end(false);
+      depth++;
+    } else if (c === ")") {
+      depth--;
+    } else if (depth > 0) {
+      continue;
+    } else if (c === "*" || c === "?") {
+      if (text) text = dropLastChar(text);
+      end(false);
+      i = skipLazy(i);
+    } else if (c === "{") {
+      if (text) text = dropLastChar(text);
+      end(false);
+      const close = pattern.indexOf("}", i);
+      if (close === -1) break;
+      i = skipLazy(close);
+    } else if (c === "+") {
+      end(false);
+      i = skipLazy(i);
+    } else if (c === "^") {
+      end(false);
+      leftClosed = true;
+    } else if (c === "$") {
+      end(true);
+    } else if (c === ".") {
+      end(false);
+    } else {
+      text += c;
+    }
+  }
+  end(false);
+  return segments;
+}
+
+function addConstraint(constraints, term, mode) {
+  if (mode === "exact") {
+    if (!NOISY_RE.test(term)) constraints.push({ term, mode });
+    else for (const part of term.split(DIGITS_RE)) if (part) constraints.push({ term: part, mode });
+  } else if (!DIGITS_RE.test(term)) {
+    if (term.length >= MIN_PARTIAL_TERM) constraints.push({ term, mode });
+  } else {
+    // 行中对应的词可能整体入索引，也可能被拆成非数字片段：两种情况下都包含这些片段
+    for (const part of term.split(DIGITS_RE)) {
+      if (part.length >= MIN_PARTIAL_TERM) constraints.push({ term: part, mode: "substring" });
+    }
+  }
+}
+
+// 从搜索正则中提取候选行必须满足的词约束：[{ term, mode: exact|prefix|suffix|substring }]，
+// 无法提取（含 |、没有足够长的字面量）时返回 null，调用方退回顺序扫描
+export function planIndexQuery(pattern) {
+  if (typeof pattern !== "string" || pattern.includes("|") || !compileSearchPattern(pattern)) return null;
+  const constraints = [];
+  for (const { text, leftClosed, rightClosed } of literalSegments(pattern)) {
+    const lower = text.toLowerCase();
+    for (const m of lower.matchAll(TOKEN_RE)) {
+      const leftOpen = m.index === 0 && !leftClosed;
+      const rightOpen = m.index + m[0].length === lower.length && !rightClosed;
+      const mode = leftOpen ? (rightOpen ? "substring" : "suffix") : rightOpen ? "prefix" : "exact";
+      addConstraint(constraints, m[0], mode);
+    }
+  }
+  return constraints.length > 0 ? constraints : null;
+}
+
+// ============ 段读写 ============
+
+class ByteWriter {
+  constructor(size = 1 << 16) {
+    this.buf = Buffer.allocUnsafe(size);
+    this.length = 0;
+  }
+
+  reserve(n) {
+    if (this.length + n <= this.buf.length) return;
+    const next = Buffer.allocUnsafe(Math.max(this.buf.length * 2, this.length + n));
+    this.buf.copy(next, 0, 0, this.length);
+    this.buf = next;
+  }
+
+  varint(v) {
+    this.reserve(5);
+    while (v >= 0x80) {
+      this.buf[this.length++] = (v & 0x7f) | 0x80;
+      v >>>= 7;
+    }
+    this.buf[this.length++] = v;
+  }
+
+  bytes(src) {
+    this.reserve(src.length);
+    src.copy(this.buf, this.length);
+    this.length += src.length;
+  }
+}
+
+function readVarint(buf, pos) {
+  let v = 0;
+  let shift = 0;
+  let b;
+  do {
+    b = buf[pos.at++];
+    v += (b & 0x7f) * 2 ** shift;
+    shift += 7;
+  } while (b & 0x80);
+  return v;
+}
+
+function writeSegmentFile(path, header, postings) {
+  const json = Buffer.from(JSON.stringify(header), "utf-8");
+  const size = Buffer.allocUnsafe(4);
+  size.writeUInt32LE(json.length, 0);
+  writeFileSync(path, Buffer.concat([size, json, postings]));
+}
+
+// postings: Map<term, number[]>（行号递增）
+function writeSegment(path, { firstLine, lastLine, postings, blockLines, blockOffsets }) {
+  const terms = [...postings.keys()].sort();
+  const entries = [];
+  const out = new ByteWriter();
+  for (const term of terms) {
+    const lines = postings.get(term);
+    const start = out.length;
+    let prev = 0;
+    for (const line of lines) {
+      out.varint(line - prev);
+      prev = line;
+    }
+    entries.push(start, out.length - start, lines.length, prev);
+  }
+  writeSegmentFile(path, { firstLine, lastLine, terms, entries, blockLines, blockOffsets }, out.buf.subarray(0, out.length));
+}
+
+const segmentCache = new Map();
+const SEGMENT_CACHE_SIZE = 32;
+
+// 段文件不可变（文件名唯一），头部按路径缓存；postings 按需定位读取
+function openSegment(path) {
+  let seg = segmentCache.get(path);
+  if (seg) return seg;
+  const fd = openSync(path, "r");
+  try {
+    const size = Buffer.allocUnsafe(4);
+    readSync(fd, size, 0, 4, 0);
+    const json = Buffer.allocUnsafe(size.readUInt32LE(0));
+    readSync(fd, json, 0, json.length, 4);
+    seg = { path, dataStart: 4 + json.length, ...JSON.parse(json.toString("utf-8")) };
+  } finally {
+    closeSync(fd);
+  }
+  if (segmentCache.size >= SEGMENT_CACHE_SIZE) segmentCache.delete(segmentCache.keys().next().value);
+  segmentCache.set(path, seg);
+  return seg;
+}
+
+function readPostingBytes(seg, fd, i) {
+  const buf = Buffer.allocUnsafe(seg.entries[i * 4 + 1]);
+  readSync(fd, buf, 0, buf.length, seg.dataStart + seg.entries[i * 4]);
+  return buf;
+}
+
+function decodePostings(buf, count) {
+  const lines = new Uint32Array(count);
+  const pos = { at: 0 };
+  let line = 0;
+  for (let i = 0; i < count; i++) {
+    line += readVarint(buf, pos);
+    lines[i] = line;
+  }
+  return lines;
+}
+
+// 合并相邻两段（a 在前）：同一个词的 postings 直接拼接，只需重写 b 的首个差值
+function mergeSegments(path, a, b) {
+  const bufA = readFileSync(a.path);
+  const bufB = readFileSync(b.path);
+  const terms = [];
+  const entries = [];
+  const out = new ByteWriter(bufA.length + bufB.length);
+  const copy = (seg, buf, i, prevLast) => {
+    const start = seg.dataStart + seg.entries[i * 4];
+    const bytes = buf.subarray(start, start + seg.entries[i * 4 + 1]);
+    if (prevLast === null) return out.bytes(bytes);
+    const pos = { at: 0 };
+    const first = readVarint(bytes, pos);
+    out.varint(first - prevLast);
+    out.bytes(bytes.subarray(pos.at));
+  };
+
+  let i = 0;
+  let j = 0;
+  while (i < a.terms.length || j < b.terms.length) {
+    const ta = a.terms[i];
+    const tb = b.terms[j];
+    const start = out.length;
+    if (j >= b.terms.length || (i < a.terms.length && ta < tb)) {
+      copy(a, bufA, i, null);
+      terms.push(ta);
+      entries.push(start, out.length - start, a.entries[i * 4 + 2], a.entries[i * 4 + 3]);
+      i++;
+    } else if (i >= a.terms.length || tb < ta) {
+      copy(b, bufB, j, null);
+      terms.push(tb);
+      entries.push(start, out.length - start, b.entries[j * 4 + 2], b.entries[j * 4 + 3]);
+      j++;
+    } else {
+      copy(a, bufA, i, null);
+      copy(b, bufB, j, a.entries[i * 4 + 3]);
+      terms.push(ta);
+      entries.push(start, out.length - start, a.entries[i * 4 + 2] + b.entries[j * 4 + 2], b.entries[j * 4 + 3]);
+      i++;
+      j++;
+    }
+  }
+
+  writeSegmentFile(
+    path,
+    {
+      firstLine: a.firstLine,
+      lastLine: b.lastLine,
+      terms,
+      entries,
+      blockLines: a.blockLines.concat(b.blockLines),
+      blockOffsets: a.blockOffsets.concat(b.blockOffsets),
+    },
+    out.buf.subarray(0, out.length),
+  );
+}
+
+// ============ 增量更新 ============
+
+function loadManifest(dir, logPath, stat) {
+  const path = join(dir, "manifest.json");
+  if (!existsSync(path)) return null;
+  try {
+    const rec = JSON.parse(readFileSync(path, "utf-8"));
+    const valid =
+      rec.version === INDEX_VERSION &&
+      rec.path === logPath &&
+      stat.size >= rec.size &&
+      stat.size >= rec.offset &&
+      (stat.size > rec.size || stat.mtimeMs === rec.mtime) &&
+      ((stat.size === rec.size && stat.mtimeMs === rec.mtime) || matchesLogFingerprint(logPath, rec, rec.offset));
+    return valid ? rec : null;
+  } catch {
+    return null;
+  }
+}
+
+function ensureIndexDir(indexDir) {
+  if (existsSync(indexDir)) return true;
+  // 默认位置在日志目录（或 RSPO_STATE_DIR）下：该目录本身不存在时不建索引
+  if (!existsSync(dirname(indexDir))) return false;
+  try {
+    mkdirSync(indexDir);
+    return true;
+  } catch {
+    return false;
+  }
+}
+
+// 新段与前一段同一量级时合并，使段的大小从旧到新递减、段数保持 O(log n)
+function compactSegments(dir, manifest) {
+  const segs = manifest.segments;
+  while (segs.length >= 2) {
+    const b = segs[segs.length - 1];
+    const a = segs[segs.length - 2];
+    const linesA = a.lastLine - a.firstLine + 1;
+    const linesB = b.lastLine - b.firstLine + 1;
+    if (linesB * 4 < linesA || linesA + linesB > MAX_MERGED_LINES) break;
+    const file = `${manifest.next++}.seg`;
+    mergeSegments(join(dir, file), openSegment(join(dir, a.file)), openSegment(join(dir, b.file)));
+    segs.splice(-2, 2, { file, firstLine: a.firstLine, lastLine: b.lastLine });
+    rmSync(join(dir, a.file), { force: true });
+    rmSync(join(dir, b.file), { force: true });
+  }
+}
+
+// 把索引扩展到日志末尾（只处理以换行结束的完整行），返回清单 { lines, offset, segments, ... }；
+// 日志被截断或重写时整体重建。无法写入索引目录时返回 null。
+// create 为 false 时只扩展已有的有效索引，没有（或已失效）时返回 null 而不新建。
+export function updateSearchIndex(logPath, { indexDir = getSearchIndexDir(), create = true } = {}) {
+  if (!existsSync(logPath)) return null;
+  if (!create && !existsSync(indexDir)) return null;
+  if (!ensureIndexDir(indexDir)) return null;
+  const dir = join(indexDir, basename(logPath));
+  const stat = statLog(logPath);
+  let manifest = loadManifest(dir, logPath, stat);
+  if (!manifest && !create) return null;
+  if (manifest && manifest.size === stat.size) return { ...manifest, dir };
+
+  if (!manifest) {
+    rmSync(dir, { recursive: true, force: true });
+    manifest = { version: INDEX_VERSION, path: logPath, size: 0, mtime: 0, lines: 0, offset: 0, next: 0, segments: [] };
+  }
+  try {
+    mkdirSync(dir, { recursive: true });
+  } catch {
+    return null;
+  }
+
+  let pending = null;
+  const flush = () => {
+    if (!pending) return;
+    const file = `${manifest.next++}.seg`;
+    writeSegment(join(dir, file), pending);
+    manifest.segments.push({ file, firstLine: pending.firstLine, lastLine: pending.lastLine });
+    compactSegments(dir, manifest);
+    pending = null;
+  };
+
+  for (const { text, lineNum, offset, next } of readLogLines(logPath, {
+    startOffset: manifest.offset,
+    startLine: manifest.lines + 1,
+  })) {
+    if (next === null) break;
+    if (!pending) pending = { firstLine: lineNum, lastLine: lineNum, postings: new Map(), blockLines: [], blockOffsets: [] };
+    if ((lineNum - pending.firstLine) % BLOCK_LINES === 0) {
+      pending.blockLines.push(lineNum);
+      pending.blockOffsets.push(offset);
+    }
+    pending.lastLine = lineNum;
+    manifest.lines = lineNum;
+    manifest.offset = next;
+
+    const line = text.trim();
+    const catStart = locateLogCategory(line);
+    const entry = catStart === -1 ? null : parseLogLineAt(line, catStart, lineNum);
+    if (entry) {
+      forEachTerm(entry.message, (term) => {
+        const list = pending.postings.get(term);
+        if (!list) pending.postings.set(term, [lineNum]);
+        else if (list[list.length - 1] !== lineNum) list.push(lineNum);
+      });
+    }
+    if (lineNum - pending.firstLine + 1 >= SEGMENT_LINES) flush();
+  }
+  flush();
+
+  manifest.size = stat.size;
+  manifest.mtime = stat.mtimeMs;
+  Object.assign(manifest, readLogFingerprint(logPath, manifest.offset));
+  try {
+    writeFileAtomic(join(dir, "manifest.json"), JSON.stringify(manifest));
+  } catch {
+    return null;
+  }
+  return { ...manifest, dir };
+}
+
+// ============ 查询 ============
+
+function lowerBound(arr, value) {
+  let lo = 0;
+  let hi = arr.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (arr[mid] < value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+function matchingTerms(terms, { term, mode }) {
+  if (mode === "exact") {
+    const i = lowerBound(terms, term);
+    return terms[i] === term ? [i] : [];
+  }
+  const found = [];
+  if (mode === "prefix") {
+    for (let i = lowerBound(terms, term); i < terms.length && terms[i].startsWith(term); i++) found.push(i);
+  } else {
+    const test = mode === "suffix" ? (t) => t.endsWith(term) : (t) => t.includes(term);
+    for (let i = 0; i < terms.length; i++) if (test(terms[i])) found.push(i);
+  }
+  return found;
+}
+
+function unionPostings(seg, fd, ids) {
+  if (ids.length === 1) return decodePostings(readPostingBytes(seg, fd, ids[0]), seg.entries[ids[0] * 4 + 2]);
+  return unionLines(ids.map((i) => decodePostings(readPostingBytes(seg, fd, i), seg.entries[i * 4 + 2])));
+}
+
+// 多个递增行号数组的并集（去重、递增）
+function unionLines(parts) {
+  const all = new Uint32Array(parts.reduce((n, p) => n + p.length, 0));
+  let at = 0;
+  for (const p of parts) {
+    all.set(p, at);
+    at += p.length;
+  }
+  all.sort();
+  let n = 0;
+  for (let i = 0; i < all.length; i++) if (n === 0 || all[i] !== all[n - 1]) all[n++] = all[i];
+  return all.subarray(0, n);
+}
+
+function intersect(a, b) {
+  if (a.length > b.length) [a, b] = [b, a];
+  const out = new Uint32Array(a.length);
+  let n = 0;
+  if (a.length * 16 < b.length) {
+    for (const v of a) {
+      const i = lowerBound(b, v);
+      if (b[i] === v) out[n++] = v;
+    }
+  } else {
+    let j = 0;
+    for (const v of a) {
+      while (j < b.length && b[j] < v) j++;
+      if (b[j] === v) out[n++] = v;
+    }
+  }
+  return out.subarray(0, n);
+}
+
+const MODE_COST = { exact: 0, prefix: 1, suffix: 2, substring: 2 };
+
+function segmentCandidates(seg, plan) {
+  const fd = openSync(seg.path, "r");
+  try {
+    let result = null;
+    for (const c of plan) {
+      if (result && (result.length === 0 || (result.length <= ENOUGH_CANDIDATES && MODE_COST[c.mode] > 0))) break;
+      const postings = unionPostings(seg, fd, matchingTerms(seg.terms, c));
+      result = result ? intersect(result, postings) : postings;
+    }
+    return result;
+  } finally {
+    closeSync(fd);
+  }
+}
+
+// 索引覆盖范围内可能匹配 pattern（字符串或字符串数组，数组时为各模式候选行的并集）的行：{ lines: Uint32Array, indexedLines, indexedOffset, blocks }；
+// 无法利用索引或候选行太多（收窄效果不足）时返回 null。indexedLines 之后新增的行不在索引内，需要顺序扫描。
+export function findCandidateLines(logPath, pattern, { indexDir = getSearchIndexDir(), create = true } = {}) {
+  const plans = (Array.isArray(pattern) ? pattern : [pattern]).map(planIndexQuery);
+  if (plans.length === 0 || plans.some((plan) => !plan)) return null;
+  const manifest = updateSearchIndex(logPath, { indexDir, create });
+  if (!manifest) return null;
+
+  for (const plan of plans) plan.sort((a, b) => MODE_COST[a.mode] - MODE_COST[b.mode]);
+  const parts = [];
+  let blockLines = [];
+  let blockOffsets = [];
+  for (const { file } of manifest.segments) {
+    const seg = openSegment(join(manifest.dir, file));
+    parts.push(plans.length === 1 ? segmentCandidates(seg, plans[0]) : unionLines(plans.map((plan) => segmentCandidates(seg, plan))));
+    blockLines = blockLines.concat(seg.blockLines);
+    blockOffsets = blockOffsets.concat(seg.blockOffsets);
+  }
+  const total = parts.reduce((n, p) => n + p.length, 0);
+  if (total > manifest.lines * MAX_CANDIDATE_RATIO) return null;
+  const lines = new Uint32Array(total);
+  let at = 0;
+  for (const p of parts) {
+    lines.set(p, at);
+    at += p.length;
+  }
+  return { lines, indexedLines: manifest.lines, indexedOffset: manifest.offset, blocks: { blockLines, blockOffsets } };
+}
+
+// 只读取候选行（经块偏移表直接定位），再顺序扫描索引之后追加的行。
+// visit(text, lineNum, state, here) 与 scanLogLines 相同：返回 false 时提前结束，该行视为未读；
+// 返回下次继续读取的位置 { offset, line, state }。
+export function scanCandidateLines(logPath, candidates, afterLine, visit) {
+  const { lines, indexedLines, indexedOffset, blocks } = candidates;
+  const ranges = buildGameStateIndex(logPath);
+  const starts = ranges.map((r) => r.startLine);
+  const stateAt = (lineNum) => {
+    const i = lowerBound(starts, lineNum + 1) - 1;
+    return lineNum < 1 || i < 0 ? "Edit" : ranges[i].state;
+  };
+  const here = { offset: 0, line: 0, state: "Edit" };
+  const visitLine = ({ text, lineNum, offset }) => {
+    here.offset = offset;
+    here.line = lineNum;
+    here.state = stateAt(lineNum - 1);
+    return visit(text, lineNum, stateAt(lineNum), here);
+  };
+
+  const source = openLogSource(logPath);
+  try {
+    let reader = null;
+    let current = null;
+    for (let k = afterLine ? lowerBound(lines, afterLine + 1) : 0; k < lines.length; k++) {
+      const target = lines[k];
+      // 目标不在当前读取位置之后的同一块内时重新定位
+      if (!current || current.lineNum >= target || target - current.lineNum > BLOCK_LINES) {
+        const b = lowerBound(blocks.blockLines, target + 1) - 1;
+        reader = readLogLines(logPath, { startOffset: blocks.blockOffsets[b], startLine: blocks.blockLines[b], chunkSize: 8192, source });
+        current = null;
+      }
+      while (!current || current.lineNum < target) {
+        const { value, done } = reader.next();
+        // 求出候选行之后日志被截断或替换：读到文件末尾仍未到达候选行时返回已读取的部分
+        if (done) return { ...here };
+        current = value;
+      }
+      if (visitLine(current) === false) return { ...here };
+    }
+
+    const from = afterLine && afterLine > indexedLines ? afterLine : indexedLines;
+    Object.assign(here, { offset: indexedOffset, line: indexedLines + 1, state: stateAt(indexedLines) });
+    for (const line of readLogLines(logPath, { startOffset: indexedOffset, startLine: indexedLines + 1, source })) {
+      if (line.lineNum > from && visitLine(line) === false) break;
+      if (line.next !== null) Object.assign(here, { offset: line.next, line: line.lineNum + 1, state: stateAt(line.lineNum) });
+    }
+    return { ...here };
+  } finally {
+    source.close();
+  }
+}
+
+// 与 searchLogsFromLine 结果一致（pattern 同样可为字符串数组），但先用倒排索引收窄候选行；
+// 正则无法提取字面量、需要过滤统计或索引不可用时退回顺序扫描。
+// 游标按行号续读（候选行经块偏移表定位），因 beforeLine / 时间窗口提前结束时指向的行可能与顺序扫描不同，但续读结果相同。
+// createIndex 为 false 时只使用已有的索引（增量扩展到日志末尾），不为尚未建索引的日志新建。
+export function searchLogsIndexed(
+  logPath,
+  pattern,
+  {
+    cursor = null,
+    count = true,
+    afterLine = null,
+    beforeLine = null,
+    startDate = null,
+    endDate = null,
+    timestamps = false,
+    categories = null,
+    applyFilter = true,
+    runContext = null,
+    includeContext = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    indexDir = getSearchIndexDir(),
+    createIndex = true,
+  } = {},
+) {
+  const options = {
+    cursor,
+    count,
+    afterLine,
+    beforeLine,
+    startDate,
+    endDate,
+    timestamps,
+    categories,
+    applyFilter,
+    runContext,
+    includeContext,
+    filterRules,
+    filterStats,
+  };
+  const pos = cursor && existsSync(logPath) ? decodeLogCursor(logPath, cursor) : null;
+  const candidates =
+    filterStats || !existsSync(logPath) || (cursor && !pos)
+      ? null
+      : findCandidateLines(logPath, pattern, { indexDir, create: createIndex });
+  if (!candidates) return searchLogsFromLine(logPath, pattern, options);
+
+  const multi = Array.isArray(pattern);
+  const patterns = multi ? pattern : [pattern];
+  const search = compileSearchPatterns(patterns);
+  if (search.error) return search;
+  const match = createLogLineMatcher({
+    categories,
+    range: compileTimeRange(startDate, endDate),
+    applyFilter,
+    filterRules,
+    regex: search.any,
+  });
+  const textCollector = createTextCollector({ timestamps, includeContext, lineNumbers: true });
+  const collector = multi ? createPatternCollector(textCollector, patterns, search.which) : textCollector;
+
+  let pageEnd = null;
+  const from = pos ? Math.max(afterLine ?? 0, pos.line - 1) : afterLine;
+  const next = scanCandidateLines(logPath, candidates, from, (text, lineNum, state, here) => {
+    if (beforeLine !== null && lineNum >= beforeLine) return false;
+    const entry = match(text, lineNum);
+    if (entry === PAST_TIME_RANGE) return false;
+    if (!entry) return;
+    const ctx = getRunContextForState(state);
+    if (runContext && ctx !== runContext) return;
+    if (!collector.add(entry, ctx) && !pageEnd) {
+      pageEnd = { ...here };
+      if (!count) return false;
+    }
+  });
+
+  const counted = count || !pageEnd;
+  const { logs, startLine, lastLine, returned, remaining, hasMore } = textCollector.result();
+  const result = {
+    logs,
+    startLine,
+    lastLine,
+    matchCount: returned,
+    remaining: counted ? remaining : null,
+    hasMore,
+    cursor: encodeLogCursor(logPath, pageEnd || next),
+  };
+  if (multi) result.patterns = collector.result(counted);
+  return result;
+}
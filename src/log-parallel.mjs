@@ -0,0 +1,500 @@
+import { Worker, isMainThread, parentPort, workerData } from "node:worker_threads";
+import { openSync, readSync, closeSync, statSync, existsSync } from "node:fs";
+import os from "node:os";
+import { compileRuleSet, summarizeFilterStats, DEFAULT_RULE_SET } from "./log-filter.mjs";
+import { readLogLines, readLogLineRanges } from "./log-reader.mjs";
+import { findCandidateLines, scanCandidateLines } from "./log-index.mjs";
+import { isCompressedLog } from "./log-compress.mjs";
+import {
+  MAX_OUTPUT_BYTES,
+  PAST_TIME_RANGE,
+  createLogLineMatcher,
+  createTextCollector,
+  createErrorsCollector,
+  errorSignature,
+  errorLocation,
+  compileSearchPattern,
+  compileSearchPatterns,
+  compileTimeRange,
+  encodeLogCursor,
+  getRunContextForState,
+  createGameStateDetector,
+  parseLogLine,
+  PLACE_PATH_RE,
+  PLACE_SEARCH_LINES,
+  findErrors,
+  searchLogsFromLine,
+} from "./log-utils.mjs";
+
+// 并行扫描：把大日志按换行对齐切成若干字节区间，由 worker_threads 池各自跑同一条过滤管线，
+// 主线程按区间顺序合并结果，换算全局行号并补全每段开头继承的 play/edit 上下文。
+
+const WORKER_MARK = "rspo-log-worker";
+const MIN_PARALLEL_BYTES = 8 * 1024 * 1024;
+
+export function defaultWorkerCount() {
+  const cpus = typeof os.availableParallelism === "function" ? os.availableParallelism() : os.cpus().length;
+  return Math.max(1, Math.min(8, cpus - 1));
+}
+
+// 按字节均分文件，每个切分点推进到下一个换行之后，保证每段都从行首开始：[{ start, end }]
+export function splitLogRanges(logPath, parts) {
+  const { size } = statSync(logPath);
+  const bounds = [0];
+  const fd = openSync(logPath, "r");
+  try {
+    const buf = Buffer.allocUnsafe(64 * 1024);
+    for (let i = 1; i < parts; i++) {
+      let pos = Math.max(Math.floor((size * i) / parts), bounds[bounds.length - 1] + 1) - 1;
+      let boundary = size;
+      while (pos < size) {
+        const n = readSync(fd, buf, 0, buf.length, pos);
+        if (n === 0) break;
+        const nl = buf.subarray(0, n).indexOf(0x0a);
+        if (nl !== -1) {
+          boundary = pos + nl + 1;
+          break;
+        }
+        pos += n;
+      }
+      if (boundary >= size) break;
+      if (boundary > bounds[bounds.length - 1]) bounds.push(boundary);
+    }
+  } finally {
+    closeSync(fd);
+  }
+  bounds.push(size);
+  return bounds.slice(0, -1).map((start, i) => ({ start, end: bounds[i + 1] }));
+}
+
+// ============ worker 池 ============
+
+const TASKS = {};
+
+// 有界 worker 池：最多 concurrency 个线程依次领取任务，按任务顺序返回结果；
+// onResult(result, index) 在每个任务完成时立即回调（完成顺序）。
+export function runWorkerPool(tasks, concurrency = defaultWorkerCount(), onResult = null) {
+  const results = new Array(tasks.length);
+  if (tasks.length === 0) return Promise.resolve(results);
+
+  return new Promise((resolve, reject) => {
+    const workers = [];
+    let nextTask = 0;
+    let finished = 0;
+    let failed = false;
+
+    const shutdown = () => Promise.all(workers.map((w) => w.terminate()));
+
+    const dispatch = (worker) => {
+      if (nextTask >= tasks.length) return;
+      const id = nextTask++;
+      worker.postMessage({ id, task: tasks[id] });
+    };
+
+    for (let i = 0; i < Math.min(concurrency, tasks.length); i++) {
+      const worker = new Worker(new URL(import.meta.url), { workerData: { [WORKER_MARK]: true } });
+      workers.push(worker);
+      worker.on("message", ({ id, result, error }) => {
+        if (failed) return;
+        if (error) {
+          failed = true;
+          shutdown().then(() => reject(new Error(error)));
+          return;
+        }
+        results[id] = result;
+        if (onResult) onResult(result, id);
+        if (++finished === tasks.length) shutdown().then(() => resolve(results));
+        else dispatch(worker);
+      });
+      worker.on("error", (e) => {
+        if (failed) return;
+        failed = true;
+        shutdown().then(() => reject(e));
+      });
+      dispatch(worker);
+    }
+  });
+}
+
+if (!isMainThread && workerData?.[WORKER_MARK]) {
+  parentPort.on("message", ({ id, task }) => {
+    try {
+      if (!TASKS[task.kind]) throw new Error(`Unknown worker task: ${task.kind}`);
+      parentPort.postMessage({ id, result: TASKS[task.kind](task) });
+    } catch (e) {
+      parentPort.postMessage({ id, error: e.message });
+    }
+  });
+}
+
+// ============ 区间扫描 ============
+
+// patternCounts：多模式搜索时本段各模式的命中数（包括未保留的命中）
+function createBucket(groupBy, patternCount = 0) {
+  return {
+    count: 0,
+    hits: [],
+    bytes: 0,
+    groups: groupBy ? new Map() : null,
+    pending: null,
+    patternCounts: patternCount ? new Array(patternCount).fill(0) : null,
+  };
+}
+
+// offset / before（该行之前的状态，null 表示继承前面的段）用于合并后生成分页游标；
+// stack 为错误条目的堆栈帧数组，扫描过程中陆续写入；which 给出多模式搜索时命中的模式下标
+function keepHit(bucket, entry, state, before, offset, { maxHits, maxBytes, groupBy, which }) {
+  bucket.count++;
+  const patterns = which ? which(entry.message) : null;
+  if (patterns) for (const k of patterns) bucket.patternCounts[k]++;
+  if (bucket.groups) {
+    flushGroup(bucket, groupBy);
+    bucket.pending = { entry, state };
+    return;
+  }
+  // 只保留合并时可能用到的部分：错误按条数，文本按字节（格式化后的输出行只会更长），
+  // 各多保留一条，合并时第一条放不下的命中即下一页的起点
+  if (bucket.hits.length >= maxHits || bucket.bytes > maxBytes) return;
+  const { lineNum, timestamp, level, category, message, stack } = entry;
+  bucket.hits.push({ lineNum, timestamp, level, category, message, stack, state, before, offset, ...(patterns && { patterns }) });
+  bucket.bytes += Buffer.byteLength(message, "utf-8") + 1;
+}
+
+const GROUP_KEYS = {
+  signature: (entry) => errorSignature(entry.message),
+  script: (entry) => {
+    const location = errorLocation(entry);
+    return location ? `${location.script}:${location.line}` : "";
+  },
+};
+
+// groupBy：段内预先聚合，每组只回传首条命中。分组键可能取决于堆栈，上一条命中在下一条到来或段结束时才归组
+function flushGroup(bucket, groupBy) {
+  if (!bucket.pending) return;
+  const { entry, state } = bucket.pending;
+  bucket.pending = null;
+  const key = GROUP_KEYS[groupBy](entry);
+  const group = bucket.groups.get(key);
+  if (group) {
+    group.count++;
+    group.lastLine = entry.lineNum;
+    return;
+  }
+  const { lineNum, timestamp, level, category, message, stack } = entry;
+  bucket.groups.set(key, {
+    signature: key,
+    count: 1,
+    firstLine: lineNum,
+    lastLine: lineNum,
+    hit: { lineNum, timestamp, level, category, message, stack, state },
+  });
+}
+
+// search 为 compileSearchPatterns 的结果（多模式搜索），否则按单个 pattern 编译
+function createTaskMatcher(
+  { errorsOnly = false, pattern = null, categories = null, applyFilter = true, rules = null, startDate = null, endDate = null },
+  filterHits,
+  search = null,
+) {
+  return createLogLineMatcher({
+    errorsOnly,
+    categories,
+    range: compileTimeRange(startDate, endDate),
+    applyFilter,
+    filterRules: rules ? compileRuleSet(rules) : DEFAULT_RULE_SET,
+    filterHits,
+    regex: search ? search.any : pattern === null ? null : compileSearchPattern(pattern),
+  });
+}
+
+// 扫描 [start, end) 内的行，行号从 1 开始计（合并时再加上前面各段的行数）。
+// head 为本段第一次状态切换之前的命中，其上下文取决于前面的段，合并时再判断；
+// tail 中的命中已按本段内的状态过滤 runContext。
+// resume 为本段之后继续读取的位置（提前结束的行，或最后一个完整行之后），state 为 null 表示继承。
+TASKS.scanRange = function scanRange({
+  logPath,
+  start,
+  end,
+  filterStats = false,
+  runContext = null,
+  maxHits = Infinity,
+  maxBytes = Infinity,
+  groupBy = null,
+  patterns = null,
+  ...filters
+}) {
+  const filterHits = filterStats ? new Map() : null;
+  const search = patterns ? compileSearchPatterns(patterns) : null;
+  const match = createTaskMatcher(filters, filterHits, search);
+  const limits = { maxHits, maxBytes, groupBy, which: search?.which };
+  const head = createBucket(groupBy, patterns?.length);
+  const tail = createBucket(groupBy, patterns?.length);
+  let state = null;
+  let lines = 0;
+  let stopped = false;
+  const resume = { offset: start, line: 1, state: null };
+
+  const stateChange = createGameStateDetector();
+  for (const line of readLogLineRanges(logPath, { startOffset: start })) {
+    // 本段最后一条错误的堆栈可能跨过区间末尾：继续读完它（这些行不计入本段）
+    if (line.offset >= end) {
+      if (match.continueStack(line.text)) continue;
+      break;
+    }
+    lines = line.lineNum;
+    const before = state;
+    const newState = stateChange(line);
+    if (newState) state = newState;
+
+    const entry = match.acceptsBytes(line.buf, line.start, line.end) ? match(line.text, line.lineNum) : null;
+    if (entry === PAST_TIME_RANGE) {
+      Object.assign(resume, { offset: line.offset, line: line.lineNum, state: before });
+      stopped = true;
+      break;
+    }
+    if (entry) {
+      if (state === null) {
+        keepHit(head, entry, null, null, line.offset, limits);
+      } else if (!runContext || getRunContextForState(state) === runContext) {
+        keepHit(tail, entry, state, before, line.offset, limits);
+      }
+    }
+    if (line.next !== null) Object.assign(resume, { offset: line.next, line: line.lineNum + 1, state });
+    else Object.assign(resume, { offset: line.offset, line: line.lineNum, state: before });
+  }
+
+  if (groupBy) {
+    flushGroup(head, groupBy);
+    flushGroup(tail, groupBy);
+  }
+  return { lines, lastState: state, head, tail, stopped, resume, filterHits: filterHits ? [...filterHits] : null };
+};
+
+function readSessionLine(session, text, lineNum) {
+  if (session.place === null && lineNum <= PLACE_SEARCH_LINES) {
+    const m = PLACE_PATH_RE.exec(text);
+    if (m) session.place = m[1].trim();
+  }
+  if (session.started === null) {
+    const first = parseLogLine(text.trim());
+    if (first) session.started = first.timestamp;
+  }
+}
+
+// 扫描整个日志文件（跨会话搜索，每个 worker 一次处理一个文件）。
+// 同一遍读取中识别会话信息：打开的 place 文件（前 200 行内）与首个时间戳。
+// useIndex 时先用倒排索引求候选行，只读取候选行与文件开头的会话信息。
+TASKS.scanFile = function scanFile({ logPath, runContext = null, maxHits = Infinity, useIndex = false, indexDir, ...filters }) {
+  const session = { place: null, started: null };
+  const hits = [];
+  let count = 0;
+  if (!existsSync(logPath)) return { session, count, hits, missing: true };
+
+  const match = createTaskMatcher(filters, null);
+  const visit = (text, lineNum, ctx) => {
+    const entry = match(text, lineNum);
+    if (entry === PAST_TIME_RANGE) return false;
+    if (!entry || (runContext && ctx !== runContext)) return;
+    count++;
+    if (hits.length < maxHits) {
+      const { timestamp, level, category, message, stack } = entry;
+      hits.push({ line: lineNum, timestamp, level, category, context: ctx, message, stack });
+    }
+  };
+  // 错误的堆栈帧在其后陆续写入，扫描结束后去掉空堆栈
+  const done = () => {
+    for (const hit of hits) if (!hit.stack || hit.stack.length === 0) delete hit.stack;
+    return { session, count, hits, missing: false };
+  };
+
+  const candidates = useIndex && filters.pattern ? findCandidateLines(logPath, filters.pattern, { indexDir }) : null;
+  if (candidates) {
+    for (const { text, lineNum } of readLogLines(logPath)) {
+      readSessionLine(session, text, lineNum);
+      if (session.started !== null && (session.place !== null || lineNum >= PLACE_SEARCH_LINES)) break;
+    }
+    scanCandidateLines(logPath, candidates, null, (text, lineNum, state) => visit(text, lineNum, getRunContextForState(state)));
+    return done();
+  }
+
+  let state = "Edit";
+  const stateChange = createGameStateDetector();
+  for (const line of readLogLineRanges(logPath)) {
+    const { lineNum } = line;
+    const newState = stateChange(line);
+    if (newState) state = newState;
+    const sessionPending = session.started === null || (session.place === null && lineNum <= PLACE_SEARCH_LINES);
+    if (!sessionPending && !match.acceptsBytes(line.buf, line.start, line.end)) continue;
+    const text = line.text;
+    if (sessionPending) readSessionLine(session, text, lineNum);
+    if (visit(text, lineNum, getRunContextForState(state)) === false) break;
+  }
+  return done();
+};
+
+// 返回第一条未被收集的命中的位置（下一页起点），全部收集时返回 null
+function feedBucket(collector, bucket, base, inherited, contextOf) {
+  if (bucket.groups) {
+    for (const { hit, ...group } of bucket.groups.values()) {
+      const lines = { firstLine: base + group.firstLine, lastLine: base + group.lastLine };
+      collector.addGroup({ ...group, ...lines }, { ...hit, lineNum: base + hit.lineNum }, contextOf(hit));
+    }
+    return null;
+  }
+  let pageEnd = null;
+  for (const hit of bucket.hits) {
+    if (!collector.add({ ...hit, lineNum: base + hit.lineNum }, contextOf(hit)) && !pageEnd) {
+      pageEnd = { offset: hit.offset, line: base + hit.lineNum, state: hit.before ?? inherited };
+    }
+  }
+  if (bucket.patternCounts) collector.countPatterns(bucket.patternCounts);
+  collector.count(bucket.count - bucket.hits.length);
+  return pageEnd;
+}
+
+// 返回 { filterHits, cursor }：cursor 为下一页起点，没有更多命中时为扫描结束的位置
+async function scanParallel(logPath, task, collector, { runContext, workers, filterRules }) {
+  const ranges = splitLogRanges(logPath, workers);
+  const tasks = ranges.map(({ start, end }) => ({
+    kind: "scanRange",
+    logPath,
+    start,
+    end,
+    runContext,
+    rules: filterRules === DEFAULT_RULE_SET ? null : filterRules.rules,
+    ...task,
+  }));
+  const results = await runWorkerPool(tasks, workers);
+
+  const filterHits = new Map();
+  let base = 0;
+  let state = "Edit";
+  let pageEnd = null;
+  let resume = { offset: 0, line: 1, state };
+  for (const r of results) {
+    const headCtx = getRunContextForState(state);
+    const headEnd =
+      !runContext || headCtx === runContext ? feedBucket(collector, r.head, base, state, () => headCtx) : null;
+    const tailEnd = feedBucket(collector, r.tail, base, state, (hit) => getRunContextForState(hit.state));
+    pageEnd = pageEnd || headEnd || tailEnd;
+    for (const [id, n] of r.filterHits || []) filterHits.set(id, (filterHits.get(id) || 0) + n);
+    resume = { offset: r.resume.offset, line: base + r.resume.line, state: r.resume.state ?? state };
+    if (r.stopped) break;
+    if (r.lastState) state = r.lastState;
+    base += r.lines;
+  }
+  return { filterHits, cursor: encodeLogCursor(logPath, pageEnd || resume) };
+}
+
+// 小文件、指定了行号区间 / 游标、只取一页或只有一个线程时直接走顺序扫描（行号区间依赖检查点索引定位）
+function useSequential(logPath, { afterLine, beforeLine, cursor, count = true, workers, minBytes }) {
+  if (workers <= 1 || afterLine != null || beforeLine != null || cursor != null || !count) return true;
+  // 压缩归档只能按块解压，不切分区间
+  if (!existsSync(logPath) || isCompressedLog(logPath)) return true;
+  return statSync(logPath).size < minBytes;
+}
+
+export async function findErrorsParallel(
+  logPath,
+  {
+    workers = defaultWorkerCount(),
+    minBytes = MIN_PARALLEL_BYTES,
+    startDate = null,
+    endDate = null,
+    runContext = null,
+    maxErrors = 100,
+    group = false,
+    byScript = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    ...options
+  } = {},
+) {
+  const sequentialOptions = { startDate, endDate, runContext, maxErrors, group, byScript, filterRules, filterStats, ...options };
+  if (useSequential(logPath, { ...options, workers, minBytes })) return findErrors(logPath, sequentialOptions);
+
+  const collector = createErrorsCollector({ maxErrors, group, byScript });
+  const groupBy = byScript ? "script" : group ? "signature" : null;
+  const { filterHits, cursor } = await scanParallel(
+    logPath,
+    { errorsOnly: true, startDate, endDate, filterStats, groupBy, maxHits: maxErrors + 1 },
+    collector,
+    { runContext, workers, filterRules },
+  );
+  const result = { ...collector.result(), cursor };
+  if (filterStats) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+  return result;
+}
+
+// 多模式搜索时在文本收集器之外按模式汇总：worker 已在每条保留的命中上标出匹配的模式下标，
+// 并按段累计各模式的命中数（与顺序搜索的 patterns 字段相同）
+function createPatternCollector(collector, patterns) {
+  const perPattern = patterns.map((pattern) => ({ pattern, count: 0, lines: [] }));
+  return {
+    add(entry, ctx) {
+      const added = collector.add(entry, ctx);
+      if (added) for (const k of entry.patterns) perPattern[k].lines.push(entry.lineNum);
+      return added;
+    },
+    count: (n) => collector.count(n),
+    countPatterns(counts) {
+      counts.forEach((n, k) => (perPattern[k].count += n));
+    },
+    result: () => perPattern.map((p) => ({ ...p, lines: [...p.lines] })),
+  };
+}
+
+// pattern 为字符串或字符串数组（多模式，同 searchLogsFromLine）
+export async function searchLogsParallel(
+  logPath,
+  pattern,
+  {
+    workers = defaultWorkerCount(),
+    minBytes = MIN_PARALLEL_BYTES,
+    startDate = null,
+    endDate = null,
+    timestamps = false,
+    categories = null,
+    applyFilter = true,
+    runContext = null,
+    includeContext = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    ...options
+  } = {},
+) {
+  const sequentialOptions = {
+    startDate,
+    endDate,
+    timestamps,
+    categories,
+    applyFilter,
+    runContext,
+    includeContext,
+    filterRules,
+    filterStats,
+    ...options,
+  };
+  if (useSequential(logPath, { ...options, workers, minBytes })) {
+    return searchLogsFromLine(logPath, pattern, sequentialOptions);
+  }
+  const multi = Array.isArray(pattern);
+  const patterns = multi ? pattern : [pattern];
+  if (patterns.length === 0) return { error: "No search pattern given" };
+  const search = compileSearchPatterns(patterns);
+  if (search.error) return search;
+
+  const textCollector = createTextCollector({ timestamps, includeContext, lineNumbers: true });
+  const collector = multi ? createPatternCollector(textCollector, patterns) : textCollector;
+  const { filterHits, cursor } = await scanParallel(
+    logPath,
+    { ...(multi ? { patterns } : { pattern }), categories, applyFilter, startDate, endDate, filterStats, maxBytes: MAX_OUTPUT_BYTES },
+    collector,
+    { runContext, workers, filterRules },
+  );
+  const { logs, startLine, lastLine, returned, remaining, hasMore } = textCollector.result();
+  const result = { logs, startLine, lastLine, matchCount: returned, remaining, hasMore, cursor };
+  if (multi) result.patterns = collector.result();
+  if (filterStats) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+  return result;
+}
@@ -0,0 +1,157 @@
+import { openLogSource, fdLogSource } from "./log-compress.mjs";
+
+const CHUNK_SIZE = 64 * 1024;
+
+// 按固定大小分块顺序读取日志，逐行产出原始字节范围而不解码：buf[start, end) 为行内容（不含换行），
+// 行号与 content.split("\n") 一致（从 1 开始），offset 为该行首字节在文件中的位置，
+// next 为下一行的起始位置（行尚未以换行结束时为 null，例如 Studio 正在写入的末行）。
+// 产出的对象与 buf 都会被复用，只在当前迭代内有效；text 在访问时才解码。
+// 压缩归档（.gz / .zst，见 log-compress.mjs）透明解压，偏移均为原始日志中的位置。
+// 传入 fd 或 source（openLogSource）时复用已打开的文件且不关闭（follow 模式长期持有同一个 fd）。
+export function* readLogLineRanges(
+  logPath,
+  { startOffset = 0, startLine = 1, chunkSize = CHUNK_SIZE, fd = null, source: openSource = null } = {},
+) {
+  const source = openSource ?? (fd !== null ? fdLogSource(fd) : openLogSource(logPath));
+  try {
+    const chunk = Buffer.allocUnsafe(chunkSize);
+    const line = {
+      buf: chunk,
+      start: 0,
+      end: 0,
+      lineNum: startLine,
+      offset: startOffset,
+      next: null,
+      get text() {
+        return this.buf.toString("utf-8", this.start, this.end);
+      },
+    };
+    let position = startOffset;
+    let lineNum = startLine;
+    let lineOffset = startOffset;
+    let carry = null;
+
+    while (true) {
+      const bytesRead = source.read(chunk, chunkSize, position);
+      if (bytesRead === 0) break;
+      position += bytesRead;
+
+      let buf = chunk.subarray(0, bytesRead);
+      if (carry) {
+        buf = Buffer.concat([carry, buf]);
+        carry = null;
+      }
+
+      line.buf = buf;
+      let start = 0;
+      let nl;
+      while ((nl = buf.indexOf(0x0a, start)) !== -1) {
+        const next = lineOffset + nl + 1 - start;
+        line.start = start;
+        line.end = nl;
+        line.lineNum = lineNum;
+        line.offset = lineOffset;
+        line.next = next;
+        yield line;
+        lineOffset = next;
+        lineNum++;
+        start = nl + 1;
+      }
+      // 未结束的行跨块保留（chunk 会被复用，必须拷贝）
+      if (start < buf.length) carry = Buffer.from(buf.subarray(start));
+    }
+
+    if (carry) {
+      Object.assign(line, { buf: carry, start: 0, end: carry.length, lineNum, offset: lineOffset, next: null });
+      yield line;
+    }
+  } finally {
+    if (!openSource) source.close();
+  }
+}
+
+// 逐行产出解码后的独立对象 { text, lineNum, offset, next }，字段与选项同 readLogLineRanges。
+// 需要保留或解码每一行时使用；大多数行会被丢弃的扫描用 readLogLineRanges 只解码保留的行。
+export function* readLogLines(
+  logPath,
+  { startOffset = 0, startLine = 1, chunkSize = CHUNK_SIZE, fd = null, source: openSource = null } = {},
+) {
+  const source = openSource ?? (fd !== null ? fdLogSource(fd) : openLogSource(logPath));
+  try {
+    const chunk = Buffer.allocUnsafe(chunkSize);
+    let position = startOffset;
+    let lineNum = startLine;
+    let lineOffset = startOffset;
+    let carry = null;
+
+    while (true) {
+      const bytesRead = source.read(chunk, chunkSize, position);
+      if (bytesRead === 0) break;
+      position += bytesRead;
+
+      let buf = chunk.subarray(0, bytesRead);
+      if (carry) {
+        buf = Buffer.concat([carry, buf]);
+        carry = null;
+      }
+
+      let start = 0;
+      let nl;
+      while ((nl = buf.indexOf(0x0a, start)) !== -1) {
+        const next = lineOffset + nl + 1 - start;
+        yield { text: buf.toString("utf-8", start, nl), lineNum, offset: lineOffset, next };
+        lineOffset = next;
+        lineNum++;
+        start = nl + 1;
+      }
+      // 未结束的行跨块保留（chunk 会被复用，必须拷贝）
+      if (start < buf.length) carry = Buffer.from(buf.subarray(start));
+    }
+
+    if (carry) yield { text: carry.toString("utf-8"), lineNum, offset: lineOffset, next: null };
+  } finally {
+    if (!openSource) source.close();
+  }
+}
+
+// 从 endOffset（默认文件末尾）向前按块读取，逐行倒序产出 { text, offset, next }，不需要读取前面的内容。
+// 行号未知（由调用方从已知的行数倒数）；endOffset 处若不是换行，末行视为尚未写完（next 为 null）。
+export function* readLogLinesReverse(
+  logPath,
+  { endOffset = null, chunkSize = CHUNK_SIZE, fd = null, source: openSource = null } = {},
+) {
+  const source = openSource ?? (fd !== null ? fdLogSource(fd) : openLogSource(logPath));
+  try {
+    const end = endOffset ?? source.size;
+    if (end === 0) return;
+
+    const chunk = Buffer.allocUnsafe(chunkSize);
+    source.read(chunk, 1, end - 1);
+    // position 之前是尚未产出的内容；next 为当前（最靠后的未产出）行之后一行的起始
+    let next = chunk[0] === 0x0a ? end : null;
+    let position = next === null ? end : end - 1;
+    let carry = null;
+
+    while (position > 0) {
+      const start = Math.max(0, position - chunkSize);
+      const bytesRead = source.read(chunk, position - start, start);
+      let buf = chunk.subarray(0, bytesRead);
+      if (carry) buf = Buffer.concat([buf, carry]);
+      position = start;
+
+      let stop = buf.length;
+      let nl;
+      while (stop > 0 && (nl = buf.lastIndexOf(0x0a, stop - 1)) !== -1) {
+        yield { text: buf.toString("utf-8", nl + 1, stop), offset: start + nl + 1, next };
+        next = start + nl + 1;
+        stop = nl;
+      }
+      // 行首还在更前面的块里（chunk 会被复用，必须拷贝）
+      carry = Buffer.from(buf.subarray(0, stop));
+    }
+
+    yield { text: carry ? carry.toString("utf-8") : "", offset: 0, next };
+  } finally {
+    if (!openSource) source.close();
+  }
+}
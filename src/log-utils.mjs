@@ -1,7 +1,9 @@
-import { readFileSync, existsSync, readdirSync, unlinkSync, statSync } from "node:fs";
+import { readFileSync, writeFileSync, existsSync, readdirSync, unlinkSync, rmSync, statSync, mkdirSync, renameSync } from "node:fs";
 import { join, basename } from "node:path";
 import os from "node:os";
-import { shouldExclude } from "./log-filter.mjs";
+import { matchExcludeRule, summarizeFilterStats, DEFAULT_RULE_SET } from "./log-filter.mjs";
+import { readLogLines, readLogLineRanges, readLogLinesReverse } from "./log-reader.mjs";
+import { openLogSource, statLog, isCompressedLog, compressLog, removeLogArchive, LOG_COMPRESSION_FORMATS } from "./log-compress.mjs";
 
 const LOG_DIR =
   process.platform === "win32"
@@ -12,26 +14,110 @@ const LOG_DIR =
 
 export { LOG_DIR };
 
-const DEFAULT_CATEGORIES = ["FLog::Output", "FLog::Warning", "FLog::Error"];
+// 派生数据（检查点索引、全文倒排索引、命名游标）的存放目录：默认即 LOG_DIR，
+// 可用环境变量 RSPO_STATE_DIR 指向其他目录（测试时指向临时目录，不写入真实的 Roblox 日志目录）。每次调用时读取。
+export function getLogStateDir() {
+  return process.env.RSPO_STATE_DIR || LOG_DIR;
+}
+
+export const DEFAULT_CATEGORIES = ["FLog::Output", "FLog::Warning", "FLog::Error"];
 const ERROR_CATEGORIES = ["FLog::Warning", "FLog::Error", "DFLog::HttpTraceError"];
 
-const LOG_LINE_RE =
-  /^(\d{4}-\d{2}-\d{2}T[\d:.]+Z),[\d.]+,[a-f0-9]+,\d+(?:,(\w+))?\s*\[([^\]]+)\]\s*(.*)$/;
+// ============ 日志行解析 ============
+// Studio 日志格式固定：<ISO 时间戳>,<秒数>,<线程>,<序号>[,<级别>] [<类别>] <消息>
+// 头部字段不含 "["，行内第一个 "[" 即类别起点。扫描时先 indexOf 定位类别并按类别淘汰，
+// 只有保留下来的行才逐字符校验头部并切出时间戳、级别、消息（parseLogLineAt），不使用正则。
 
-export function parseLogLine(line, lineNum = 0) {
-  const m = LOG_LINE_RE.exec(line);
-  if (!m) return null;
+function isSpace(c) {
+  return c === 32 || (c >= 9 && c <= 13) || c === 0xa0 || c === 0xfeff;
+}
+
+// 返回类别首字符下标，没有类别返回 -1
+export function locateLogCategory(line) {
+  const open = line.indexOf("[");
+  return open === -1 ? -1 : open + 1;
+}
+
+// 不切分字符串，直接比较 catStart 处的类别是否在 categories 中
+export function hasLogCategory(line, catStart, categories) {
+  for (let k = 0; k < categories.length; k++) {
+    const cat = categories[k];
+    if (line.charCodeAt(catStart + cat.length) === 93 && line.startsWith(cat, catStart)) return true;
+  }
+  return false;
+}
+
+function isDigitCode(c) {
+  return (c - 48) >>> 0 <= 9;
+}
+
+// 校验 catStart 之前的头部并构造条目，格式不符返回 null。
+// catStart - 1 处必为 "["，它不满足任何字段的字符集，各循环都会在此之前停下，无需再检查行长。
+export function parseLogLineAt(line, catStart, lineNum = 0) {
+  if (catStart < 12) return null;
+  for (let k = 0; k < 10; k++) {
+    const c = line.charCodeAt(k);
+    if (k === 4 || k === 7 ? c !== 45 : !isDigitCode(c)) return null;
+  }
+  if (line.charCodeAt(10) !== 84) return null; // T
+
+  // 时间部分 [\d:.]+Z,
+  let c;
+  let i = 11;
+  while (((c = line.charCodeAt(i)) - 48) >>> 0 <= 10 || c === 46) i++;
+  if (i === 11 || c !== 90 || line.charCodeAt(i + 1) !== 44) return null;
+  const tsEnd = i + 1;
+
+  // 秒数 [\d.]+,
+  let j = tsEnd + 1;
+  while (isDigitCode((c = line.charCodeAt(j))) || c === 46) j++;
+  if (j === tsEnd + 1 || c !== 44) return null;
+
+  // 线程 [a-f0-9]+,
+  i = ++j;
+  while (isDigitCode((c = line.charCodeAt(j))) || (c - 97) >>> 0 <= 5) j++;
+  if (j === i || c !== 44) return null;
+
+  // 序号 \d+
+  i = ++j;
+  while (isDigitCode((c = line.charCodeAt(j)))) j++;
+  if (j === i) return null;
+
+  // 可选级别 ,\w+
+  let level = "Info";
+  if (c === 44) {
+    i = ++j;
+    while (isDigitCode((c = line.charCodeAt(j))) || ((c | 32) - 97) >>> 0 <= 25 || c === 95) j++;
+    if (j === i) return null;
+    level = line.slice(i, j);
+  }
+
+  // 空白后必须紧接类别的 "["
+  while (j < catStart - 1 && isSpace(line.charCodeAt(j))) j++;
+  if (j !== catStart - 1) return null;
+  const catEnd = line.indexOf("]", catStart);
+  if (catEnd <= catStart) return null;
+
+  j = catEnd + 1;
+  while (j < line.length && isSpace(line.charCodeAt(j))) j++;
   return {
-    timestamp: m[1],
-    level: m[2] || "Info",
-    category: m[3],
-    message: m[4],
-    raw: line,
+    timestamp: line.slice(0, tsEnd),
+    level,
+    category: line.slice(catStart, catEnd),
+    message: line.slice(j),
     lineNum,
     runContext: "unknown",
   };
 }
 
+export function parseLogLine(line, lineNum = 0) {
+  const catStart = locateLogCategory(line);
+  if (catStart === -1) return null;
+  const entry = parseLogLineAt(line, catStart, lineNum);
+  if (entry) entry.raw = line;
+  return entry;
+}
+
 export function parseTimestamp(str) {
   if (!str) return null;
   const formats = [
@@ -52,25 +138,44 @@ export function parseTimestamp(str) {
   return null;
 }
 
-export function isTimestampInRange(timestamp, startDate = null, endDate = null) {
-  if (!startDate && !endDate) return true;
-  const ts = parseTimestamp(timestamp);
-  if (!ts) return false;
+// 把 startDate / endDate 预先解析为规范 ISO 字符串（YYYY-MM-DDTHH:MM:SS.mmmZ），之后逐行只做字符串比较。
+// 仅有日期的 endDate 包含当天全部时间；无法解析的边界视为不限。两者都未提供时返回 null。
+export function compileTimeRange(startDate = null, endDate = null) {
+  if (!startDate && !endDate) return null;
+  const start = startDate ? parseTimestamp(startDate) : null;
+  const end = endDate ? parseTimestamp(endDate) : null;
+  if (end && endDate.length === 10) end.setUTCHours(23, 59, 59, 999);
+  return { start: start ? start.toISOString() : null, end: end ? end.toISOString() : null };
+}
 
-  if (startDate) {
-    const start = parseTimestamp(startDate);
-    if (start && ts < start) return false;
-  }
-  if (endDate) {
-    let end = parseTimestamp(endDate);
-    if (end) {
-      if (endDate.length === 10) {
-        end = new Date(Date.UTC(end.getUTCFullYear(), end.getUTCMonth(), end.getUTCDate(), 23, 59, 59, 999));
-      }
-      if (ts > end) return false;
-    }
+// Studio 写出的时间戳本身就是规范格式，直接参与比较；其他写法先规范化
+function toComparableTimestamp(timestamp) {
+  if (
+    timestamp &&
+    timestamp.length === 24 &&
+    timestamp.charCodeAt(13) === 58 &&
+    timestamp.charCodeAt(16) === 58 &&
+    timestamp.charCodeAt(19) === 46 &&
+    timestamp.charCodeAt(23) === 90
+  ) {
+    return timestamp;
   }
-  return true;
+  const ts = parseTimestamp(timestamp);
+  return ts ? ts.toISOString() : null;
+}
+
+// 返回 -1（早于窗口或无法解析）、0（在窗口内）、1（晚于窗口）
+export function timeRangePosition(timestamp, range) {
+  const ts = toComparableTimestamp(timestamp);
+  if (!ts) return -1;
+  if (range.start && ts < range.start) return -1;
+  if (range.end && ts > range.end) return 1;
+  return 0;
+}
+
+export function isTimestampInRange(timestamp, startDate = null, endDate = null) {
+  const range = compileTimeRange(startDate, endDate);
+  return !range || timeRangePosition(timestamp, range) === 0;
 }
 
 export function isErrorLog(entry) {
@@ -80,163 +185,1093 @@ export function isErrorLog(entry) {
   return false;
 }
 
-const STATE_RE = /Setting StudioGameStateType to StudioGameStateType_(\w+)/;
+// isErrorLog 的未切分版本：错误类别，或级别为 Warning / Error（级别在 "[" 之前最后一个逗号之后）
+export function isErrorLogLine(line, catStart) {
+  if (hasLogCategory(line, catStart, ERROR_CATEGORIES)) return true;
+  const comma = line.lastIndexOf(",", catStart);
+  if (comma === -1) return false;
+  const lvl = line.slice(comma + 1, catStart - 1).trimEnd().toLowerCase();
+  return lvl === "warning" || lvl === "error";
+}
 
-export function buildGameStateIndex(logPath) {
-  if (!existsSync(logPath)) return [];
-  const ranges = [];
-  let currentState = "Edit";
-  let currentStartLine = 1;
-  let currentStartTime = "";
+// 字节级版本：直接在 readLogLineRanges 产出的原始 Buffer 上判断 buf[start, end) 这一行，不解码。
+// 用于在解码前淘汰绝大多数行；只有无法确定时才返回 true，交给解码后的完整管线判断。
+const toBytes = (categories) => categories.map((cat) => [...Buffer.from(cat)]);
+const ERROR_CATEGORY_BYTES = toBytes(ERROR_CATEGORIES);
+
+function locateLogCategoryBytes(buf, start, end) {
+  const open = buf.indexOf(91, start);
+  return open === -1 || open >= end ? -1 : open + 1;
+}
+
+function hasLogCategoryBytes(buf, catStart, end, categoryBytes) {
+  for (let k = 0; k < categoryBytes.length; k++) {
+    const cat = categoryBytes[k];
+    const close = catStart + cat.length;
+    if (close >= end || buf[close] !== 93) continue;
+    let i = 0;
+    while (i < cat.length && buf[catStart + i] === cat[i]) i++;
+    if (i === cat.length) return true;
+  }
+  return false;
+}
+
+// 级别按 ASCII 忽略大小写比较；含非 ASCII 字节时无法确定，视为可能是错误
+function isErrorLevelBytes(buf, from, to) {
+  while (to > from && (buf[to - 1] === 32 || (buf[to - 1] >= 9 && buf[to - 1] <= 13))) to--;
+  const len = to - from;
+  if (len !== 5 && len !== 7) {
+    for (let i = from; i < to; i++) if (buf[i] >= 0x80) return true;
+    return false;
+  }
+  const word = len === 5 ? "error" : "warning";
+  for (let i = 0; i < len; i++) {
+    const c = buf[from + i];
+    if (c >= 0x80) return true;
+    if ((c | 0x20) !== word.charCodeAt(i)) return false;
+  }
+  return true;
+}
 
-  const content = readFileSync(logPath, { encoding: "utf-8" });
-  const lines = content.split("\n");
+function isErrorLogLineBytes(buf, start, catStart, end) {
+  if (hasLogCategoryBytes(buf, catStart, end, ERROR_CATEGORY_BYTES)) return true;
+  let comma = catStart - 1;
+  while (comma >= start && buf[comma] !== 44) comma--;
+  return comma >= start && isErrorLevelBytes(buf, comma + 1, catStart - 1);
+}
 
-  for (let i = 0; i < lines.length; i++) {
-    const lineNum = i + 1;
-    const line = lines[i];
-    if (!line.includes("AssetDataModelManager")) continue;
+// 先写临时文件再 rename：并发的读取方只会看到旧内容或完整的新内容，不会读到写了一半的文件
+export function writeFileAtomic(path, data) {
+  const tmp = `${path}.${process.pid}-${Math.random().toString(36).slice(2)}.tmp`;
+  try {
+    writeFileSync(tmp, data);
+    renameSync(tmp, path);
+  } catch (e) {
+    rmSync(tmp, { force: true });
+    throw e;
+  }
+}
 
-    const m = STATE_RE.exec(line);
-    if (m) {
-      const newState = m[1];
-      const entry = parseLogLine(line.trim(), lineNum);
-      const timestamp = entry ? entry.timestamp : "";
-
-      if (currentStartLine > 0) {
-        ranges.push({
-          state: currentState,
-          startLine: currentStartLine,
-          endLine: lineNum - 1,
-          startTime: currentStartTime,
-          endTime: timestamp,
-        });
+// ============ 行号 → 字节偏移检查点索引 ============
+// 每 CHECKPOINT_INTERVAL 行记录一次行首字节偏移，每个日志一个记录文件，持久化在 getLogStateDir()/.rspo_checkpoints/，
+// 让 afterLine 查询直接 seek 到最近的检查点，而不是每次从第 1 行重新扫描。
+// offset/lines 为已索引的前缀（只含以换行结束的完整行），日志增长时从该处继续扩展。
+// transitions 记录前缀内所有 StudioGameStateType 切换，用于推导 play/edit 运行上下文。
+// 每次只读写本日志的小记录（原子替换），读取耗时与日志历史的多少无关；cleanOldLogs 删除或归档日志时一并删除。
+
+const CHECKPOINT_INTERVAL = 1000;
+
+const checkpointDir = () => join(getLogStateDir(), ".rspo_checkpoints");
+// 内容指纹：开头 CACHE_HEAD_BYTES 字节与已索引前缀末尾（offset 之前）的 FINGERPRINT_TAIL_BYTES 字节
+const FINGERPRINT_TAIL_BYTES = 64;
+const checkpointRecordPath = (logPath) => join(checkpointDir(), basename(logPath) + ".json");
+
+// 全文倒排索引目录（见 log-index.mjs），每个日志文件一个子目录
+export function getSearchIndexDir() {
+  return join(getLogStateDir(), ".rspo_search_index");
+}
+
+function loadCheckpointRecord(logPath) {
+  const path = checkpointRecordPath(logPath);
+  if (!existsSync(path)) return null;
+  try {
+    return JSON.parse(readFileSync(path, "utf-8"));
+  } catch {
+    return null;
+  }
+}
+
+// 存放目录本身（默认为 Roblox 日志目录）不存在时不保存
+function saveCheckpointRecord(logPath, rec) {
+  try {
+    if (!existsSync(getLogStateDir())) return;
+    mkdirSync(checkpointDir(), { recursive: true });
+    writeFileAtomic(checkpointRecordPath(logPath), JSON.stringify({ ...rec, ...readLogFingerprint(logPath, rec.offset) }));
+  } catch {}
+}
+
+// 持久化的索引（检查点、倒排索引清单）随记录保存指纹。日志在同一路径被重写或替换时（即使新内容更长），
+// 开头或已索引前缀末尾的字节不再相同，索引整体重建，而不是沿用错位的行号和偏移。
+export function readLogFingerprint(logPath, offset) {
+  const tailStart = Math.max(0, offset - FINGERPRINT_TAIL_BYTES);
+  return {
+    head: readLogBytes(logPath, 0, CACHE_HEAD_BYTES).toString("base64"),
+    tail: readLogBytes(logPath, tailStart, offset - tailStart).toString("base64"),
+  };
+}
+
+export function matchesLogFingerprint(logPath, { head, tail }, offset) {
+  if (typeof head !== "string" || typeof tail !== "string") return false;
+  const headBytes = Buffer.from(head, "base64");
+  const tailBytes = Buffer.from(tail, "base64");
+  if (tailBytes.length > offset) return false;
+  return (
+    readLogBytes(logPath, 0, headBytes.length).equals(headBytes) &&
+    readLogBytes(logPath, offset - tailBytes.length, tailBytes.length).equals(tailBytes)
+  );
+}
+
+function emptyCheckpoints(logPath, stat) {
+  return {
+    path: logPath,
+    size: stat.size,
+    mtime: stat.mtimeMs,
+    interval: CHECKPOINT_INTERVAL,
+    lines: 0,
+    offset: 0,
+    checkpoints: [],
+    transitions: [],
+  };
+}
+
+export function loadLogCheckpoints(logPath) {
+  const stat = statLog(logPath);
+  const rec = loadCheckpointRecord(logPath);
+  const valid =
+    rec &&
+    rec.path === logPath &&
+    rec.interval === CHECKPOINT_INTERVAL &&
+    Array.isArray(rec.transitions) &&
+    stat.size >= rec.size &&
+    stat.size >= rec.offset &&
+    (stat.size > rec.size || stat.mtimeMs === rec.mtime) &&
+    ((stat.size === rec.size && stat.mtimeMs === rec.mtime) || matchesLogFingerprint(logPath, rec, rec.offset));
+  if (!valid) return { ...emptyCheckpoints(logPath, stat), dirty: true };
+
+  return { ...rec, size: stat.size, mtime: stat.mtimeMs, dirty: stat.size !== rec.size };
+}
+
+export function saveLogCheckpoints(logPath, rec) {
+  if (!rec.dirty) return;
+  const { dirty, ...data } = rec;
+  saveCheckpointRecord(logPath, data);
+  rec.dirty = false;
+}
+
+// 返回 afterLine 之后第一行所在位置之前最近的已知行首：{ startOffset, startLine }
+export function findCheckpoint(rec, afterLine = null) {
+  const target = afterLine ? afterLine + 1 : 1;
+  if (target > rec.lines) return { startOffset: rec.offset, startLine: rec.lines + 1 };
+  const k = Math.min(Math.floor((target - 1) / rec.interval), rec.checkpoints.length - 1);
+  if (k < 0) return { startOffset: 0, startLine: 1 };
+  return { startOffset: rec.checkpoints[k], startLine: k * rec.interval + 1 };
+}
+
+function toTransition({ text, lineNum, offset }, state) {
+  const entry = parseLogLine(text.trim(), lineNum);
+  return { line: lineNum, offset, state, time: entry ? entry.timestamp : "" };
+}
+
+// 扫描经过索引前缀的边界时顺带扩展索引（line 为 readLogLines / readLogLineRanges 产出的行，
+// state 为该行切换到的状态，调用方已判断过时直接传入）
+export function recordCheckpoint(rec, line, state = parseGameStateChange(line.text)) {
+  const { lineNum, offset, next } = line;
+  if (next === null || lineNum !== rec.lines + 1) return;
+  if ((lineNum - 1) % rec.interval === 0 && rec.checkpoints.length === (lineNum - 1) / rec.interval) {
+    rec.checkpoints.push(offset);
+  }
+  if (state) rec.transitions.push(toTransition(line, state));
+  rec.lines = lineNum;
+  rec.offset = next;
+  rec.dirty = true;
+}
+
+// 已索引前缀中 lineNum 之前最后一次切换到的状态（日志开头默认为 Edit）
+function getStateBeforeLine(rec, lineNum) {
+  let lo = 0;
+  let hi = rec.transitions.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (rec.transitions[mid].line < lineNum) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo > 0 ? rec.transitions[lo - 1].state : "Edit";
+}
+
+// 从 afterLine 之前最近的检查点（或游标位置 pos）开始逐行扫描，顺带扩展检查点/状态索引，整个查询只读一遍文件。
+// visit(text, lineNum, state, here) 返回 false 时提前结束，该行视为未读；state 为该行所处的 StudioGameStateType，
+// here 为该行的位置 { offset, line, state }（state 为该行之前的状态，对象会被复用，需要保留时复制）。
+// 行在字节层面处理：prefilter(buf, start, end) 返回 false 的行不解码也不调用 visit；到达 beforeLine 时结束。
+// completeOnly 时不访问尚未以换行结束的末行（增量缓存之后从该行继续，避免重复计入）。
+// 返回下次继续读取的位置：提前结束的那一行，或最后一个完整行之后（未写完的末行下次重新读取）。
+function scanLogLines(logPath, { afterLine = null, pos = null, beforeLine = null, prefilter = null, completeOnly = false }, visit) {
+  const rec = loadLogCheckpoints(logPath);
+  const from = pos ? { startOffset: pos.offset, startLine: pos.line } : findCheckpoint(rec, afterLine);
+  let state = pos ? pos.state : getStateBeforeLine(rec, from.startLine);
+  const here = { offset: from.startOffset, line: from.startLine, state };
+  const stateChange = createGameStateDetector();
+
+  for (const line of readLogLineRanges(logPath, from)) {
+    const { buf, start, end, lineNum } = line;
+    here.offset = line.offset;
+    here.line = lineNum;
+    here.state = state;
+    if ((beforeLine !== null && lineNum >= beforeLine) || (completeOnly && line.next === null)) break;
+    const newState = stateChange(line);
+    recordCheckpoint(rec, line, newState);
+    if (newState) state = newState;
+    if (
+      (afterLine === null || lineNum > afterLine) &&
+      (!prefilter || prefilter(buf, start, end)) &&
+      visit(buf.toString("utf-8", start, end), lineNum, state, here) === false
+    ) {
+      break;
+    }
+    if (line.next !== null) {
+      here.offset = line.next;
+      here.line = lineNum + 1;
+      here.state = state;
+    }
+  }
+
+  saveLogCheckpoints(logPath, rec);
+  return { ...here };
+}
+
+// 把索引扩展到文件末尾（只读取上次索引之后追加的字节），返回尚未写完的末行 { text, lineNum, offset, next }，没有则为 null
+function extendCheckpoints(logPath, rec) {
+  const stateChange = createGameStateDetector();
+  for (const line of readLogLineRanges(logPath, { startOffset: rec.offset, startLine: rec.lines + 1 })) {
+    if (line.next === null) return { text: line.text, lineNum: line.lineNum, offset: line.offset, next: null };
+    recordCheckpoint(rec, line, stateChange(line));
+  }
+  return null;
+}
+
+// 从 offset 处开始遇到的第一个有效时间戳（规范 ISO），直到文件末尾都没有则返回 null
+function firstTimestampAt(logPath, source, offset) {
+  for (const { text } of readLogLines(logPath, { startOffset: offset, chunkSize: 4096, source })) {
+    const line = text.trim();
+    const catStart = locateLogCategory(line);
+    if (catStart === -1) continue;
+    const entry = parseLogLineAt(line, catStart);
+    const ts = entry && toComparableTimestamp(entry.timestamp);
+    if (ts) return ts;
+  }
+  return null;
+}
+
+// Studio 日志时间戳单调递增：在检查点（已知行号的字节偏移）上二分，只读取每个探测点的首个时间戳，
+// 返回可以安全跳过的行数——其后第一行之前的行都早于 startIso，多读的部分不超过一个检查点间隔。
+export function findLineBeforeTime(logPath, startIso) {
+  if (!startIso || !existsSync(logPath)) return 0;
+  const rec = loadLogCheckpoints(logPath);
+  extendCheckpoints(logPath, rec);
+  saveLogCheckpoints(logPath, rec);
+
+  const source = openLogSource(logPath);
+  try {
+    let lo = 0;
+    let hi = rec.checkpoints.length - 1;
+    let found = 0;
+    while (lo <= hi) {
+      const mid = (lo + hi) >> 1;
+      const ts = firstTimestampAt(logPath, source, rec.checkpoints[mid]);
+      if (ts !== null && ts < startIso) {
+        found = mid;
+        lo = mid + 1;
+      } else {
+        hi = mid - 1;
       }
-      currentState = newState;
-      currentStartLine = lineNum;
-      currentStartTime = timestamp;
+    }
+    return found * rec.interval;
+  } finally {
+    source.close();
+  }
+}
+
+// 有起始时间时用二分结果推进 afterLine
+function seekAfterLine(logPath, afterLine, range) {
+  if (!range || !range.start) return afterLine;
+  const skip = findLineBeforeTime(logPath, range.start);
+  return afterLine === null || skip > afterLine ? skip : afterLine;
+}
+
+// ============ 分页游标 ============
+// 游标是不透明字符串，编码下一次应读取的行首字节偏移、行号与该行之前的 StudioGameStateType，
+// 续读时直接 seek，不依赖检查点索引。日志被截断或游标不属于该日志时视为无效。
+
+export function encodeLogCursor(logPath, { offset, line, state }) {
+  return Buffer.from(JSON.stringify({ f: basename(logPath), o: offset, l: line, s: state }), "utf-8").toString("base64url");
+}
+
+export function decodeLogCursor(logPath, cursor) {
+  let data;
+  try {
+    data = JSON.parse(Buffer.from(String(cursor), "base64url").toString("utf-8"));
+  } catch {
+    return null;
+  }
+  const { f, o, l, s } = data || {};
+  if (f !== basename(logPath) || !Number.isSafeInteger(o) || !Number.isSafeInteger(l) || o < 0 || l < 1) return null;
+  if (typeof s !== "string" || !existsSync(logPath) || o > statLog(logPath).size) return null;
+  if (o > 0) {
+    // 偏移必须落在行首
+    const source = openLogSource(logPath);
+    try {
+      const b = Buffer.alloc(1);
+      source.read(b, 1, o - 1);
+      if (b[0] !== 0x0a) return null;
+    } finally {
+      source.close();
     }
   }
+  return { offset: o, line: l, state: s };
+}
+
+// 起始位置：游标与 afterLine / 起始时间二分中更靠后者
+function resolveScanStart(logPath, afterLine, range, pos) {
+  const skip = seekAfterLine(logPath, afterLine, range);
+  if (!pos || (skip !== null && skip >= pos.line)) return { afterLine: skip };
+  return { afterLine: skip, pos };
+}
+
+function invalidCursor(cursor) {
+  return { error: `Invalid or expired cursor: ${cursor}` };
+}
+
+const STATE_RE = /Setting StudioGameStateType to StudioGameStateType_(\w+)/;
+
+// 状态区间来自持久化的 transitions，只需扫描上次索引之后追加的字节
+function loadGameStateTransitions(logPath) {
+  const rec = loadLogCheckpoints(logPath);
+  const tail = extendCheckpoints(logPath, rec);
+  saveLogCheckpoints(logPath, rec);
+
+  const transitions = [...rec.transitions];
+  // 尚未写完的末行不入索引，但仍参与本次结果
+  const tailState = tail && parseGameStateChange(tail.text);
+  if (tailState) transitions.push(toTransition(tail, tailState));
+  return transitions;
+}
 
-  if (currentStartLine > 0) {
+export function buildGameStateIndex(logPath) {
+  if (!existsSync(logPath)) return [];
+
+  const transitions = loadGameStateTransitions(logPath);
+  const ranges = [];
+  let current = { state: "Edit", line: 1, time: "" };
+  for (const t of transitions) {
     ranges.push({
-      state: currentState,
-      startLine: currentStartLine,
-      endLine: -1,
-      startTime: currentStartTime,
-      endTime: "",
+      state: current.state,
+      startLine: current.line,
+      endLine: t.line - 1,
+      startTime: current.time,
+      endTime: t.time,
     });
+    current = t;
   }
+  ranges.push({
+    state: current.state,
+    startLine: current.line,
+    endLine: -1,
+    startTime: current.time,
+    endTime: "",
+  });
   return ranges;
 }
 
+// readLogLineRanges 产出的行切换到的状态：先在整块 Buffer 中查找标记，只解码含标记的行。
+// 每个块只向后搜索一次，返回的函数须按行序调用。
+const STATE_MARKER = Buffer.from("StudioGameStateType_");
+
+export function createGameStateDetector() {
+  let buf = null;
+  let marker = -1;
+  return (line) => {
+    if (line.buf !== buf || (marker !== -1 && marker < line.start)) {
+      buf = line.buf;
+      marker = buf.indexOf(STATE_MARKER, line.start);
+    }
+    return marker !== -1 && marker < line.end ? parseGameStateChange(line.text) : null;
+  };
+}
+
+export function parseGameStateChange(line) {
+  if (!line.includes("AssetDataModelManager")) return null;
+  const m = STATE_RE.exec(line);
+  return m ? m[1] : null;
+}
+
+export function getRunContextForState(state) {
+  const s = state.toLowerCase();
+  if (s.includes("server") || s.includes("client")) return "play";
+  if (s.includes("edit")) return "edit";
+  return "unknown";
+}
+
+// stateRanges 按 startLine 有序且互不重叠：二分查找最后一个 startLine <= lineNum 的区间
+function findStateRange(lineNum, stateRanges) {
+  let lo = 0;
+  let hi = stateRanges.length - 1;
+  let found = -1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >> 1;
+    if (stateRanges[mid].startLine <= lineNum) {
+      found = mid;
+      lo = mid + 1;
+    } else {
+      hi = mid - 1;
+    }
+  }
+  return found;
+}
+
 export function getRunContextForLine(lineNum, stateRanges) {
-  for (const r of stateRanges) {
-    if (r.startLine <= lineNum && (r.endLine === -1 || lineNum <= r.endLine)) {
-      const state = r.state.toLowerCase();
-      if (state.includes("server") || state.includes("client")) return "play";
-      if (state.includes("edit")) return "edit";
+  const i = findStateRange(lineNum, stateRanges);
+  if (i === -1) return "unknown";
+  const r = stateRanges[i];
+  if (r.endLine !== -1 && lineNum > r.endLine) return "unknown";
+  return getRunContextForState(r.state);
+}
+
+// 日志的最后一行行号（与 content.split("\n").length 一致，空文件为 1，不存在为 0）。
+// 总行数来自持久化的检查点索引，只需读取上次调用之后追加的字节，耗时与日志总大小无关。
+export function getLogLastLine(logPath) {
+  if (!logPath || !existsSync(logPath)) return 0;
+  const rec = loadLogCheckpoints(logPath);
+  extendCheckpoints(logPath, rec);
+  saveLogCheckpoints(logPath, rec);
+  return rec.lines + 1;
+}
+
+// 定位 afterLine 之后第一行的起始位置：{ offset, line }。
+// afterLine 为空时定位到文件末尾（若末行尚未写完，则停在该行行首）。
+export function locateLine(logPath, afterLine = null) {
+  const checkpoints = loadLogCheckpoints(logPath);
+  const from = findCheckpoint(checkpoints, afterLine ?? Infinity);
+  let pos = { offset: from.startOffset, line: from.startLine };
+  const stateChange = createGameStateDetector();
+
+  for (const line of readLogLineRanges(logPath, from)) {
+    recordCheckpoint(checkpoints, line, stateChange(line));
+    const { lineNum, offset, next } = line;
+    if (afterLine !== null && lineNum > afterLine) {
+      pos = { offset, line: lineNum };
+      break;
     }
+    pos = next === null ? { offset, line: lineNum } : { offset: next, line: lineNum + 1 };
   }
-  return "unknown";
+
+  saveLogCheckpoints(logPath, checkpoints);
+  return pos;
 }
 
-export function getLogsFromLine(
-  logPath,
-  {
-    afterLine = null,
-    beforeLine = null,
-    startDate = null,
-    endDate = null,
-    timestamps = false,
-    categories = null,
-    applyFilter = true,
-    runContext = null,
-    includeContext = false,
-  } = {},
-) {
-  const MAX_BYTES = 32000;
-  const empty = { logs: "", startLine: 0, lastLine: 0, remaining: 0, hasMore: false };
-  if (!existsSync(logPath)) return empty;
+// 按规则集过滤消息；hits 非空时累计每条规则的命中次数（--filter-stats）
+function isFilteredOut(message, ruleSet, hits) {
+  const rule = matchExcludeRule(message, ruleSet);
+  if (rule === -1) return false;
+  if (hits) hits.set(rule, (hits.get(rule) || 0) + 1);
+  return true;
+}
+
+// ============ Lua 堆栈 ============
+// 运行时错误之后紧跟 "Stack Begin"、若干 "Script '<path>', Line N[ - function f]" 和 "Stack End" 输出行。
+// 错误行的下一条日志行必须是 Stack Begin，堆栈内出现其他日志行即视为结束（非日志格式的续行忽略）。
+const STACK_FRAME_RE = /^Script '([^']+)', Line (\d+)(?: - (?:function )?(.+))?/;
+const MESSAGE_LOCATION_RE = /^(\w[\w .]*):(\d+): /;
+
+export function parseStackFrame(message) {
+  const m = STACK_FRAME_RE.exec(message);
+  if (!m) return null;
+  const frame = { script: m[1], line: Number(m[2]) };
+  if (m[3]) frame.function = m[3].trim();
+  return frame;
+}
 
+function isStackMessage(message) {
+  return message.startsWith("Stack Begin") || message.startsWith("Stack End") || STACK_FRAME_RE.test(message);
+}
+
+// 错误发生的脚本与行号：优先取堆栈顶帧，否则取消息开头的 "<path>:<line>:"，都没有时返回 null
+export function errorLocation(entry) {
+  const frame = entry.stack && entry.stack[0];
+  if (frame) return { script: frame.script, line: frame.line };
+  const m = MESSAGE_LOCATION_RE.exec(entry.message);
+  return m ? { script: m[1], line: Number(m[2]) } : null;
+}
+
+// 把堆栈帧写入前一条错误条目的 stack。open 为 true 时后续行可能仍属于该错误的堆栈。
+function createStackStitcher() {
+  let target = null;
+  let inStack = false;
+  return {
+    get open() {
+      return target !== null;
+    },
+    error(entry) {
+      entry.stack = [];
+      target = entry;
+      inStack = false;
+    },
+    // 返回该行是否属于堆栈（已消费）
+    line(line, catStart) {
+      const entry = parseLogLineAt(line, catStart);
+      if (!entry) return false;
+      const { message } = entry;
+      if (!inStack) {
+        inStack = message.startsWith("Stack Begin");
+        if (!inStack) target = null;
+        return inStack;
+      }
+      if (message.startsWith("Stack End")) {
+        target = null;
+        return true;
+      }
+      const frame = parseStackFrame(message);
+      if (frame) target.stack.push(frame);
+      else target = null;
+      return frame !== null;
+    },
+  };
+}
+
+// 单行过滤管线（顺序扫描、follow 与并行 worker 共用）：依次按类别 / 错误级别、时间窗口、过滤规则、正则筛选。
+// 返回条目、null（丢弃）或 PAST_TIME_RANGE（已越过时间窗口末尾，可结束扫描）；运行上下文由调用方按状态判断。
+// errorsOnly 时错误条目带 stack 数组，其后读到的堆栈帧陆续写入（须按行序调用）；
+// 堆栈行本身不作为错误返回。matcher.continueStack(text) 供区间扫描在区间末尾之后读完最后一条错误的堆栈。
+export const PAST_TIME_RANGE = Symbol("pastTimeRange");
+
+export function createLogLineMatcher({
+  errorsOnly = false,
+  categories = null,
+  range = null,
+  applyFilter = true,
+  filterRules = DEFAULT_RULE_SET,
+  filterHits = null,
+  regex = null,
+} = {}) {
   const cats = categories || DEFAULT_CATEGORIES;
-  let stateRanges = [];
-  if (runContext || includeContext) {
-    stateRanges = buildGameStateIndex(logPath);
-  }
+  const stack = errorsOnly ? createStackStitcher() : null;
+  const match = (text, lineNum) => {
+    const line = text.trim();
+    if (!line) return null;
+
+    const catStart = locateLogCategory(line);
+    if (catStart === -1) return null;
+    if (stack && stack.open && stack.line(line, catStart)) return null;
+    if (errorsOnly ? !isErrorLogLine(line, catStart) : cats.length > 0 && !hasLogCategory(line, catStart, cats)) {
+      return null;
+    }
+    const entry = parseLogLineAt(line, catStart, lineNum);
+    if (!entry) return null;
+    if (stack && isStackMessage(entry.message)) return null;
+    if (range) {
+      // 时间戳单调递增，越过窗口末尾即可结束扫描
+      const pos = timeRangePosition(entry.timestamp, range);
+      if (pos > 0) return PAST_TIME_RANGE;
+      if (pos < 0) return null;
+    }
+    if ((applyFilter || errorsOnly) && isFilteredOut(entry.message, filterRules, filterHits)) return null;
+    if (regex && !regex.test(entry.message)) return null;
+    if (stack) stack.error(entry);
+    return entry;
+  };
+  // match(text) 的字节级预筛：返回 false 的行 match 必定丢弃（且不产生副作用），可以不解码直接跳过
+  const catBytes = errorsOnly ? null : toBytes(cats);
+  match.acceptsBytes = (buf, start, end) => {
+    if (stack && stack.open) return true;
+    const catStart = locateLogCategoryBytes(buf, start, end);
+    if (catStart === -1) return false;
+    if (errorsOnly) return isErrorLogLineBytes(buf, start, catStart, end);
+    return catBytes.length === 0 || hasLogCategoryBytes(buf, catStart, end, catBytes);
+  };
+  match.continueStack = (text) => {
+    if (!stack || !stack.open) return false;
+    const line = text.trim();
+    const catStart = line ? locateLogCategory(line) : -1;
+    return catStart === -1 || stack.line(line, catStart);
+  };
+  return match;
+}
+
+export const MAX_OUTPUT_BYTES = 32000;
+const CONTEXT_LABELS = { play: "[P]", edit: "[E]", unknown: "[?]" };
+
+function formatLogLine(entry, ctx, { timestamps, includeContext, lineNumbers }) {
+  const parts = lineNumbers ? [`${entry.lineNum}|`] : [];
+  if (includeContext) parts.push(CONTEXT_LABELS[ctx] || "[?]");
+  if (timestamps) parts.push(`[${entry.timestamp.slice(11, 19)}]`);
+  parts.push(entry.message);
+  return parts.join(" ");
+}
+
+// ============ 输出整形 ============
+// collapse：连续的相同或近似相同（errorSignature 相同）且上下文相同的消息合并为一行 "message (xN, lines a–b)"；
+// maxLineLength：超长消息截断并标注省略的字符数；sample：同一消息签名每秒最多输出 sample 行，其余丢弃并计入 dropped。
+// 合并后缀在一行第一次被合并时按最大长度预留预算，之后继续合并不再占用输出字节。
+const COLLAPSE_SUFFIX_BYTES = Buffer.byteLength(" (x9999999, lines 99999999–99999999)", "utf-8");
+
+function truncateMessage(entry, maxLineLength) {
+  if (!maxLineLength || entry.message.length <= maxLineLength) return entry;
+  const omitted = entry.message.length - maxLineLength;
+  return { ...entry, message: `${entry.message.slice(0, maxLineLength)}… [+${omitted} chars]` };
+}
+
+function collapseSuffix({ count, first, last }) {
+  return count > 1 ? ` (x${count}, lines ${first}–${last})` : "";
+}
+
+// run 为上一行的合并状态 { message, signature, ctx }，signature 按需计算
+function continuesRun(run, entry, ctx) {
+  if (!run || run.ctx !== ctx) return false;
+  if (entry.message === run.message) return true;
+  if (run.signature === null) run.signature = errorSignature(run.message);
+  return errorSignature(entry.message) === run.signature;
+}
+
+// 时间戳单调（正序或倒序读取均可）：换秒时清空计数，内存只与一秒内的不同签名数有关
+function createSourceSampler(limit) {
+  let second = null;
+  const counts = new Map();
+  return (entry) => {
+    const s = entry.timestamp.slice(0, 19);
+    if (s !== second) {
+      second = s;
+      counts.clear();
+    }
+    const key = errorSignature(entry.message);
+    const n = (counts.get(key) || 0) + 1;
+    counts.set(key, n);
+    return n <= limit;
+  };
+}
 
+// 按行序收集文本输出，超过 MAX_OUTPUT_BYTES 后只计数。add 返回该条是否被保留（合并或按采样丢弃也算已处理）。
+// lineNumbers 为 true 时每行带 "N|" 前缀（搜索结果）；count(n) 记录已匹配但未保留条目的数量。
+// collapse / maxLineLength / sample 见上方输出整形说明；sample 时结果带 dropped。
+export function createTextCollector({
+  timestamps = false,
+  includeContext = false,
+  lineNumbers = false,
+  collapse = false,
+  maxLineLength = null,
+  sample = null,
+} = {}) {
   let startLine = null;
   let lastLine = 0;
   let currentBytes = 0;
   const logLines = [];
-  let remaining = 0;
+  let total = 0;
+  let handled = 0;
+  let dropped = 0;
   let bytesExceeded = false;
+  // 最后一行的合并状态（总是 logLines 的最后一行），后缀在 result() 中追加
+  let run = null;
+  const keep = sample ? createSourceSampler(sample) : null;
+
+  return {
+    add(entry, ctx) {
+      total++;
+      if (bytesExceeded) return false;
+
+      if (collapse && continuesRun(run, entry, ctx)) {
+        if (run.count === 1) {
+          if (currentBytes + COLLAPSE_SUFFIX_BYTES > MAX_OUTPUT_BYTES) {
+            bytesExceeded = true;
+            return false;
+          }
+          currentBytes += COLLAPSE_SUFFIX_BYTES;
+        }
+        run.count++;
+        run.last = entry.lineNum;
+        lastLine = entry.lineNum;
+        handled++;
+        return true;
+      }
+      if (keep && !keep(entry)) {
+        dropped++;
+        handled++;
+        return true;
+      }
 
-  const content = readFileSync(logPath, { encoding: "utf-8" });
-  const lines = content.split("\n");
+      const outputLine = formatLogLine(truncateMessage(entry, maxLineLength), ctx, { timestamps, includeContext, lineNumbers });
+      const lineBytes = Buffer.byteLength(outputLine, "utf-8") + 1;
 
-  for (let i = 0; i < lines.length; i++) {
-    const lineNum = i + 1;
-    if (afterLine !== null && lineNum <= afterLine) continue;
-    if (beforeLine !== null && lineNum >= beforeLine) break;
+      if (currentBytes + lineBytes > MAX_OUTPUT_BYTES && logLines.length > 0) {
+        bytesExceeded = true;
+        return false;
+      }
 
-    const line = lines[i].trim();
-    if (!line) continue;
+      if (run && run.count > 1) logLines[logLines.length - 1] += collapseSuffix(run);
+      if (startLine === null) startLine = entry.lineNum;
+      logLines.push(outputLine);
+      lastLine = entry.lineNum;
+      currentBytes += lineBytes;
+      handled++;
+      if (collapse) run = { message: entry.message, signature: null, ctx, count: 1, first: entry.lineNum, last: entry.lineNum };
+      return true;
+    },
+    count(n) {
+      total += n;
+    },
+    result() {
+      const result = {
+        logs: logLines.join("\n") + (run ? collapseSuffix(run) : ""),
+        startLine: startLine || 0,
+        lastLine,
+        returned: logLines.length,
+        remaining: total - handled,
+        hasMore: total > handled,
+      };
+      if (sample) result.dropped = dropped;
+      return result;
+    },
+  };
+}
 
-    const entry = parseLogLine(line, lineNum);
-    if (!entry) continue;
-    if (cats.length > 0 && !cats.includes(entry.category)) continue;
-    if (applyFilter && shouldExclude(entry.message)) continue;
-    if (startDate || endDate) {
-      if (!isTimestampInRange(entry.timestamp, startDate, endDate)) continue;
+// 堆栈帧在错误行之后才读到，收集器保留原始条目，到 result() 时再转换
+function toErrorEntry({ entry, ctx }) {
+  const error = {
+    line: entry.lineNum,
+    timestamp: entry.timestamp,
+    message: entry.message,
+    category: entry.category,
+    level: entry.level,
+    context: ctx,
+  };
+  if (entry.stack && entry.stack.length > 0) error.stack = [...entry.stack];
+  return error;
+}
+
+export function createErrorCollector(maxErrors = 100) {
+  const kept = [];
+  let totalErrors = 0;
+  return {
+    add(entry, ctx) {
+      totalErrors++;
+      if (kept.length >= maxErrors) return false;
+      kept.push({ entry, ctx });
+      return true;
+    },
+    count(n) {
+      totalErrors += n;
+    },
+    result() {
+      const errors = kept.map(toErrorEntry);
+      return { hasError: totalErrors > 0, errorCount: totalErrors, errors, hasMore: totalErrors > errors.length };
+    },
+  };
+}
+
+// 错误签名：GUID、十六进制地址、实例路径（Workspace.Model.Script）和数字替换为占位符，
+// 同一处代码反复产生、只有数值或实例名不同的错误得到相同签名
+const GUID_RE = /\{?\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b\}?/gi;
+const HEX_RE = /\b0x[0-9a-f]+\b/gi;
+const INSTANCE_PATH_RE = /\b[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+/g;
+const NUMBER_RE = /\d+(?:\.\d+)?/g;
+
+export function errorSignature(message) {
+  return message
+    .replace(GUID_RE, "<guid>")
+    .replace(HEX_RE, "<hex>")
+    .replace(INSTANCE_PATH_RE, "<path>")
+    .replace(NUMBER_RE, "#")
+    .replace(/\s+/g, " ")
+    .trim();
+}
+
+// 按签名聚合错误：每组记录次数、首末行号和首次出现的条目（sample），一遍扫描即可覆盖所有不同的错误。
+// 结果按次数降序（相同次数按首次出现顺序），只返回前 maxGroups 组；add 总是返回 true，不分页。
+// addGroup 合并并行扫描中各段预先聚合的组，须按行序调用。
+export function createErrorGroupCollector(maxGroups = 100) {
+  const groups = new Map();
+  let totalErrors = 0;
+  const addGroup = ({ signature, count, firstLine, lastLine }, entry, ctx) => {
+    totalErrors += count;
+    const group = groups.get(signature);
+    if (group) {
+      group.count += count;
+      group.lastLine = lastLine;
+    } else {
+      groups.set(signature, { signature, count, firstLine, lastLine, sample: { entry, ctx } });
     }
+  };
+  return {
+    add(entry, ctx) {
+      const line = entry.lineNum;
+      addGroup({ signature: errorSignature(entry.message), count: 1, firstLine: line, lastLine: line }, entry, ctx);
+      return true;
+    },
+    addGroup,
+    result() {
+      const sorted = [...groups.values()].sort((a, b) => b.count - a.count || a.firstLine - b.firstLine);
+      return {
+        hasError: totalErrors > 0,
+        errorCount: totalErrors,
+        groupCount: sorted.length,
+        groups: sorted.slice(0, maxGroups).map((g) => ({ ...g, sample: toErrorEntry(g.sample) })),
+        hasMore: sorted.length > maxGroups,
+      };
+    },
+  };
+}
+
+const byCount = (a, b) => b.count - a.count;
+
+// 按脚本与行号统计错误（--by-script）：脚本按错误次数降序，每个脚本内的行号同样按次数降序。
+// 错误位置取自堆栈顶帧（errorLocation），要等堆栈读完，因此上一条错误在下一条到来或 result() 时才归属；
+// 无法定位的错误只计入 unattributed。addGroup 与 createErrorGroupCollector 相同，用于合并并行扫描的各段。
+export function createScriptErrorCollector(maxScripts = 100) {
+  const totals = { scripts: new Map(), errors: 0, unattributed: 0 };
+  let pending = null;
 
-    if (runContext || includeContext) {
-      const ctx = getRunContextForLine(lineNum, stateRanges);
-      entry.runContext = ctx;
-      if (runContext && ctx !== runContext) continue;
+  const addGroup = (into, { count, firstLine, lastLine }, entry) => {
+    into.errors += count;
+    const location = errorLocation(entry);
+    if (!location) {
+      into.unattributed += count;
+      return;
     }
+    let script = into.scripts.get(location.script);
+    if (!script) into.scripts.set(location.script, (script = { script: location.script, count: 0, lines: new Map() }));
+    script.count += count;
+    const spot = script.lines.get(location.line);
+    if (spot) {
+      spot.count += count;
+      spot.lastLogLine = lastLine;
+    } else {
+      script.lines.set(location.line, { line: location.line, count, firstLogLine: firstLine, lastLogLine: lastLine, message: entry.message });
+    }
+  };
+  const addPending = (into) => addGroup(into, { count: 1, firstLine: pending.lineNum, lastLine: pending.lineNum }, pending);
+  const flush = () => {
+    if (!pending) return;
+    addPending(totals);
+    pending = null;
+  };
+
+  return {
+    add(entry) {
+      flush();
+      pending = entry;
+      return true;
+    },
+    addGroup(group, entry) {
+      flush();
+      addGroup(totals, group, entry);
+    },
+    // 最后一条错误的堆栈可能尚未读完（增量缓存之后会继续扫描），只在副本中归入，不影响之后的结果
+    result() {
+      let view = totals;
+      if (pending) {
+        const scripts = new Map();
+        for (const [name, { script, count, lines }] of totals.scripts) {
+          scripts.set(name, { script, count, lines: new Map([...lines].map(([line, spot]) => [line, { ...spot }])) });
+        }
+        view = { ...totals, scripts };
+        addPending(view);
+      }
+      const sorted = [...view.scripts.values()].sort(byCount);
+      return {
+        hasError: view.errors > 0,
+        errorCount: view.errors,
+        scriptCount: sorted.length,
+        scripts: sorted.slice(0, maxScripts).map(({ script, count, lines }) => ({ script, count, lines: [...lines.values()].map((spot) => ({ ...spot })).sort(byCount) })),
+        unattributed: view.unattributed,
+        hasMore: sorted.length > maxScripts,
+      };
+    },
+  };
+}
+
+// last：从文件末尾倒序读取，只收集最后 N 条（仍受 MAX_OUTPUT_BYTES 限制，保留最新的）。
+// 行号由检查点索引记录的总行数倒数得出，上下文取自索引中的状态切换；
+// 更早的行不计数：hasMore 表示之前还有匹配的行，此时 remaining 为 null。游标指向日志末尾，用于之后增量读取。
+// collapse 时 last 按合并后的行数计；sample 同样按签名每秒限流。
+function getLastLogs(logPath, last, { afterLine, beforeLine, range, runContext, match, format, collapse, sample }) {
+  const rec = loadLogCheckpoints(logPath);
+  const tail = extendCheckpoints(logPath, rec);
+  saveLogCheckpoints(logPath, rec);
+  const floor = Math.max(afterLine ?? 0, range && range.start ? findLineBeforeTime(logPath, range.start) : 0);
 
-    remaining++;
-    if (bytesExceeded) continue;
+  const picked = [];
+  let bytes = 0;
+  let hasMore = false;
+  let dropped = 0;
+  const keep = sample ? createSourceSampler(sample) : null;
+  // 先处理尚未写完的末行，再从索引前缀的末尾倒序读取
+  const visit = (text, lineNum, state) => {
+    if (lineNum <= floor) return false;
+    if (beforeLine !== null && lineNum >= beforeLine) return;
+    const entry = match(text, lineNum);
+    if (!entry || entry === PAST_TIME_RANGE) return;
+    const ctx = getRunContextForState(state);
+    if (runContext && ctx !== runContext) return;
 
-    const parts = [];
-    if (includeContext) {
-      const labels = { play: "[P]", edit: "[E]", unknown: "[?]" };
-      parts.push(labels[entry.runContext] || "[?]");
+    const run = picked[picked.length - 1];
+    if (collapse && continuesRun(run, entry, ctx)) {
+      // 倒序读取时合并行改为显示更早的这条，与正序结果一致
+      const line = format(entry, ctx);
+      const extra = Buffer.byteLength(line, "utf-8") - Buffer.byteLength(run.line, "utf-8") + (run.count === 1 ? COLLAPSE_SUFFIX_BYTES : 0);
+      if (bytes + extra > MAX_OUTPUT_BYTES) {
+        hasMore = true;
+        return false;
+      }
+      bytes += extra;
+      run.line = line;
+      run.count++;
+      run.first = lineNum;
+      return;
     }
-    if (timestamps) {
-      parts.push(`[${entry.timestamp.slice(11, 19)}]`);
+    if (keep && !keep(entry)) {
+      dropped++;
+      return;
     }
-    parts.push(entry.message);
-    const outputLine = parts.join(" ");
-    const lineBytes = Buffer.byteLength(outputLine, "utf-8") + 1;
 
-    if (currentBytes + lineBytes > MAX_BYTES && logLines.length > 0) {
-      bytesExceeded = true;
-      continue;
+    const line = format(entry, ctx);
+    const lineBytes = Buffer.byteLength(line, "utf-8") + 1;
+    if (picked.length >= last || (bytes + lineBytes > MAX_OUTPUT_BYTES && picked.length > 0)) {
+      hasMore = true;
+      return false;
     }
+    picked.push({ line, message: entry.message, signature: null, ctx, count: 1, first: lineNum, last: lineNum });
+    bytes += lineBytes;
+  };
 
-    if (startLine === null) startLine = lineNum;
-    logLines.push(outputLine);
-    lastLine = lineNum;
-    currentBytes += lineBytes;
+  let stopped = false;
+  if (tail) {
+    const state = parseGameStateChange(tail.text) || getStateBeforeLine(rec, tail.lineNum);
+    stopped = visit(tail.text, tail.lineNum, state) === false;
+  }
+  if (!stopped) {
+    let lineNum = rec.lines;
+    for (const { text } of readLogLinesReverse(logPath, { endOffset: rec.offset })) {
+      if (visit(text, lineNum, getStateBeforeLine(rec, lineNum + 1)) === false) break;
+      lineNum--;
+    }
   }
 
-  const returnedCount = logLines.length;
+  picked.reverse();
+  const result = {
+    logs: picked.map((p) => p.line + collapseSuffix(p)).join("\n"),
+    startLine: picked.length > 0 ? picked[0].first : 0,
+    lastLine: picked.length > 0 ? picked[picked.length - 1].last : 0,
+    remaining: hasMore ? null : 0,
+    hasMore,
+    cursor: encodeLogCursor(logPath, { offset: rec.offset, line: rec.lines + 1, state: getStateBeforeLine(rec, rec.lines + 1) }),
+  };
+  if (sample) result.dropped = dropped;
+  return result;
+}
+
+// 分页：页满（输出预算或条数上限）后的第一条匹配即下一页的起点，游标指向该行。
+// count 为 false 时页满即停止扫描，不再统计剩余数量（remaining / errorCount 为 null），每页只读取自身覆盖的范围。
+// pageEnd 为之前的扫描已确定的下一页起点（增量缓存继续扫描时传入）。返回的 next 为继续读取的位置，
+// done 表示已越过时间窗口末尾或到达 beforeLine，之后追加的内容不会再有匹配。
+function scanPage(logPath, start, { beforeLine, runContext, match, collector, count, completeOnly = false, pageEnd = null }) {
+  let pastRange = false;
+  const scan = { ...start, beforeLine, prefilter: match.acceptsBytes, completeOnly };
+  const next = scanLogLines(logPath, scan, (text, lineNum, state, here) => {
+    const entry = match(text, lineNum);
+    if (entry === PAST_TIME_RANGE) {
+      pastRange = true;
+      return false;
+    }
+    if (!entry) return;
+    const ctx = getRunContextForState(state);
+    if (runContext && ctx !== runContext) return;
+    if (!collector.add(entry, ctx) && !pageEnd) {
+      pageEnd = { ...here };
+      if (!count) return false;
+    }
+  });
   return {
-    logs: logLines.join("\n"),
-    startLine: startLine || 0,
-    lastLine,
-    remaining: remaining - returnedCount,
-    hasMore: remaining > returnedCount,
+    cursor: encodeLogCursor(logPath, pageEnd || next),
+    counted: count || !pageEnd,
+    next,
+    pageEnd,
+    done: pastRange || (beforeLine !== null && next.line >= beforeLine),
   };
 }
 
-export function searchLogsFromLine(
+// ============ 增量结果缓存 ============
+// 长驻进程（MCP 服务）中，试玩期间同一个搜索 / 错误查询会被反复轮询。按 (日志路径, 规范化查询) 缓存扫描状态：
+// 匹配器（含堆栈拼接状态）、收集器、已扫描到的位置与下一页起点，重复查询只扫描新追加的字节并并入已有结果。
+// 缓存只计入完整的行；正在写入的末行可能命中时，该次查询不经缓存完整扫描（结果与不缓存时一致），
+// 等换行写入后再并入缓存。日志被截断或替换（开头的内容变化）时丢弃。
+// 只缓存从头统计的查询（无 cursor、count 不为 false），按 LRU 保留最近 RESULT_CACHE_SIZE 个。
+const RESULT_CACHE_SIZE = 32;
+const CACHE_HEAD_BYTES = 64;
+const resultCache = new Map();
+
+export function clearLogResultCache() {
+  resultCache.clear();
+}
+
+function readLogBytes(logPath, position, length) {
+  const source = openLogSource(logPath);
+  try {
+    const buf = Buffer.alloc(Math.max(0, Math.min(length, source.size - position)));
+    if (buf.length > 0) source.read(buf, buf.length, position);
+    return buf;
+  } finally {
+    source.close();
+  }
+}
+
+// 仍然有效的缓存条目（同时移到 LRU 末尾），没有或已失效时返回 null
+function getCachedScan(key, logPath, stat) {
+  const cached = resultCache.get(key);
+  if (!cached) return null;
+  resultCache.delete(key);
+  if (stat.size < cached.next.offset) return null;
+  const changed = stat.size !== cached.size || stat.mtimeMs !== cached.mtime;
+  if (changed && !readLogBytes(logPath, 0, cached.head.length).equals(cached.head)) return null;
+  resultCache.set(key, cached);
+  return cached;
+}
+
+// 缓存扫描停在尚未写完的末行之前：该行（按已扫描部分的匹配器状态，如未结束的堆栈）可能被 match 接受时返回 true
+function mayMatchPendingTail(logPath, cached, stat) {
+  const length = stat.size - cached.next.offset;
+  if (cached.done || length <= 0) return false;
+  const tail = readLogBytes(logPath, cached.next.offset, length);
+  return cached.match.acceptsBytes(tail, 0, tail.length);
+}
+
+// 执行一次分页查询：create() 创建 { match, collector, ... }，resolveStart() 求起始位置。
+// key 非空时使用增量缓存，返回的收集器可能已累计了之前的扫描。返回 create() 的结果加上 page
+function runPageQuery(logPath, key, { beforeLine, runContext, count }, resolveStart, create) {
+  if (!key) {
+    const query = create();
+    const { match, collector } = query;
+    return { ...query, page: scanPage(logPath, resolveStart(), { beforeLine, runContext, match, collector, count }) };
+  }
+
+  const stat = statLog(logPath);
+  let cached = getCachedScan(key, logPath, stat);
+  if (!cached) {
+    cached = { ...create(), start: resolveStart(), pageEnd: null, done: false, page: null };
+    resultCache.set(key, cached);
+    if (resultCache.size > RESULT_CACHE_SIZE) resultCache.delete(resultCache.keys().next().value);
+  }
+  if (!cached.done) {
+    const { match, collector, pageEnd } = cached;
+    const page = scanPage(logPath, cached.start, { beforeLine, runContext, match, collector, count: true, completeOnly: true, pageEnd });
+    Object.assign(cached, {
+      page,
+      pageEnd: page.pageEnd,
+      done: page.done,
+      next: page.next,
+      start: { afterLine: null, pos: page.next },
+      size: stat.size,
+      mtime: stat.mtimeMs,
+      head: cached.head && cached.head.length >= CACHE_HEAD_BYTES ? cached.head : readLogBytes(logPath, 0, CACHE_HEAD_BYTES),
+    });
+  }
+  if (mayMatchPendingTail(logPath, cached, stat)) {
+    return runPageQuery(logPath, null, { beforeLine, runContext, count }, resolveStart, create);
+  }
+  return cached;
+}
+
+export function getLogsFromLine(
   logPath,
-  pattern,
   {
+    last = null,
+    cursor = null,
+    count = true,
     afterLine = null,
     beforeLine = null,
     startDate = null,
@@ -246,151 +1281,438 @@ export function searchLogsFromLine(
     applyFilter = true,
     runContext = null,
     includeContext = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    collapse = false,
+    maxLineLength = null,
+    sample = null,
   } = {},
 ) {
-  const MAX_BYTES = 32000;
-  const empty = { logs: "", startLine: 0, lastLine: 0, matchCount: 0, remaining: 0, hasMore: false };
+  const empty = { logs: "", startLine: 0, lastLine: 0, remaining: 0, hasMore: false, cursor: null };
   if (!existsSync(logPath)) return empty;
+  const pos = cursor ? decodeLogCursor(logPath, cursor) : null;
+  if (cursor && !pos) return invalidCursor(cursor);
 
-  const cats = categories || DEFAULT_CATEGORIES;
-  let regex;
-  try {
-    regex = new RegExp(pattern, "i");
-  } catch {
-    return { error: `Invalid regex pattern: ${pattern}` };
-  }
+  const filterHits = filterStats ? new Map() : null;
+  const range = compileTimeRange(startDate, endDate);
+  const match = createLogLineMatcher({ categories, range, applyFilter, filterRules, filterHits });
 
-  let stateRanges = [];
-  if (runContext || includeContext) {
-    stateRanges = buildGameStateIndex(logPath);
+  if (last > 0) {
+    const format = (entry, ctx) => formatLogLine(truncateMessage(entry, maxLineLength), ctx, { timestamps, includeContext, lineNumbers: false });
+    const floor = pos ? Math.max(afterLine ?? 0, pos.line - 1) : afterLine;
+    const result = getLastLogs(logPath, last, { afterLine: floor, beforeLine, range, runContext, match, format, collapse, sample });
+    if (filterHits) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+    return result;
   }
 
-  let startLine = null;
-  let lastLine = 0;
-  let currentBytes = 0;
-  const logLines = [];
-  let matchCount = 0;
-  let bytesExceeded = false;
+  const collector = createTextCollector({ timestamps, includeContext, collapse, maxLineLength, sample });
+  const page = scanPage(logPath, resolveScanStart(logPath, afterLine, range, pos), {
+    beforeLine,
+    runContext,
+    match,
+    collector,
+    count,
+  });
 
-  const content = readFileSync(logPath, { encoding: "utf-8" });
-  const lines = content.split("\n");
+  const { logs, startLine, lastLine, remaining, hasMore, dropped } = collector.result();
+  const result = { logs, startLine, lastLine, remaining: page.counted ? remaining : null, hasMore, cursor: page.cursor };
+  if (sample) result.dropped = dropped;
+  if (filterHits) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+  return result;
+}
 
-  for (let i = 0; i < lines.length; i++) {
-    const lineNum = i + 1;
-    if (afterLine !== null && lineNum <= afterLine) continue;
-    if (beforeLine !== null && lineNum >= beforeLine) break;
+// 不含正则元字符、也没有大小写之分（数字、符号、无大小写的文字）的模式按字面量用 includes 匹配，
+// 其余编译为忽略大小写的正则。含字母的字面量（如 "timeout"）不走 includes：V8 对字面量 /i 正则的匹配
+// 与区分大小写的 includes 一样快，逐行 toLowerCase 后 includes 反而慢一倍多（见 log-utils.bench.mjs）。
+// 返回带 test 的匹配器，无效时为 null。
+const REGEX_META_RE = /[\\^$.*+?()[\]{}|]/;
 
-    const line = lines[i].trim();
-    if (!line) continue;
+export function compileSearchPattern(pattern) {
+  if (!REGEX_META_RE.test(pattern) && pattern.toLowerCase() === pattern.toUpperCase()) {
+    return { test: (message) => message.includes(pattern) };
+  }
+  try {
+    return new RegExp(pattern, "i");
+  } catch {
+    return null;
+  }
+}
 
-    const entry = parseLogLine(line, lineNum);
-    if (!entry) continue;
-    if (cats.length > 0 && !cats.includes(entry.category)) continue;
-    if (applyFilter && shouldExclude(entry.message)) continue;
-    if (startDate || endDate) {
-      if (!isTimestampInRange(entry.timestamp, startDate, endDate)) continue;
-    }
-    if (runContext || includeContext) {
-      const ctx = getRunContextForLine(lineNum, stateRanges);
-      entry.runContext = ctx;
-      if (runContext && ctx !== runContext) continue;
-    }
-    if (!regex.test(entry.message)) continue;
+// 多模式：每个模式只编译一次。any 判断是否命中任一模式：多个正则合并为一个交替正则，
+// 绝大多数行一次匹配即可排除（含反向引用时分组编号会错位，合并后无法编译——如重名的命名分组——时，
+// 都退回逐个判断）；which 返回命中的模式下标。返回 { any, which } 或 { error }。
+export function compileSearchPatterns(patterns) {
+  const testers = [];
+  for (const pattern of patterns) {
+    const tester = compileSearchPattern(pattern);
+    if (!tester) return { error: `Invalid regex pattern: ${pattern}` };
+    testers.push(tester);
+  }
+  const which = (message) => {
+    const hits = [];
+    for (let k = 0; k < testers.length; k++) if (testers[k].test(message)) hits.push(k);
+    return hits;
+  };
+  const regexes = testers.filter((t) => t instanceof RegExp);
+  if (testers.length === 1) return { any: testers[0], which };
+  const combined = regexes.length > 1 && !regexes.some((r) => /\\(?:[1-9]|k<)/.test(r.source)) ? combineRegexes(regexes) : null;
+  if (!combined) return { any: { test: (message) => testers.some((t) => t.test(message)) }, which };
+  const literals = testers.filter((t) => !(t instanceof RegExp));
+  return { any: { test: (message) => combined.test(message) || literals.some((t) => t.test(message)) }, which };
+}
 
-    matchCount++;
-    if (bytesExceeded) continue;
+function combineRegexes(regexes) {
+  try {
+    return new RegExp(regexes.map((r) => `(?:${r.source})`).join("|"), "i");
+  } catch {
+    return null;
+  }
+}
 
-    const parts = [`${lineNum}|`];
-    if (includeContext) {
-      const labels = { play: "[P]", edit: "[E]", unknown: "[?]" };
-      parts.push(labels[entry.runContext] || "[?]");
-    }
-    if (timestamps) {
-      parts.push(`[${entry.timestamp.slice(11, 19)}]`);
-    }
-    parts.push(entry.message);
-    const outputLine = parts.join(" ");
-    const lineBytes = Buffer.byteLength(outputLine, "utf-8") + 1;
+// 在文本收集器之外按模式分别记录命中：count 为扫描范围内的命中数，lines 为本页输出的行号
+export function createPatternCollector(collector, patterns, which) {
+  const perPattern = patterns.map((pattern) => ({ pattern, count: 0, lines: [] }));
+  return {
+    add(entry, ctx) {
+      const added = collector.add(entry, ctx);
+      for (const k of which(entry.message)) {
+        perPattern[k].count++;
+        if (added) perPattern[k].lines.push(entry.lineNum);
+      }
+      return added;
+    },
+    result(counted) {
+      return perPattern.map((p) => ({ ...p, count: counted ? p.count : null, lines: [...p.lines] }));
+    },
+  };
+}
 
-    if (currentBytes + lineBytes > MAX_BYTES && logLines.length > 0) {
-      bytesExceeded = true;
-      continue;
-    }
+// pattern 为字符串或字符串数组；传入数组时一次读取同时搜索所有模式，命中任一模式的行进入 logs，
+// 并在 patterns 中分别返回每个模式的命中数与本页行号
+export function searchLogsFromLine(
+  logPath,
+  pattern,
+  {
+    cursor = null,
+    count = true,
+    afterLine = null,
+    beforeLine = null,
+    startDate = null,
+    endDate = null,
+    timestamps = false,
+    categories = null,
+    applyFilter = true,
+    runContext = null,
+    includeContext = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    cache = false,
+  } = {},
+) {
+  const multi = Array.isArray(pattern);
+  const patterns = multi ? pattern : [pattern];
+  const empty = { logs: "", startLine: 0, lastLine: 0, matchCount: 0, remaining: 0, hasMore: false, cursor: null };
+  if (multi) empty.patterns = patterns.map((p) => ({ pattern: p, count: 0, lines: [] }));
+  if (!existsSync(logPath)) return empty;
 
-    if (startLine === null) startLine = lineNum;
-    logLines.push(outputLine);
-    lastLine = lineNum;
-    currentBytes += lineBytes;
-  }
+  if (patterns.length === 0) return { error: "No search pattern given" };
+  const search = compileSearchPatterns(patterns);
+  if (search.error) return search;
+  const pos = cursor ? decodeLogCursor(logPath, cursor) : null;
+  if (cursor && !pos) return invalidCursor(cursor);
 
-  const returnedCount = logLines.length;
-  return {
-    logs: logLines.join("\n"),
-    startLine: startLine || 0,
+  const range = compileTimeRange(startDate, endDate);
+  const query = { patterns, afterLine, beforeLine, startDate, endDate, timestamps, categories, applyFilter, runContext, includeContext, filterStats };
+  const key = cache && !cursor && count ? JSON.stringify(["search", logPath, query, filterRules.rules]) : null;
+  const { page, collector, textCollector, filterHits } = runPageQuery(
+    logPath,
+    key,
+    { beforeLine, runContext, count },
+    () => resolveScanStart(logPath, afterLine, range, pos),
+    () => {
+      const filterHits = filterStats ? new Map() : null;
+      const match = createLogLineMatcher({ categories, range, applyFilter, filterRules, filterHits, regex: search.any });
+      const textCollector = createTextCollector({ timestamps, includeContext, lineNumbers: true });
+      const collector = multi ? createPatternCollector(textCollector, patterns, search.which) : textCollector;
+      return { match, collector, textCollector, filterHits };
+    },
+  );
+
+  const { logs, startLine, lastLine, returned, remaining, hasMore } = textCollector.result();
+  const result = {
+    logs,
+    startLine,
     lastLine,
-    matchCount: returnedCount,
-    remaining: matchCount - returnedCount,
-    hasMore: matchCount > returnedCount,
+    matchCount: returned,
+    remaining: page.counted ? remaining : null,
+    hasMore,
+    cursor: page.cursor,
   };
+  if (multi) result.patterns = collector.result(page.counted);
+  if (filterHits) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+  return result;
+}
+
+export function createErrorsCollector({ maxErrors = 100, group = false, byScript = false } = {}) {
+  if (byScript) return createScriptErrorCollector(maxErrors);
+  return group ? createErrorGroupCollector(maxErrors) : createErrorCollector(maxErrors);
 }
 
 export function findErrors(
   logPath,
   {
+    cursor = null,
+    count = true,
     afterLine = null,
     beforeLine = null,
     startDate = null,
     endDate = null,
     runContext = null,
     maxErrors = 100,
+    group = false,
+    byScript = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
+    cache = false,
   } = {},
 ) {
-  const empty = { hasError: false, errorCount: 0, errors: [] };
+  const empty = byScript
+    ? { hasError: false, errorCount: 0, scriptCount: 0, scripts: [], unattributed: 0, hasMore: false, cursor: null }
+    : group
+      ? { hasError: false, errorCount: 0, groupCount: 0, groups: [], hasMore: false, cursor: null }
+      : { hasError: false, errorCount: 0, errors: [], hasMore: false, cursor: null };
   if (!existsSync(logPath)) return empty;
+  const pos = cursor ? decodeLogCursor(logPath, cursor) : null;
+  if (cursor && !pos) return invalidCursor(cursor);
 
-  const stateRanges = runContext ? buildGameStateIndex(logPath) : [];
-  const errors = [];
-  let totalErrors = 0;
+  const range = compileTimeRange(startDate, endDate);
+  const query = { afterLine, beforeLine, startDate, endDate, runContext, maxErrors, group, byScript, filterStats };
+  const key = cache && !cursor && count ? JSON.stringify(["errors", logPath, query, filterRules.rules]) : null;
+  // group / byScript：按签名 / 脚本聚合（maxErrors 限制组数 / 脚本数），总是扫描完整个范围，游标指向扫描结束的位置
+  const { page, collector, filterHits } = runPageQuery(
+    logPath,
+    key,
+    { beforeLine, runContext, count },
+    () => resolveScanStart(logPath, afterLine, range, pos),
+    () => {
+      const filterHits = filterStats ? new Map() : null;
+      const match = createLogLineMatcher({ errorsOnly: true, range, filterRules, filterHits });
+      return { match, collector: createErrorsCollector({ maxErrors, group, byScript }), filterHits };
+    },
+  );
 
-  const content = readFileSync(logPath, { encoding: "utf-8" });
-  const lines = content.split("\n");
+  const result = { ...collector.result(), cursor: page.cursor };
+  if (!page.counted) result.errorCount = null;
+  if (filterHits) result.filterStats = summarizeFilterStats(filterRules, filterHits);
+  return result;
+}
 
-  for (let i = 0; i < lines.length; i++) {
-    const lineNum = i + 1;
-    if (afterLine !== null && lineNum <= afterLine) continue;
-    if (beforeLine !== null && lineNum >= beforeLine) break;
+// ============ 统计摘要 ============
 
-    const line = lines[i].trim();
-    if (!line) continue;
+const MAX_RATE_BUCKETS = 60;
 
-    const entry = parseLogLine(line, lineNum);
-    if (!entry) continue;
-    if (!isErrorLog(entry)) continue;
-    if (shouldExclude(entry.message)) continue;
-    if (startDate || endDate) {
-      if (!isTimestampInRange(entry.timestamp, startDate, endDate)) continue;
+// 每秒行数的时间分桶：桶宽从 1 秒起，桶数超过 MAX_RATE_BUCKETS 时相邻两桶合并、桶宽翻倍，内存恒定
+function createRateBuckets() {
+  let start = null;
+  let width = 1000;
+  let counts = [];
+  let lastSecond = null;
+  let lastMs = 0;
+  return {
+    add(timestamp) {
+      const second = timestamp.slice(0, 19);
+      if (second !== lastSecond) {
+        lastSecond = second;
+        lastMs = Date.parse(second + "Z");
+      }
+      if (Number.isNaN(lastMs)) return;
+      if (start === null) start = lastMs;
+      let i = Math.max(0, Math.floor((lastMs - start) / width));
+      while (i >= MAX_RATE_BUCKETS) {
+        const merged = [];
+        for (let k = 0; k < counts.length; k += 2) merged.push((counts[k] || 0) + (counts[k + 1] || 0));
+        counts = merged;
+        width *= 2;
+        i = Math.floor((lastMs - start) / width);
+      }
+      while (counts.length <= i) counts.push(0);
+      counts[i]++;
+    },
+    result() {
+      const seconds = width / 1000;
+      return {
+        bucketSeconds: seconds,
+        buckets: counts.map((lines, i) => ({
+          start: new Date(start + i * width).toISOString(),
+          lines,
+          perSecond: Math.round((lines / seconds) * 100) / 100,
+        })),
+      };
+    },
+  };
+}
+
+const sortedCounts = (map) => Object.fromEntries([...map].sort((a, b) => b[1] - a[1]));
+
+// 单遍流式统计：各类别 / 级别的行数、错误数、用户输出与被过滤规则移除的行数和字节数、
+// play 会话数（从 edit 切换到 play 的次数）与按时间分桶的每秒行数。只保存计数，内存与日志大小无关。
+export function getLogStats(
+  logPath,
+  { afterLine = null, beforeLine = null, startDate = null, endDate = null, filterRules = DEFAULT_RULE_SET } = {},
+) {
+  const range = compileTimeRange(startDate, endDate);
+  const categories = new Map();
+  const levels = new Map();
+  const rate = createRateBuckets();
+  const stats = {
+    lines: 0,
+    bytes: 0,
+    unparsed: 0,
+    errors: 0,
+    output: { lines: 0, bytes: 0 },
+    filtered: { lines: 0, bytes: 0 },
+    playSessions: 0,
+    firstTimestamp: null,
+    lastTimestamp: null,
+  };
+  let playing = false;
+  // 没有时间戳的行（续行、空行等）按前面最近一条带时间戳的行归入时间窗口内外
+  let inRange = !range;
+
+  const visit = (text, lineNum, state) => {
+    if (beforeLine !== null && lineNum >= beforeLine) return false;
+    const line = text.trim();
+    const catStart = line ? locateLogCategory(line) : -1;
+    const entry = catStart === -1 ? null : parseLogLineAt(line, catStart, lineNum);
+    if (entry && range) {
+      const pos = timeRangePosition(entry.timestamp, range);
+      if (pos > 0) return false;
+      inRange = pos === 0;
     }
+    if (!inRange) return;
+
+    const isPlay = getRunContextForState(state) === "play";
+    if (isPlay && !playing) stats.playSessions++;
+    playing = isPlay;
 
-    let ctx = "unknown";
-    if (stateRanges.length > 0) {
-      ctx = getRunContextForLine(lineNum, stateRanges);
-      if (runContext && ctx !== runContext) continue;
+    const bytes = Buffer.byteLength(text, "utf-8") + 1;
+    stats.lines++;
+    stats.bytes += bytes;
+    if (!entry) {
+      stats.unparsed++;
+      return;
+    }
+    categories.set(entry.category, (categories.get(entry.category) || 0) + 1);
+    levels.set(entry.level, (levels.get(entry.level) || 0) + 1);
+    if (isErrorLogLine(line, catStart)) stats.errors++;
+    if (hasLogCategory(line, catStart, DEFAULT_CATEGORIES)) {
+      const bucket = isFilteredOut(entry.message, filterRules, null) ? stats.filtered : stats.output;
+      bucket.lines++;
+      bucket.bytes += bytes;
     }
+    if (stats.firstTimestamp === null) stats.firstTimestamp = entry.timestamp;
+    stats.lastTimestamp = entry.timestamp;
+    rate.add(entry.timestamp);
+  };
+  if (existsSync(logPath)) scanLogLines(logPath, resolveScanStart(logPath, afterLine, range, null), visit);
+
+  return { ...stats, categories: sortedCounts(categories), levels: sortedCounts(levels), rate: rate.result() };
+}
+
+// ============ 试玩会话 ============
+// 一次试玩：从非 play 状态切换到 PlayServer / PlayClient 起，到切换回 Edit（或其他非 play 状态）的前一行止。
+// 边界取自持久化的状态切换索引（含行首字节偏移），读取某次试玩的日志时直接 seek 到其起点。
+
+function durationBetween(startTime, endTime) {
+  const ms = Date.parse(endTime) - Date.parse(startTime);
+  return Number.isNaN(ms) ? null : ms;
+}
 
-    totalErrors++;
-    if (errors.length < maxErrors) {
-      errors.push({
-        line: lineNum,
-        timestamp: entry.timestamp,
-        message: entry.message,
-        category: entry.category,
-        level: entry.level,
-        context: ctx,
+// 每次试玩的 { id, states, startLine, endLine, startOffset, endOffset, startTime, endTime, durationMs, running }，
+// id 从 1 开始；仍在进行的试玩 endLine / endOffset / endTime / durationMs 为 null。
+// 内部字段 before 为起点之前的状态（构造游标用）。
+function collectPlaySessions(logPath) {
+  const sessions = [];
+  let prev = "Edit";
+  let current = null;
+  for (const t of loadGameStateTransitions(logPath)) {
+    const isPlay = getRunContextForState(t.state) === "play";
+    if (isPlay && !current) {
+      current = {
+        id: sessions.length + 1,
+        states: [],
+        startLine: t.line,
+        endLine: null,
+        startOffset: t.offset,
+        endOffset: null,
+        startTime: t.time,
+        endTime: null,
+        durationMs: null,
+        running: true,
+        before: prev,
+      };
+      sessions.push(current);
+    } else if (!isPlay && current) {
+      Object.assign(current, {
+        endLine: t.line - 1,
+        endOffset: t.offset,
+        endTime: t.time,
+        durationMs: durationBetween(current.startTime, t.time),
+        running: false,
       });
+      current = null;
     }
+    if (isPlay && !current.states.includes(t.state)) current.states.push(t.state);
+    prev = t.state;
   }
+  return sessions;
+}
+
+// 各次试玩中的错误数（与 findErrors 的 errorCount 一致）：从第一次试玩的起点单遍扫描，字节级预筛跳过非错误行
+function countSessionErrors(logPath, sessions, filterRules) {
+  if (sessions.length === 0) return;
+  const match = createLogLineMatcher({ errorsOnly: true, filterRules });
+  const first = sessions[0];
+  const last = sessions[sessions.length - 1];
+  const pos = { offset: first.startOffset, line: first.startLine, state: first.before };
+  const beforeLine = last.running ? null : last.endLine + 1;
+  let i = 0;
+  for (const session of sessions) session.errorCount = 0;
+  scanLogLines(logPath, { pos, beforeLine, prefilter: match.acceptsBytes }, (text, lineNum) => {
+    const entry = match(text, lineNum);
+    if (!entry) return;
+    while (i < sessions.length - 1 && !sessions[i].running && lineNum > sessions[i].endLine) i++;
+    if (lineNum >= sessions[i].startLine && (sessions[i].running || lineNum <= sessions[i].endLine)) {
+      sessions[i].errorCount++;
+    }
+  });
+}
 
-  return { hasError: totalErrors > 0, errorCount: totalErrors, errors };
+// 列出日志中的所有试玩会话（--sessions），errors 为 true 时附带每次试玩的 errorCount
+export function listPlaySessions(logPath, { errors = true, filterRules = DEFAULT_RULE_SET } = {}) {
+  if (!existsSync(logPath)) return { sessions: [] };
+  const sessions = collectPlaySessions(logPath);
+  if (errors) countSessionErrors(logPath, sessions, filterRules);
+  return { sessions: sessions.map(({ before, ...session }) => session) };
+}
+
+// --session N|last：返回限定到该次试玩的查询范围 { session, cursor, beforeLine }，
+// cursor 指向试玩起点（可直接作为 getLogsFromLine / findErrors / searchLogsFromLine 的 cursor），
+// beforeLine 为试玩结束后的第一行（仍在进行时为 null）。找不到时返回 { error }
+export function resolvePlaySession(logPath, selector) {
+  const sessions = existsSync(logPath) ? collectPlaySessions(logPath) : [];
+  const found = selector === "last" ? sessions[sessions.length - 1] : sessions[Number(selector) - 1];
+  if (!found || (selector !== "last" && !Number.isInteger(Number(selector)))) {
+    return {
+      error: sessions.length === 0 ? "No play sessions in this log" : `Unknown session: ${selector} (1-${sessions.length} or "last")`,
+    };
+  }
+  const { before, ...session } = found;
+  return {
+    session,
+    cursor: encodeLogCursor(logPath, { offset: session.startOffset, line: session.startLine, state: before }),
+    beforeLine: session.running ? null : session.endLine + 1,
+  };
 }
 
 export function findLatestStudioLog() {
@@ -402,19 +1724,52 @@ export function findLatestStudioLog() {
   return files.length > 0 ? join(LOG_DIR, files[0].name) : null;
 }
 
-export function cleanOldLogs(days = 7) {
-  if (!existsSync(LOG_DIR)) return 0;
+// Studio 在日志开头记录打开的 place 文件
+export const PLACE_PATH_RE = /\[FLog::FileOpenEventHandler\] Trying to open local file (.+)/;
+export const PLACE_SEARCH_LINES = 200;
+
+// 归档元数据（一遍读取）：打开的 place、首末时间戳、行数与错误级别的行数
+function describeLog(logPath) {
+  const info = { place: null, started: null, ended: null, lines: 0, errorCount: 0 };
+  for (const { text, lineNum } of readLogLines(logPath)) {
+    info.lines = lineNum;
+    if (info.place === null && lineNum <= PLACE_SEARCH_LINES) {
+      const m = PLACE_PATH_RE.exec(text);
+      if (m) info.place = m[1].trim();
+    }
+    const line = text.trim();
+    const catStart = locateLogCategory(line);
+    const entry = catStart === -1 ? null : parseLogLineAt(line, catStart);
+    if (!entry) continue;
+    if (info.started === null) info.started = entry.timestamp;
+    info.ended = entry.timestamp;
+    if (isErrorLogLine(line, catStart)) info.errorCount++;
+  }
+  return info;
+}
+
+// 处理超过 days 天未写入的日志：默认删除（连同过期的归档）；archive 为 true 时就地压缩为 .log.gz / .log.zst（format），
+// 附带元数据旁路文件（place、时间范围、行数、错误数），归档仍可通过各读取接口直接查询。
+// 被删除或归档的日志的检查点记录与倒排索引一并删除。返回处理的文件数。
+export function cleanOldLogs(days = 7, { archive = false, format = "gzip", logDir = LOG_DIR } = {}) {
+  if (archive && !LOG_COMPRESSION_FORMATS[format]) throw new Error(`Unsupported compression format: ${format}`);
+  if (!existsSync(logDir)) return 0;
   const threshold = days * 24 * 60 * 60 * 1000;
   const now = Date.now();
   let count = 0;
-  for (const f of readdirSync(LOG_DIR)) {
-    if (!f.endsWith(".log")) continue;
-    const p = join(LOG_DIR, f);
+  for (const f of readdirSync(logDir)) {
+    const isLog = f.endsWith(".log");
+    if (!isLog && (archive || !isCompressedLog(f))) continue;
+    const p = join(logDir, f);
     try {
-      if (now - statSync(p).mtimeMs > threshold) {
-        unlinkSync(p);
-        count++;
-      }
+      if (now - statSync(p).mtimeMs <= threshold) continue;
+      if (!isLog) removeLogArchive(p);
+      else if (archive) {
+        if (compressLog(p, { format, info: describeLog(p) }).error) continue;
+      } else unlinkSync(p);
+      rmSync(join(getSearchIndexDir(), f), { recursive: true, force: true });
+      rmSync(checkpointRecordPath(p), { force: true });
+      count++;
     } catch {}
   }
   return count;
@@ -430,6 +1785,8 @@ export function getLogsByDate(
     applyFilter = true,
     runContext = null,
     includeContext = false,
+    filterRules = DEFAULT_RULE_SET,
+    filterStats = false,
   } = {},
 ) {
   return getLogsFromLine(logPath, {
@@ -442,5 +1799,7 @@ export function getLogsByDate(
     applyFilter,
     runContext,
     includeContext,
+    filterRules,
+    filterStats,
   });
 }
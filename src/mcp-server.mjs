@@ -3,9 +3,20 @@
 import { McpServer } from "@modelcontextprotocol/sdk/server/mcp.js";
 import { StdioServerTransport } from "@modelcontextprotocol/sdk/server/stdio.js";
 import { z } from "zod";
-import { readFileSync, existsSync } from "node:fs";
 import { join } from "node:path";
-import { getLogsFromLine, findErrors } from "./log-utils.mjs";
+import {
+  getLogsFromLine,
+  searchLogsFromLine,
+  findErrors,
+  getLogStats,
+  getLogLastLine,
+  listPlaySessions,
+  resolvePlaySession,
+} from "./log-utils.mjs";
+import { waitForLogs } from "./log-follow.mjs";
+import { searchLogsIndexed } from "./log-index.mjs";
+import { queryFromNamedCursor } from "./log-cursors.mjs";
+import { loadFilterRules, findFilterConfig } from "./log-filter.mjs";
 import { detectToolbarState } from "./toolbar-detector.mjs";
 import { ensureScreenshotDir, recordViewport } from "./screenshot-utils.mjs";
 
@@ -74,12 +85,6 @@ async function handleStatus(placePath) {
   const modals = p.getModalWindows(session.hwnd, session.pid);
   const hasModal = modals.length > 0;
 
-  let logLastLine = 0;
-  if (session.logPath && existsSync(session.logPath)) {
-    const content = readFileSync(session.logPath, "utf-8");
-    logLastLine = content.split("\n").length;
-  }
-
   return {
     active: true,
     ready: !hasModal,
@@ -87,7 +92,7 @@ async function handleStatus(placePath) {
     pid: session.pid,
     hwnd: session.hwnd,
     log_path: session.logPath,
-    log_last_line: logLastLine,
+    log_last_line: getLogLastLine(session.logPath),
     has_modal: hasModal,
     modal_count: modals.length,
     modals: modals.map((m) => ({
@@ -150,24 +155,118 @@ async function handleLog(placePath, options = {}) {
   const [ok, msg, session] = await sm.getSession(placePath);
   if (!ok) return { error: msg };
 
+  let filterRules;
+  try {
+    filterRules = loadFilterRules(findFilterConfig(placePath));
+  } catch (e) {
+    return { error: e.message };
+  }
+
+  if (options.sessions) return listPlaySessions(session.logPath, { filterRules });
+
+  // session: 只读取该次试玩的范围（从其起点 seek，到结束行为止）
+  let play = null;
+  if (options.session != null) {
+    play = resolvePlaySession(session.logPath, options.session);
+    if (play.error) return { error: play.error };
+  }
+  const playEnd = play && play.beforeLine !== null && !(options.before_line < play.beforeLine);
+
   const logOpts = {
     afterLine: options.after_line,
-    beforeLine: options.before_line,
+    beforeLine: playEnd ? play.beforeLine : options.before_line,
     startDate: options.start_date,
     endDate: options.end_date,
     timestamps: options.timestamps,
     runContext: options.context,
     includeContext: true,
+    filterRules,
+    filterStats: options.filter_stats,
+    cursor: options.cursor,
+    count: options.count,
   };
 
-  if (options.errors) {
-    return findErrors(session.logPath, {
+  if (options.stats) {
+    const { beforeLine, startDate, endDate } = logOpts;
+    const afterLine = play ? Math.max(logOpts.afterLine ?? 0, play.session.startLine - 1) : logOpts.afterLine;
+    return withPlaySession(getLogStats(session.logPath, { afterLine, beforeLine, startDate, endDate, filterRules }), play);
+  }
+
+  if (options.follow) {
+    return waitForLogs(session.logPath, {
+      ...logOpts,
+      afterLine: options.after_line ?? null,
+      errorsOnly: options.errors,
+      timeoutMs: options.wait_ms ?? 10000,
+    });
+  }
+
+  // 长驻进程：重复的错误查询只扫描新追加的部分
+  const query = (cursor) => {
+    cursor = cursor ?? play?.cursor;
+    if (options.errors) {
+      return findErrors(session.logPath, {
+        ...logOpts,
+        cursor,
+        maxErrors: options.max_errors || 100,
+        group: options.group,
+        byScript: options.by_script,
+        cache: true,
+      });
+    }
+    return getLogsFromLine(session.logPath, {
       ...logOpts,
-      maxErrors: options.max_errors || 100,
+      cursor,
+      last: options.last,
+      collapse: options.collapse,
+      maxLineLength: options.max_line_length,
+      sample: options.sample,
     });
+  };
+
+  // since: "last"：从该客户端上次读到的位置继续，并把游标前移
+  if (options.since === "last") {
+    return withPlaySession(await queryFromNamedCursor(options.client_id, session.logPath, query), play);
   }
+  return withPlaySession(query(options.cursor), play);
+}
 
-  return getLogsFromLine(session.logPath, logOpts);
+// 限定到某次试玩时在结果中附带该试玩的信息
+function withPlaySession(result, play) {
+  return play && !result.error ? { session: play.session, ...result } : result;
+}
+
+async function handleSearch(placePath, patterns, options = {}) {
+  const sm = await getStudioManager();
+  const [ok, msg, session] = await sm.getSession(placePath);
+  if (!ok) return { error: msg };
+
+  let filterRules;
+  try {
+    filterRules = loadFilterRules(findFilterConfig(placePath));
+  } catch (e) {
+    return { error: e.message };
+  }
+
+  const searchOpts = {
+    afterLine: options.after_line,
+    beforeLine: options.before_line,
+    startDate: options.start_date,
+    endDate: options.end_date,
+    timestamps: options.timestamps,
+    runContext: options.context,
+    includeContext: true,
+    filterRules,
+    filterStats: options.filter_stats,
+    cursor: options.cursor,
+    count: options.count,
+  };
+  // 轮询（无 cursor、统计总数）走增量结果缓存，重复查询只读取新追加的字节；
+  // 缓存不覆盖的翻页查询在该日志已有倒排索引时只读取候选行（不为当前会话新建索引）
+  if (options.cursor || options.count === false) {
+    return searchLogsIndexed(session.logPath, patterns, { ...searchOpts, createIndex: false });
+  }
+  return searchLogsFromLine(session.logPath, patterns, { ...searchOpts, cache: true });
 }
 
 async function handleScreenshot(placePath, options = {}) {
@@ -413,17 +512,33 @@ server.tool(
 
 server.tool(
   "get_logs",
-  "Get filtered logs from a Studio instance. Returns user script output (FLog::Output, Warning, Error) with play/edit context labels. Use after_line for incremental reading.",
+  "Get filtered logs from a Studio instance. Returns user script output (FLog::Output, Warning, Error) with play/edit context labels. Use last=N for the most recent lines, the returned cursor (or after_line) for pagination and incremental reading, since=last to let the server remember where this client stopped, or follow=true to wait for newly appended lines.",
   {
     place_path: z.string().describe("Absolute path to the .rbxl place file"),
+    last: z.number().optional().describe("Only return the last N matching log lines, read backwards from the end of the file (newest lines are kept when the output budget is hit)"),
     after_line: z.number().optional().describe("Only return logs after this line number (for incremental reading)"),
     before_line: z.number().optional().describe("Only return logs before this line number"),
     start_date: z.string().optional().describe("Start date filter (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"),
     end_date: z.string().optional().describe("End date filter (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"),
     timestamps: z.boolean().optional().default(false).describe("Include timestamps in log output"),
     context: z.enum(["play", "edit"]).optional().describe("Filter by run context: play (game running) or edit (edit mode)"),
+    stats: z.boolean().optional().default(false).describe("If true, return only a compact summary (per-category/level counts, error count, lines per second over time buckets, play session count, output vs filtered bytes) computed in one pass; useful before deciding which raw logs to fetch"),
+    sessions: z.boolean().optional().default(false).describe("If true, return only the list of play sessions in this log (Edit -> PlayServer/PlayClient -> Edit runs): id, line range, byte offsets, time range, duration and error count. Use the id with session to read one run"),
+    session: z.union([z.number().int().min(1), z.literal("last")]).optional().describe("Restrict logs, errors or stats to one play session: its id from sessions=true, or \"last\" for the most recent run (still running or not). Read directly from the run's byte range; the result includes the session"),
     errors: z.boolean().optional().default(false).describe("If true, detect and return only errors instead of all logs"),
     max_errors: z.number().optional().describe("Maximum number of errors to return (default 100, only with errors=true)"),
+    group: z.boolean().optional().default(false).describe("With errors=true, group repeated errors by a signature (numbers, instance paths and GUIDs stripped) and return one entry per group with count, first/last line and a sample, most frequent first; max_errors limits the number of groups"),
+    by_script: z.boolean().optional().default(false).describe("With errors=true, return an index of error counts per script and line (location taken from the attached Lua stack trace), hottest scripts first; max_errors limits the number of scripts"),
+    follow: z.boolean().optional().default(false).describe("If true, wait for new log lines after after_line (or after the current end of the log) and return them as entries with line numbers; pass the returned lastLine as after_line to continue"),
+    wait_ms: z.number().optional().describe("Maximum time to wait for new lines in follow mode (default 10000)"),
+    filter_stats: z.boolean().optional().default(false).describe("If true, report how many lines each filter rule removed (built-in rules plus rspo-log-filter.json next to the place file)"),
+    cursor: z.string().optional().describe("Opaque cursor returned by a previous call; resumes exactly where that result stopped (next page, or newly appended lines)"),
+    collapse: z.boolean().optional().default(false).describe("Collapse runs of consecutive identical or near-identical messages (differing only in numbers, instance paths or GUIDs) into one line \"message (xN, lines a–b)\"; useful when a loop floods the output"),
+    max_line_length: z.number().int().min(1).optional().describe("Truncate messages longer than this many characters, with a marker giving the number of characters cut"),
+    sample: z.number().int().min(1).optional().describe("Keep at most this many lines per second for each message signature; the rest are skipped and reported as dropped"),
+    count: z.boolean().optional().describe("Set to false to stop as soon as the page is full instead of counting the remaining matches (remaining / errorCount become null)"),
+    since: z.enum(["last"]).optional().describe("Set to \"last\" to resume from the position this client reached on its previous since=last call (stored by the server per client_id and log file, kept across restarts) and advance it; the first call reads from the start of the log. Replaces cursor/after_line"),
+    client_id: z.string().optional().describe("Client ID the since=last position is stored under (default \"default\"); use distinct IDs for independent readers"),
   },
   async ({ place_path, ...options }) => {
     try {
@@ -435,6 +550,32 @@ server.tool(
   },
 );
 
+server.tool(
+  "search_logs",
+  "Search the filtered logs of a Studio instance for one or more patterns in a single read of the log file. Returns the matching lines (with line numbers and play/edit context) plus, per pattern, its match count and the line numbers on this page. Cheaper than fetching get_logs and filtering it yourself.",
+  {
+    place_path: z.string().describe("Absolute path to the .rbxl place file"),
+    patterns: z.array(z.string()).min(1).describe("Case-insensitive regular expressions matched against the log message; plain text works as-is. A line is returned if any pattern matches"),
+    after_line: z.number().optional().describe("Only search lines after this line number"),
+    before_line: z.number().optional().describe("Only search lines before this line number"),
+    start_date: z.string().optional().describe("Start date filter (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"),
+    end_date: z.string().optional().describe("End date filter (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"),
+    timestamps: z.boolean().optional().default(false).describe("Include timestamps in log output"),
+    context: z.enum(["play", "edit"]).optional().describe("Filter by run context: play (game running) or edit (edit mode)"),
+    filter_stats: z.boolean().optional().default(false).describe("If true, report how many lines each filter rule removed"),
+    cursor: z.string().optional().describe("Opaque cursor returned by a previous call; resumes exactly where that result stopped"),
+    count: z.boolean().optional().describe("Set to false to stop as soon as the page is full instead of counting the remaining matches (remaining and per-pattern counts become null)"),
+  },
+  async ({ place_path, patterns, ...options }) => {
+    try {
+      const result = await handleSearch(place_path, patterns, options);
+      return { content: [{ type: "text", text: JSON.stringify(result, null, 2) }] };
+    } catch (e) {
+      return { content: [{ type: "text", text: JSON.stringify({ error: e.message }) }], isError: true };
+    }
+  },
+);
+
 server.tool(
   "screenshot",
   "Capture a screenshot of the Roblox Studio window. Saves to a temp directory and returns the file path.",
@@ -1,11 +1,15 @@
 import { describe, it, expect } from "vitest";
-import { parseOptions, getCommandExamples } from "../src/cli-parse.mjs";
+import { parseOptions, getCommandExamples, findLogOptionConflict } from "../src/cli-parse.mjs";
 
 describe("parseOptions", () => {
   it("returns empty object for empty args", () => {
     expect(parseOptions([])).toEqual({});
   });
 
+  it("parses --last", () => {
+    expect(parseOptions(["--last", "50"])).toEqual({ last: 50 });
+  });
+
   it("parses --after-line", () => {
     expect(parseOptions(["--after-line", "100"])).toEqual({ after_line: 100 });
   });
@@ -58,6 +62,74 @@ describe("parseOptions", () => {
     expect(parseOptions(["--errors"])).toEqual({ errors: true });
   });
 
+  it("parses --group flag", () => {
+    expect(parseOptions(["--errors", "--group"])).toEqual({ errors: true, group: true });
+    expect(parseOptions(["--errors", "--by-script"])).toEqual({ errors: true, by_script: true });
+  });
+
+  it("parses repeated --grep patterns", () => {
+    expect(parseOptions(["--grep", "nil", "--grep", "timeout"])).toEqual({ grep: ["nil", "timeout"] });
+  });
+
+  it("parses --stats flag", () => {
+    expect(parseOptions(["--stats"])).toEqual({ stats: true });
+  });
+
+  it("parses --follow flag", () => {
+    expect(parseOptions(["--follow"])).toEqual({ follow: true });
+  });
+
+  it("parses --filter-config and --filter-stats", () => {
+    expect(parseOptions(["--filter-config", "rules.json", "--filter-stats"])).toEqual({
+      filter_config: "rules.json",
+      filter_stats: true,
+    });
+  });
+
+  it("parses --parallel with and without a worker count", () => {
+    expect(parseOptions(["--parallel", "4", "--errors"])).toEqual({ parallel: 4, errors: true });
+    expect(parseOptions(["--parallel", "--errors"])).toEqual({ parallel: true, errors: true });
+  });
+
+  it("parses --cursor and --no-count", () => {
+    expect(parseOptions(["--cursor", "eyJmIjoiYSJ9", "--no-count"])).toEqual({ cursor: "eyJmIjoiYSJ9", count: false });
+  });
+
+  it("rejects output shaping options combined with --grep", () => {
+    expect(findLogOptionConflict(parseOptions(["--grep", "boom", "--last", "50", "--collapse"]))).toBe(
+      "--grep 不能与 --last、--collapse 同时使用",
+    );
+    expect(findLogOptionConflict(parseOptions(["--grep", "boom", "--max-line-length", "300", "--sample", "5"]))).toContain("--sample");
+    expect(findLogOptionConflict(parseOptions(["--grep", "boom", "--timestamps"]))).toBeNull();
+    expect(findLogOptionConflict(parseOptions(["--last", "50", "--collapse"]))).toBeNull();
+  });
+
+  it("parses output shaping options", () => {
+    expect(parseOptions(["--collapse", "--max-line-length", "300", "--sample", "5"])).toEqual({
+      collapse: true,
+      max_line_length: 300,
+      sample: 5,
+    });
+  });
+
+  it("parses --sessions and --session", () => {
+    expect(parseOptions(["--sessions"])).toEqual({ sessions: true });
+    expect(parseOptions(["--session", "2", "--errors"])).toEqual({ session: 2, errors: true });
+    expect(parseOptions(["--session", "last"])).toEqual({ session: "last" });
+  });
+
+  it("parses --since and --client", () => {
+    expect(parseOptions(["--since", "last", "--client", "agent-1"])).toEqual({ since: "last", client: "agent-1" });
+  });
+
+  it("parses --no-index flag", () => {
+    expect(parseOptions(["--no-index"])).toEqual({ index: false });
+  });
+
+  it("parses --days and --max-results", () => {
+    expect(parseOptions(["search", "nil", "--days", "7", "--max-results", "20"])).toEqual({ days: 7, max_results: 20 });
+  });
+
   it("parses multiple options together", () => {
     const result = parseOptions([
       "some_path",
@@ -88,7 +160,7 @@ describe("parseOptions", () => {
 
 describe("getCommandExamples", () => {
   it("returns examples for known commands", () => {
-    for (const cmd of ["list", "open", "close", "status", "modal", "game", "log", "screenshot", "toolbar", "save", "record"]) {
+    for (const cmd of ["list", "open", "close", "status", "modal", "game", "log", "logs", "screenshot", "toolbar", "save", "record"]) {
       const ex = getCommandExamples(cmd);
       expect(ex, `expected examples for '${cmd}'`).not.toBeNull();
       expect(typeof ex).toBe("string");
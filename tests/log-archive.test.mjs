@@ -0,0 +1,85 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, mkdirSync, rmSync, utimesSync, existsSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { searchAllLogs, findErrorsAllLogs } from "../src/log-archive.mjs";
+
+let tmpDir;
+const files = [];
+
+const line = (sec, category, message, level = "") =>
+  `2026-02-0${sec < 60 ? 3 : 4}T09:00:${String(sec % 60).padStart(2, "0")}.000Z,${sec}.000,1000,${sec}${level} [${category}] ${message}`;
+
+// 三个会话：每个会话打开不同的 place，都在 Play 中出现同一个回归错误
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-archive-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  for (let n = 0; n < 3; n++) {
+    const logPath = join(tmpDir, `0.1.0_2026020${n + 1}T090000Z_Studio_${n}_last.log`);
+    const lines = [
+      line(1, "FLog::FileOpenEventHandler", `Trying to open local file D:/games/place${n}.rbxl`),
+      line(2, "FLog::Output", `edit print ${n}`),
+      line(3, "FLog::Error", "Workspace.Old:1: edit-time error"),
+      line(4, "FLog::AssetDataModelManager", "Setting StudioGameStateType to StudioGameStateType_PlayServer"),
+    ];
+    for (let i = 0; i < n + 1; i++) lines.push(line(10 + i, "FLog::Error", "ServerScript.Main:42: attempt to index nil with 'Parent'"));
+    lines.push(line(20, "FLog::Output", "Info: filtered"));
+    writeFileSync(logPath, lines.join("\n"), "utf-8");
+    files.push(logPath);
+  }
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+describe("searchAllLogs", () => {
+  it("streams matches per file in order, tagged with file, line and session", async () => {
+    const seen = [];
+    const summary = await searchAllLogs("index nil", { files, workers: 2, categories: ["FLog::Error"] }, (r) => seen.push(r));
+    expect(summary).toEqual({ files: 3, matchedFiles: 3, matches: 6 });
+    expect(seen.map((r) => r.count)).toEqual([1, 2, 3]);
+    expect(seen[1].file).toBe("0.1.0_20260202T090000Z_Studio_1_last.log");
+    expect(seen[1].session).toEqual({ place: "D:/games/place1.rbxl", started: "2026-02-03T09:00:01.000Z" });
+    const { line: lineNum, context, category } = seen[1].hits[1];
+    expect({ lineNum, context, category }).toEqual({ lineNum: 6, context: "play", category: "FLog::Error" });
+  });
+
+  it("uses the per-log search index when one can be written", async () => {
+    const options = { files, workers: 2, categories: ["FLog::Error"], indexDir: join(tmpDir, "index") };
+    const indexed = [];
+    const sequential = [];
+    await searchAllLogs("attempt to index", options, (r) => indexed.push(r));
+    await searchAllLogs("attempt to index", { ...options, useIndex: false }, (r) => sequential.push(r));
+    expect(indexed).toEqual(sequential);
+    expect(existsSync(join(tmpDir, "index", "0.1.0_20260203T090000Z_Studio_2_last.log", "manifest.json"))).toBe(true);
+  });
+
+  it("caps hits per file but keeps full counts", async () => {
+    const seen = [];
+    await searchAllLogs("index nil", { files, workers: 1, categories: ["FLog::Error"], maxResults: 1 }, (r) => seen.push(r));
+    expect(seen[2].hits.length).toBe(1);
+    expect(seen[2].count).toBe(3);
+  });
+
+  it("returns an error for invalid patterns", async () => {
+    expect((await searchAllLogs("[bad", { files })).error).toBeDefined();
+  });
+});
+
+describe("findErrorsAllLogs", () => {
+  it("filters by run context across sessions", async () => {
+    const seen = [];
+    const summary = await findErrorsAllLogs({ files, workers: 3, runContext: "edit" }, (r) => seen.push(r));
+    expect(summary.matches).toBe(3);
+    expect(seen.every((r) => r.hits.every((h) => h.message.includes("edit-time")))).toBe(true);
+  });
+
+  it("skips files last written before the start date", async () => {
+    const old = new Date("2026-01-01T00:00:00Z");
+    utimesSync(files[0], old, old);
+    const seen = [];
+    const summary = await findErrorsAllLogs({ files, workers: 2, startDate: "2026-02-01" }, (r) => seen.push(r.file));
+    expect(summary.files).toBe(2);
+    expect(seen).not.toContain("0.1.0_20260201T090000Z_Studio_0_last.log");
+  });
+});
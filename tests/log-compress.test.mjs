@@ -0,0 +1,135 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, readFileSync, mkdirSync, rmSync, copyFileSync, existsSync, statSync, utimesSync } from "node:fs";
+import { gunzipSync } from "node:zlib";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import {
+  compressLog,
+  readLogMeta,
+  logMetaPath,
+  statLog,
+  LOG_COMPRESSION_FORMATS,
+} from "../src/log-compress.mjs";
+import { readLogLines, readLogLinesReverse } from "../src/log-reader.mjs";
+import { getLogsFromLine, searchLogsFromLine, findErrors } from "../src/log-utils.mjs";
+
+let tmpDir;
+let content;
+
+// 约 3 MB，跨越多个压缩块
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-compress-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  const lines = [];
+  for (let i = 0; i < 30000; i++) {
+    const ts = new Date(Date.UTC(2026, 1, 3, 10, 0, 0) + i * 100).toISOString();
+    const head = `${ts},${i}.000,1000,${i + 1}`;
+    if (i % 5000 === 4999) lines.push(`${head} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_PlayServer`);
+    else if (i % 211 === 0) lines.push(`${head} [FLog::Error] Workspace.Script:${i % 9}: boom ${i}`);
+    else lines.push(`${head} [FLog::Output] print value=${i} 日志 ${"x".repeat(i % 40)}`);
+  }
+  content = lines.join("\n");
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+function archive(name, format = "gzip") {
+  const logPath = join(tmpDir, name);
+  writeFileSync(logPath, content, "utf-8");
+  utimesSync(logPath, new Date("2026-02-03T12:00:00Z"), new Date("2026-02-03T12:00:00Z"));
+  return { logPath, result: compressLog(logPath, { format, info: { place: "D:/game.rbxl", errorCount: 143 } }) };
+}
+
+describe("compressLog", () => {
+  it("replaces the log with a standard gzip file plus a metadata sidecar", () => {
+    const { logPath, result } = archive("session.log");
+    expect(result.path).toBe(logPath + ".gz");
+    expect(existsSync(logPath)).toBe(false);
+    expect(gunzipSync(readFileSync(result.path)).toString("utf-8")).toBe(content);
+    expect(result.compressedSize * 5).toBeLessThan(result.size);
+    expect(statSync(result.path).mtime.toISOString()).toBe("2026-02-03T12:00:00.000Z");
+
+    const meta = readLogMeta(result.path);
+    expect([meta.format, meta.source, meta.place, meta.errorCount]).toEqual(["gzip", "session.log", "D:/game.rbxl", 143]);
+    expect(meta.blocks.length).toBeGreaterThan(2);
+    expect(statLog(result.path).size).toBe(Buffer.byteLength(content));
+  });
+
+  it("rejects unknown formats", () => {
+    const logPath = join(tmpDir, "unknown.log");
+    writeFileSync(logPath, content, "utf-8");
+    expect(compressLog(logPath, { format: "lz4" }).error).toMatch(/lz4/);
+    expect(existsSync(logPath)).toBe(true);
+  });
+
+  it("removes the temporary archive and keeps the log when compression fails", () => {
+    const logPath = join(tmpDir, "failing.log");
+    writeFileSync(logPath, content, "utf-8");
+    // 第二块压缩时失败：临时文件已经写入了第一块
+    let calls = 0;
+    LOG_COMPRESSION_FORMATS.failing = {
+      ext: ".fail",
+      compress: (buf) => {
+        if (++calls > 1) throw new Error("disk full");
+        return Buffer.from(buf);
+      },
+    };
+    try {
+      expect(compressLog(logPath, { format: "failing" }).error).toMatch(/disk full/);
+    } finally {
+      delete LOG_COMPRESSION_FORMATS.failing;
+    }
+    expect(existsSync(logPath + ".fail.tmp")).toBe(false);
+    expect(existsSync(logMetaPath(logPath + ".fail"))).toBe(false);
+    expect(readFileSync(logPath, "utf-8")).toBe(content);
+  });
+
+  it("round-trips zstd when the runtime supports it", () => {
+    if (!LOG_COMPRESSION_FORMATS.zstd) return;
+    const { result } = archive("session-zstd.log", "zstd");
+    expect(result.path.endsWith(".log.zst")).toBe(true);
+    expect([...readLogLines(result.path)].map((l) => l.text).join("\n")).toBe(content);
+  });
+});
+
+describe("transparent reads of archived logs", () => {
+  let plainPath;
+  let archivePath;
+
+  beforeAll(() => {
+    plainPath = join(tmpDir, "plain.log");
+    writeFileSync(plainPath, content, "utf-8");
+    archivePath = archive("archived.log").result.path;
+  });
+
+  it("yields the same lines and offsets forwards, backwards and from a mid-file offset", () => {
+    expect([...readLogLines(archivePath)]).toEqual([...readLogLines(plainPath)]);
+    expect([...readLogLinesReverse(archivePath)]).toEqual([...readLogLinesReverse(plainPath)]);
+    const { offset, lineNum } = [...readLogLines(plainPath)][17000];
+    const from = { startOffset: offset, startLine: lineNum };
+    expect([...readLogLines(archivePath, from)]).toEqual([...readLogLines(plainPath, from)]);
+  });
+
+  it("answers log queries exactly like the uncompressed log", () => {
+    const options = { includeContext: true, timestamps: true, startDate: "2026-02-03T10:20:00" };
+    const strip = ({ cursor, ...rest }) => rest;
+    expect(strip(getLogsFromLine(archivePath, options))).toEqual(strip(getLogsFromLine(plainPath, options)));
+    expect(strip(getLogsFromLine(archivePath, { last: 20 }))).toEqual(strip(getLogsFromLine(plainPath, { last: 20 })));
+    expect(strip(findErrors(archivePath, { byScript: true }))).toEqual(strip(findErrors(plainPath, { byScript: true })));
+    expect(strip(searchLogsFromLine(archivePath, "value=2\\d{4} "))).toEqual(strip(searchLogsFromLine(plainPath, "value=2\\d{4} ")));
+
+    const first = getLogsFromLine(archivePath);
+    const next = getLogsFromLine(archivePath, { cursor: first.cursor });
+    expect(next.startLine).toBe(first.lastLine + 1);
+  });
+
+  it("falls back to whole-file decompression without the sidecar", () => {
+    const copy = join(tmpDir, "copied.log.gz");
+    copyFileSync(archivePath, copy);
+    expect(existsSync(logMetaPath(copy))).toBe(false);
+    expect(readLogMeta(copy)).toBeNull();
+    expect(statLog(copy).size).toBe(Buffer.byteLength(content));
+    expect([...readLogLinesReverse(copy)].length).toBe(30000);
+  });
+});
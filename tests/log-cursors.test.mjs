@@ -0,0 +1,83 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, appendFileSync, mkdirSync, rmSync, readFileSync, readdirSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { getLogsFromLine, findErrors } from "../src/log-utils.mjs";
+import { readNamedCursor, writeNamedCursor, queryFromNamedCursor } from "../src/log-cursors.mjs";
+
+const line = (n, msg, level = "") =>
+  `2026-02-03T08:52:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n}${level} [FLog::Output] ${msg}`;
+
+let tmpDir;
+let storeDir;
+
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-cursors-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  storeDir = join(tmpDir, "cursors");
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+const readSince = (client, logPath) =>
+  queryFromNamedCursor(client, logPath, (cursor) => getLogsFromLine(logPath, { cursor }), { storeDir });
+
+describe("named log cursors", () => {
+  it("returns only what was appended since the previous call and advances", async () => {
+    const logPath = join(tmpDir, "since.log");
+    writeFileSync(logPath, line(1, "first") + "\n" + line(2, "second") + "\n", "utf-8");
+
+    expect((await readSince("agent", logPath)).logs).toBe("first\nsecond");
+    expect((await readSince("agent", logPath)).logs).toBe("");
+
+    appendFileSync(logPath, line(3, "third") + "\n");
+    const result = await readSince("agent", logPath);
+    expect(result.logs).toBe("third");
+    expect(result.startLine).toBe(3);
+    expect((await readSince("agent", logPath)).logs).toBe("");
+  });
+
+  it("keeps a separate position per client", async () => {
+    const logPath = join(tmpDir, "clients.log");
+    writeFileSync(logPath, line(1, "one") + "\n", "utf-8");
+
+    await readSince("a", logPath);
+    appendFileSync(logPath, line(2, "two") + "\n");
+
+    expect((await readSince("a", logPath)).logs).toBe("two");
+    expect((await readSince("b", logPath)).logs).toBe("one\ntwo");
+    // 每个客户端一个文件，互不覆盖
+    const files = readdirSync(storeDir);
+    expect(files.some((f) => f.endsWith(".tmp"))).toBe(false);
+    const stores = files.map((f) => JSON.parse(readFileSync(join(storeDir, f), "utf-8")));
+    expect(stores.filter((st) => st.client === "a" || st.client === "b").map((st) => st.cursors["clients.log"].line)).toEqual([3, 3]);
+  });
+
+  it("works with error queries and survives reloading the store", async () => {
+    const logPath = join(tmpDir, "errors.log");
+    writeFileSync(logPath, line(1, "boom", ",Error") + "\n" + line(2, "fine") + "\n", "utf-8");
+    const errorsSince = () =>
+      queryFromNamedCursor("err", logPath, (cursor) => findErrors(logPath, { cursor }), { storeDir });
+
+    expect((await errorsSince()).errors.map((e) => e.message)).toEqual(["boom"]);
+    appendFileSync(logPath, line(3, "bang", ",Error") + "\n");
+    expect((await errorsSince()).errors.map((e) => e.message)).toEqual(["bang"]);
+    expect(readNamedCursor("err", logPath, { storeDir })).toBeTruthy();
+  });
+
+  it("starts over when the log was truncated, and does not save on error", async () => {
+    const logPath = join(tmpDir, "truncated.log");
+    writeFileSync(logPath, line(1, "old session") + "\n" + line(2, "more") + "\n", "utf-8");
+    await readSince("t", logPath);
+
+    writeFileSync(logPath, line(1, "new") + "\n", "utf-8");
+    expect(readNamedCursor("t", logPath, { storeDir })).toBeNull();
+    expect((await readSince("t", logPath)).logs).toBe("new");
+
+    const before = readNamedCursor("t", logPath, { storeDir });
+    await queryFromNamedCursor("t", logPath, () => ({ error: "failed" }), { storeDir });
+    expect(readNamedCursor("t", logPath, { storeDir })).toBe(before);
+    expect(writeNamedCursor("t", logPath, "not-a-cursor", { storeDir })).toBe(false);
+  });
+});
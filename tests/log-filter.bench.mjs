@@ -0,0 +1,61 @@
+import { bench, describe } from "vitest";
+import { shouldExclude } from "../src/log-filter.mjs";
+
+// 典型 Studio 会话中的消息分布：大量系统输出夹杂用户 print / warn
+const SAMPLES = [
+  "Info: Loading script editor",
+  "Flag DFIntSomeSetting referenced from Lua isn't defined",
+  "Reflection::load(binary) took 0.123456 seconds",
+  "Redundant Flag ID: FFlagStudioSomething",
+  "Asset (Image) https://assetdelivery.roblox.com/v1/asset?id=12345 load failed: HTTP 403",
+  "Web returned cloud plugins: 12",
+  "Player Player1 added to the game",
+  "New connection from 127.0.0.1|51234",
+  "Action ViewportFocus is not handled",
+  "Warning: Failed to apply StyleRule Button",
+  "On child added called for Workspace.Baseplate",
+  "ESGamePerfMonitor: frame time 16.6ms",
+  "[TEST] server print 42",
+  "Score: 100",
+  "Hello world",
+  "Workspace.Model.Script:12: attempt to index nil with 'Position'",
+  "Infinite yield possible on 'ReplicatedStorage:WaitForChild(\"Remotes\")'",
+  "[Inventory] item added: Sword (x1)",
+  "Player data loaded for UserId 123456789 in 0.25s",
+  "Stack Begin",
+  "Script 'ServerScriptService.Main', Line 27",
+  "Stack End",
+];
+const MESSAGES = Array.from({ length: 100_000 }, (_, i) => SAMPLES[i % SAMPLES.length]);
+
+const EXCLUDE_PREFIXES = [
+  "Info:", "RobloxGitHash:", "Studio Version:", "Studio Architecture:", "Server RobloxGitHash:",
+  "Server Prefix:", "*******", "Creating PolicyContext", "BaseUrl:", "settingsUrl:", "Session GUID",
+  "Machine GUID", "Studio Launch Intent", "Is Studio Configured", "Reflection::load", "setAssetFolder",
+  "setExtraAssetFolder", "isSupportedInstallLocation", "preferredLocale", "systemLocale", "Studio D3D",
+  "ESGamePerfMonitor", "ABTestFramework", "Loading Lua Ribbon", "TeamCreateWidget",
+  "Web returned cloud plugins", "The MCP Studio plugin", "Flag ", "Evaluating deferred",
+  "已创建自动恢复文件", "Auto-recovery file", "Started network server", "New connection from",
+  "Disconnect from", "Connecting to", "Joining game", "! Joining game", "Player ",
+  "sendMLCodeCompletionHttpRequest", "UpdateManager::", "Warning: Failed to apply StyleRule",
+  "On child added called", "On child removed called", "Action ",
+];
+const EXCLUDE_CONTAINS = ["referenced from Lua", "Redundant Flag ID", "Asset (Image)", "load failed:"];
+
+// 旧实现：逐条 startsWith / includes
+function shouldExcludeLoop(message) {
+  if (!message || !message.trim()) return true;
+  for (const prefix of EXCLUDE_PREFIXES) if (message.startsWith(prefix)) return true;
+  for (const substr of EXCLUDE_CONTAINS) if (message.includes(substr)) return true;
+  return false;
+}
+
+describe(`shouldExclude (${MESSAGES.length} messages)`, () => {
+  bench("startsWith/includes loop (previous)", () => {
+    for (const m of MESSAGES) shouldExcludeLoop(m);
+  });
+
+  bench("compiled trie + Aho-Corasick", () => {
+    for (const m of MESSAGES) shouldExclude(m);
+  });
+});
@@ -1,5 +1,23 @@
-import { describe, it, expect } from "vitest";
-import { shouldExclude, filterLogs } from "../src/log-filter.mjs";
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, mkdirSync, rmSync, utimesSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import {
+  shouldExclude,
+  filterLogs,
+  compilePrefixTrie,
+  matchPrefix,
+  compileAhoCorasick,
+  matchAhoCorasick,
+  compileRuleSet,
+  matchExcludeRule,
+  summarizeFilterStats,
+  loadFilterRules,
+  findFilterConfig,
+  DEFAULT_RULE_SET,
+  EMPTY_MESSAGE,
+  FILTER_CONFIG_NAME,
+} from "../src/log-filter.mjs";
 
 describe("shouldExclude", () => {
   it("excludes empty/whitespace messages", () => {
@@ -65,3 +83,109 @@ describe("filterLogs", () => {
     expect(filterLogs(messages)).toEqual(["Hello", "World"]);
   });
 });
+
+describe("compiled matchers", () => {
+  it("matchPrefix returns the matching rule index", () => {
+    const trie = compilePrefixTrie(["Info:", "Flag ", "Player ", "已创建"]);
+    expect(matchPrefix(trie, "Info: x")).toBe(0);
+    expect(matchPrefix(trie, "Player Player1")).toBe(2);
+    expect(matchPrefix(trie, "已创建自动恢复文件")).toBe(3);
+    expect(matchPrefix(trie, "Infinite yield")).toBe(-1);
+    expect(matchPrefix(trie, "Fla")).toBe(-1);
+  });
+
+  it("matchAhoCorasick finds substrings anywhere, including overlapping patterns", () => {
+    const ac = compileAhoCorasick(["referenced from Lua", "load failed:", "he", "she", "hers", "恢复文件"]);
+    expect(matchAhoCorasick(ac, "Flag X referenced from Lua isn't defined")).toBe(0);
+    expect(matchAhoCorasick(ac, "Asset load failed: 403")).toBe(1);
+    expect(matchAhoCorasick(ac, "ushers")).toBe(3);
+    expect(matchAhoCorasick(ac, "已创建自动恢复文件")).toBe(5);
+    expect(matchAhoCorasick(ac, "Score: 100")).toBe(-1);
+  });
+
+  it("agrees with a naive startsWith/includes check", () => {
+    const prefixes = ["ab", "abc", "b", "x y"];
+    const contains = ["aab", "ba", "cc", "y z"];
+    const trie = compilePrefixTrie(prefixes);
+    const ac = compileAhoCorasick(contains);
+    for (const text of ["abc", "aaab", "bab", "xccx", "x y z", "zzz", "", "cab", "aabc"]) {
+      expect(matchPrefix(trie, text) !== -1).toBe(prefixes.some((p) => text.startsWith(p)));
+      expect(matchAhoCorasick(ac, text) !== -1).toBe(contains.some((c) => text.includes(c)));
+    }
+  });
+});
+
+describe("filter rule sets", () => {
+  let tmpDir;
+
+  beforeAll(() => {
+    tmpDir = join(tmpdir(), "rspo-log-filter-test-" + Date.now());
+    mkdirSync(tmpDir, { recursive: true });
+    return () => {
+      rmSync(tmpDir, { recursive: true, force: true });
+    };
+  });
+
+  it("include rules override exclude rules", () => {
+    const ruleSet = compileRuleSet([
+      { action: "exclude", type: "prefix", pattern: "Player ", source: "test" },
+      { action: "include", type: "contains", pattern: "data saved", source: "test" },
+    ]);
+    expect(shouldExclude("Player joined", ruleSet)).toBe(true);
+    expect(shouldExclude("Player data saved", ruleSet)).toBe(false);
+  });
+
+  it("supports regex rules", () => {
+    const ruleSet = compileRuleSet([{ action: "exclude", type: "regex", pattern: "^pos: \\d+", flags: "i", source: "test" }]);
+    expect(matchExcludeRule("POS: 12", ruleSet)).toBe(0);
+    expect(matchExcludeRule("position", ruleSet)).toBe(-1);
+    expect(matchExcludeRule("  ", ruleSet)).toBe(EMPTY_MESSAGE);
+  });
+
+  it("summarizes hits per rule sorted by count", () => {
+    const ruleSet = compileRuleSet([
+      { action: "exclude", type: "prefix", pattern: "a", source: "test" },
+      { action: "exclude", type: "contains", pattern: "b", source: "test" },
+    ]);
+    const stats = summarizeFilterStats(ruleSet, new Map([[0, 2], [1, 5], [EMPTY_MESSAGE, 1]]));
+    expect(stats).toEqual([
+      { type: "contains", pattern: "b", source: "test", hits: 5 },
+      { type: "prefix", pattern: "a", source: "test", hits: 2 },
+      { type: "empty", pattern: "", source: "builtin", hits: 1 },
+    ]);
+  });
+
+  it("loads config rules on top of built-ins and reloads when the file changes", () => {
+    const configPath = join(tmpDir, FILTER_CONFIG_NAME);
+    writeFileSync(configPath, JSON.stringify({ exclude: [{ prefix: "[Heartbeat]" }] }));
+    const first = loadFilterRules(configPath);
+    expect(shouldExclude("[Heartbeat] ok", first)).toBe(true);
+    expect(shouldExclude("Info: built-in still applies", first)).toBe(true);
+    expect(loadFilterRules(configPath)).toBe(first);
+
+    writeFileSync(configPath, JSON.stringify({ include: [{ prefix: "Info: keep" }] }));
+    utimesSync(configPath, new Date(), new Date(Date.now() + 5000));
+    const second = loadFilterRules(configPath);
+    expect(second).not.toBe(first);
+    expect(shouldExclude("[Heartbeat] ok", second)).toBe(false);
+    expect(shouldExclude("Info: keep this", second)).toBe(false);
+  });
+
+  it("falls back to built-in rules without a config", () => {
+    expect(loadFilterRules(null)).toBe(DEFAULT_RULE_SET);
+    expect(loadFilterRules(join(tmpDir, "missing.json"))).toBe(DEFAULT_RULE_SET);
+  });
+
+  it("throws on invalid config", () => {
+    const configPath = join(tmpDir, "bad.json");
+    writeFileSync(configPath, JSON.stringify({ exclude: [{ nope: "x" }] }));
+    expect(() => loadFilterRules(configPath)).toThrow(/Invalid filter config/);
+  });
+
+  it("finds the config next to the place file", () => {
+    const placeDir = join(tmpDir, "place");
+    mkdirSync(placeDir, { recursive: true });
+    writeFileSync(join(placeDir, FILTER_CONFIG_NAME), "{}");
+    expect(findFilterConfig(join(placeDir, "game.rbxl"))).toBe(join(placeDir, FILTER_CONFIG_NAME));
+  });
+});
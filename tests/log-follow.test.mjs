@@ -0,0 +1,93 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, appendFileSync, mkdirSync, rmSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { followLog, waitForLogs } from "../src/log-follow.mjs";
+
+const line = (n, msg, cat = "FLog::Output") =>
+  `2026-02-03T08:52:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n} [${cat}] ${msg}`;
+
+let tmpDir;
+
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-follow-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+function collect(logPath, options) {
+  const entries = [];
+  const follower = followLog(logPath, { pollInterval: 20, ...options }, (batch) => entries.push(...batch));
+  return { entries, follower };
+}
+
+const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+
+describe("followLog", () => {
+  it("emits only lines appended after start, waiting for partial lines to complete", async () => {
+    const logPath = join(tmpDir, "tail.log");
+    writeFileSync(logPath, line(1, "old message") + "\n", "utf-8");
+
+    const { entries, follower } = collect(logPath);
+    await sleep(50);
+    appendFileSync(logPath, line(2, "new message") + "\n" + line(3, "half wri"));
+    await sleep(80);
+    expect(entries.map((e) => e.message)).toEqual(["new message"]);
+
+    appendFileSync(logPath, "tten\n");
+    await sleep(80);
+    follower.stop();
+    const end = await follower.done;
+
+    expect(entries.map((e) => e.message)).toEqual(["new message", "half written"]);
+    expect(entries.map((e) => e.line)).toEqual([2, 3]);
+    expect(end.lastLine).toBe(3);
+  });
+
+  it("resumes after a given line and applies filters", async () => {
+    const logPath = join(tmpDir, "resume.log");
+    writeFileSync(logPath, [
+      line(1, "first"),
+      line(2, "Info: internal stuff"),
+      line(3, "third"),
+      line(4, "Setting StudioGameStateType to StudioGameStateType_PlayServer", "FLog::AssetDataModelManager"),
+      line(5, "in play"),
+      "",
+    ].join("\n"), "utf-8");
+
+    const { entries, follower } = collect(logPath, { afterLine: 1 });
+    await sleep(50);
+    follower.stop();
+
+    expect(entries.map((e) => e.message)).toEqual(["third", "in play"]);
+    expect(entries.map((e) => e.context)).toEqual(["edit", "play"]);
+  });
+});
+
+describe("waitForLogs", () => {
+  it("returns as soon as new entries arrive", async () => {
+    const logPath = join(tmpDir, "wait.log");
+    writeFileSync(logPath, line(1, "before") + "\n", "utf-8");
+
+    const pending = waitForLogs(logPath, { afterLine: 1, timeoutMs: 2000, pollInterval: 20 });
+    await sleep(30);
+    appendFileSync(logPath, line(2, "boom", "FLog::Error") + "\n");
+    const result = await pending;
+
+    expect(result.timedOut).toBe(false);
+    expect(result.entries[0].message).toBe("boom");
+    expect(result.lastLine).toBe(2);
+  });
+
+  it("times out with no entries", async () => {
+    const logPath = join(tmpDir, "idle.log");
+    writeFileSync(logPath, line(1, "idle") + "\n", "utf-8");
+
+    const result = await waitForLogs(logPath, { timeoutMs: 50, pollInterval: 20 });
+    expect(result.timedOut).toBe(true);
+    expect(result.entries).toEqual([]);
+    expect(result.lastLine).toBe(1);
+  });
+});
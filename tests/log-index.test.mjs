@@ -0,0 +1,215 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, appendFileSync, mkdirSync, rmSync, readdirSync, existsSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { searchLogsFromLine } from "../src/log-utils.mjs";
+import { planIndexQuery, updateSearchIndex, findCandidateLines, scanCandidateLines, searchLogsIndexed } from "../src/log-index.mjs";
+
+let tmpDir;
+let indexDir;
+
+const words = ["player", "spawned", "DataStore", "request", "failed", "remote", "event", "fired", "loaded", "round"];
+const states = ["PlayServer", "PlayClient", "Edit"];
+
+function makeLines(from, count) {
+  const lines = [];
+  for (let i = from; i < from + count; i++) {
+    const head = `${new Date(Date.UTC(2026, 1, 3, 10) + i * 100).toISOString()},${i}.000,1000,1`;
+    if (i % 997 === 996) {
+      lines.push(`${head} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${states[((i / 997) | 0) % 3]}`);
+    } else if (i % 211 === 0) {
+      lines.push(`${head} [FLog::Error] ServerScript.Main:${i}: attempt to index nil with 'Parent'`);
+    } else if (i % 37 === 0) {
+      lines.push(`  continuation attempt ${i}`);
+    } else {
+      lines.push(`${head} [FLog::Output] ${words[i % 10]} ${words[(i * 3) % 10]} id=${i * 7919} guid=${(i * 48271).toString(16)}ff`);
+    }
+  }
+  return lines;
+}
+
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-index-test-" + Date.now());
+  indexDir = join(tmpDir, "index");
+  mkdirSync(tmpDir, { recursive: true });
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+describe("planIndexQuery", () => {
+  it("extracts exact, prefix, suffix and substring terms from literals", () => {
+    expect(planIndexQuery("ttempt to index nil")).toEqual([
+      { term: "ttempt", mode: "suffix" },
+      { term: "to", mode: "exact" },
+      { term: "index", mode: "exact" },
+      { term: "nil", mode: "prefix" },
+    ]);
+    expect(planIndexQuery("DataStore")).toEqual([{ term: "datastore", mode: "substring" }]);
+    expect(planIndexQuery("^Player \\w+ died$")).toEqual([
+      { term: "player", mode: "exact" },
+      { term: "died", mode: "exact" },
+    ]);
+  });
+
+  it("drops optional characters and ignores groups and classes", () => {
+    expect(planIndexQuery("colou?r (red|blue)")).toBeNull();
+    expect(planIndexQuery("remotes? fired [0-9]+ times")).toEqual([
+      { term: "remote", mode: "substring" },
+      { term: "fired", mode: "exact" },
+      { term: "times", mode: "prefix" },
+    ]);
+    expect(planIndexQuery("\\x41bcd\\.lua")).toEqual([{ term: "bcd", mode: "suffix" }, { term: "lua", mode: "prefix" }]);
+  });
+
+  it("splits numeric-heavy terms the same way the index does", () => {
+    expect(planIndexQuery("^id 12345abc$")).toEqual([
+      { term: "id", mode: "exact" },
+      { term: "abc", mode: "exact" },
+    ]);
+    expect(planIndexQuery("user42x")).toEqual([{ term: "user", mode: "substring" }]);
+  });
+
+  it("does not treat \\b as a term boundary (it only knows ASCII word characters)", () => {
+    expect(planIndexQuery("\\bpée\\b")).toEqual([{ term: "pée", mode: "substring" }]);
+    expect(planIndexQuery("\\bspawned\\b")).toEqual([{ term: "spawned", mode: "substring" }]);
+  });
+
+  it("returns null when nothing can narrow the search", () => {
+    expect(planIndexQuery("\\d+")).toBeNull();
+    expect(planIndexQuery("a|b")).toBeNull();
+    expect(planIndexQuery("[invalid")).toBeNull();
+  });
+});
+
+describe("searchLogsIndexed", () => {
+  const patterns = [
+    "attempt to index nil",
+    "ttempt to ind",
+    "Main:4\\d+: attempt",
+    "DataStore request",
+    "^round loaded",
+    "guid=\\w+ff$",
+    "spawned\\b",
+  ];
+
+  it("returns the same results as the sequential search", () => {
+    const logPath = join(tmpDir, "same.log");
+    writeFileSync(logPath, makeLines(0, 6000).join("\n"), "utf-8");
+    for (const pattern of patterns) {
+      for (const options of [{}, { runContext: "play", includeContext: true }, { afterLine: 2500, timestamps: true }]) {
+        expect(searchLogsIndexed(logPath, pattern, { ...options, indexDir }), pattern).toEqual(
+          searchLogsFromLine(logPath, pattern, options),
+        );
+      }
+    }
+  });
+
+  it("narrows candidates for selective literals", () => {
+    const logPath = join(tmpDir, "narrow.log");
+    writeFileSync(logPath, makeLines(0, 6000).join("\n") + "\n", "utf-8");
+    const candidates = findCandidateLines(logPath, "attempt to index nil", { indexDir });
+    expect(candidates.indexedLines).toBe(6000);
+    expect(candidates.lines.length).toBe(Math.ceil(6000 / 211));
+    expect(findCandidateLines(logPath, "no such words anywhere", { indexDir }).lines.length).toBe(0);
+  });
+
+  it("updates incrementally as the log grows and merges segments", () => {
+    const logPath = join(tmpDir, "grow.log");
+    writeFileSync(logPath, "", "utf-8");
+    for (let n = 0; n < 12; n++) {
+      appendFileSync(logPath, makeLines(n * 500, 500).join("\n") + "\n", "utf-8");
+      const manifest = updateSearchIndex(logPath, { indexDir });
+      expect(manifest.lines).toBe((n + 1) * 500);
+    }
+    const manifest = updateSearchIndex(logPath, { indexDir });
+    expect(manifest.segments.length).toBeLessThan(5);
+    expect(readdirSync(manifest.dir).filter((f) => f.endsWith(".seg")).length).toBe(manifest.segments.length);
+    for (const pattern of patterns) {
+      expect(searchLogsIndexed(logPath, pattern, { indexDir }), pattern).toEqual(searchLogsFromLine(logPath, pattern));
+    }
+  });
+
+  it("rebuilds the index when the log is truncated", () => {
+    const logPath = join(tmpDir, "rewrite.log");
+    writeFileSync(logPath, makeLines(0, 3000).join("\n") + "\n", "utf-8");
+    updateSearchIndex(logPath, { indexDir });
+    writeFileSync(logPath, makeLines(5000, 400).join("\n") + "\n", "utf-8");
+    expect(updateSearchIndex(logPath, { indexDir }).lines).toBe(400);
+    expect(searchLogsIndexed(logPath, "attempt to index", { indexDir })).toEqual(searchLogsFromLine(logPath, "attempt to index"));
+  });
+
+  it("rebuilds the index when the log is replaced with longer content", () => {
+    const logPath = join(tmpDir, "replaced.log");
+    writeFileSync(logPath, makeLines(0, 3000).join("\n") + "\n", "utf-8");
+    updateSearchIndex(logPath, { indexDir });
+    writeFileSync(logPath, makeLines(100, 3500).join("\n") + "\n", "utf-8");
+    expect(updateSearchIndex(logPath, { indexDir }).lines).toBe(3500);
+    for (const pattern of patterns) {
+      expect(searchLogsIndexed(logPath, pattern, { indexDir }), pattern).toEqual(searchLogsFromLine(logPath, pattern));
+    }
+  });
+
+  it("searches several patterns at once through the union of their candidates", () => {
+    const logPath = join(tmpDir, "multi.log");
+    writeFileSync(logPath, makeLines(0, 6000).join("\n") + "\n", "utf-8");
+    const multi = ["attempt to index nil", "Setting StudioGameStateType"];
+    const union = findCandidateLines(logPath, multi, { indexDir }).lines;
+    const single = multi.map((pattern) => findCandidateLines(logPath, pattern, { indexDir }).lines.length);
+    expect(union.length).toBe(single[0] + single[1]);
+    for (const options of [{}, { count: false }, { runContext: "play", includeContext: true }]) {
+      expect(searchLogsIndexed(logPath, multi, { ...options, indexDir })).toEqual(searchLogsFromLine(logPath, multi, options));
+    }
+    expect(findCandidateLines(logPath, ["attempt", "a|b"], { indexDir })).toBeNull();
+  });
+
+  it("does not create an index when createIndex is false", () => {
+    const logPath = join(tmpDir, "noindex.log");
+    writeFileSync(logPath, makeLines(0, 3000).join("\n") + "\n", "utf-8");
+    const ownDir = join(tmpDir, "own-index");
+    const result = searchLogsIndexed(logPath, "attempt to index", { indexDir: ownDir, createIndex: false });
+    expect(result).toEqual(searchLogsFromLine(logPath, "attempt to index"));
+    expect(existsSync(ownDir)).toBe(false);
+
+    // 已有索引时照常使用，并增量扩展到新追加的行
+    updateSearchIndex(logPath, { indexDir: ownDir });
+    appendFileSync(logPath, makeLines(3000, 500).join("\n") + "\n", "utf-8");
+    expect(findCandidateLines(logPath, "attempt to index", { indexDir: ownDir, create: false }).indexedLines).toBe(3500);
+    expect(searchLogsIndexed(logPath, "attempt to index", { indexDir: ownDir, createIndex: false })).toEqual(
+      searchLogsFromLine(logPath, "attempt to index"),
+    );
+  });
+
+  it("finds \\b matches next to non-ASCII letters like the sequential search", () => {
+    const logPath = join(tmpDir, "unicode.log");
+    const head = (i) => `2026-02-03T10:00:0${i}.000Z,${i}.000,1000,1`;
+    const lines = [`${head(0)} [FLog::Output] Épée equipped`, `${head(1)} [FLog::Output] éid=7 loaded`];
+    for (let i = 0; i < 400; i++) lines.push(`${head(2)} [FLog::Output] filler line ${i}`);
+    writeFileSync(logPath, lines.join("\n") + "\n", "utf-8");
+    for (const pattern of ["\\bpée", "\\bid\\b"]) {
+      const expected = searchLogsFromLine(logPath, pattern);
+      expect(expected.matchCount, pattern).toBe(1);
+      expect(searchLogsIndexed(logPath, pattern, { indexDir }), pattern).toEqual(expected);
+    }
+  });
+
+  it("stops at the end of the file when the log is truncated after planning", () => {
+    const logPath = join(tmpDir, "shrunk.log");
+    writeFileSync(logPath, makeLines(0, 3000).join("\n") + "\n", "utf-8");
+    const candidates = findCandidateLines(logPath, "attempt to index nil", { indexDir });
+    writeFileSync(logPath, makeLines(0, 500).join("\n") + "\n", "utf-8");
+    const seen = [];
+    const next = scanCandidateLines(logPath, candidates, null, (text, lineNum) => {
+      seen.push(lineNum);
+    });
+    expect(seen).toEqual([1, 212, 423]);
+    expect(next.line).toBe(423);
+  });
+
+  it("falls back to the sequential search when the index directory is unavailable", () => {
+    const logPath = join(tmpDir, "same.log");
+    const result = searchLogsIndexed(logPath, "DataStore", { indexDir: join(tmpDir, "missing", "index") });
+    expect(result).toEqual(searchLogsFromLine(logPath, "DataStore"));
+    expect(searchLogsIndexed(logPath, "[bad", { indexDir }).error).toBeDefined();
+  });
+});
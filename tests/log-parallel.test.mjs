@@ -0,0 +1,166 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, readFileSync, mkdirSync, rmSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { findErrors, searchLogsFromLine } from "../src/log-utils.mjs";
+import { compileRuleSet } from "../src/log-filter.mjs";
+import {
+  splitLogRanges,
+  runWorkerPool,
+  findErrorsParallel,
+  searchLogsParallel,
+} from "../src/log-parallel.mjs";
+
+let tmpDir;
+let logPath;
+
+// 5000 行，夹杂状态切换、错误、警告、被过滤的行和非日志格式的续行
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-parallel-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  logPath = join(tmpDir, "large.log");
+
+  const states = ["PlayServer", "PlayClient", "Edit"];
+  const lines = [];
+  for (let i = 0; i < 5000; i++) {
+    const ts = new Date(Date.UTC(2026, 1, 3, 10, 0, 0) + i * 100).toISOString();
+    const head = `${ts},${i}.000,1000,${i + 1}`;
+    if (i % 377 === 376) {
+      lines.push(`${head} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${states[((i / 377) | 0) % 3]}`);
+    } else if (i % 53 === 0) {
+      lines.push(`${head} [FLog::Error] Script error ${i + 1}`);
+    } else if (i % 41 === 0) {
+      lines.push(`${head},Warning [FLog::Output] Infinite yield possible ${i + 1}`);
+    } else if (i % 29 === 0) {
+      lines.push(`${head} [FLog::Output] Info: internal ${i + 1}`);
+    } else if (i % 31 === 0) {
+      lines.push(`  stack continuation ${i + 1}`);
+    } else {
+      lines.push(`${head} [FLog::Output] print value=${i + 1}`);
+    }
+  }
+  writeFileSync(logPath, lines.join("\n"), "utf-8");
+
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+describe("splitLogRanges", () => {
+  it("produces contiguous ranges that start at line boundaries", () => {
+    const content = readFileSync(logPath);
+    const ranges = splitLogRanges(logPath, 7);
+    expect(ranges.length).toBe(7);
+    expect(ranges[0].start).toBe(0);
+    expect(ranges[ranges.length - 1].end).toBe(content.length);
+    for (let i = 1; i < ranges.length; i++) {
+      expect(ranges[i].start).toBe(ranges[i - 1].end);
+      expect(content[ranges[i].start - 1]).toBe(0x0a);
+    }
+  });
+
+  it("collapses ranges for files with few lines", () => {
+    const small = join(tmpDir, "small.log");
+    writeFileSync(small, "one line without newline", "utf-8");
+    expect(splitLogRanges(small, 4)).toEqual([{ start: 0, end: 24 }]);
+  });
+});
+
+describe("runWorkerPool", () => {
+  it("rejects unknown task kinds", async () => {
+    const error = await runWorkerPool([{ kind: "nope" }], 1).catch((e) => e);
+    expect(error.message).toBe("Unknown worker task: nope");
+  });
+});
+
+describe("findErrorsParallel", () => {
+  it("matches the sequential scan, including line numbers and contexts", async () => {
+    const expected = findErrors(logPath, { maxErrors: 1000 });
+    const result = await findErrorsParallel(logPath, { workers: 4, minBytes: 0, maxErrors: 1000 });
+    expect(result).toEqual(expected);
+  });
+
+  it("applies runContext, maxErrors and date bounds across ranges", async () => {
+    const options = {
+      runContext: "play",
+      maxErrors: 5,
+      startDate: "2026-02-03T10:01:00",
+      endDate: "2026-02-03T10:07:00",
+    };
+    const expected = findErrors(logPath, options);
+    expect(expected.errorCount).toBeGreaterThan(5);
+    expect(await findErrorsParallel(logPath, { ...options, workers: 3, minBytes: 0 })).toEqual(expected);
+  });
+
+  it("merges per-range error groups into the sequential grouping", async () => {
+    const options = { group: true, runContext: "play" };
+    const expected = findErrors(logPath, options);
+    expect(expected.groupCount).toBe(2);
+    expect(await findErrorsParallel(logPath, { ...options, workers: 4, minBytes: 0 })).toEqual(expected);
+  });
+
+  it("stitches stack traces that cross range boundaries", async () => {
+    const stackLog = join(tmpDir, "stacks.log");
+    const lines = [];
+    for (let i = 0; i < 3000; i++) {
+      const head = `${new Date(Date.UTC(2026, 1, 3, 10, 0, 0) + i * 100).toISOString()},${i}.000,1000,${i + 1}`;
+      const script = `ServerScriptService.Script${i % 5}`;
+      const phase = i % 6;
+      if (phase === 0) lines.push(`${head},Error [FLog::Output] ${script}:${i % 7}: boom ${i}`);
+      else if (phase === 1) lines.push(`${head} [FLog::Output] Stack Begin`);
+      else if (phase < 5) lines.push(`${head} [FLog::Output] Script '${script}', Line ${phase} - function f${phase}`);
+      else lines.push(`${head} [FLog::Output] Stack End`);
+    }
+    writeFileSync(stackLog, lines.join("\n"), "utf-8");
+
+    for (const options of [{ maxErrors: 1000 }, { byScript: true }, { group: true }]) {
+      const expected = findErrors(stackLog, options);
+      expect(await findErrorsParallel(stackLog, { ...options, workers: 7, minBytes: 0 })).toEqual(expected);
+    }
+    expect(findErrors(stackLog, { maxErrors: 1 }).errors[0].stack.length).toBe(3);
+  });
+
+  it("falls back to the sequential scan for line ranges", async () => {
+    const result = await findErrorsParallel(logPath, { afterLine: 4000 });
+    expect(result).toEqual(findErrors(logPath, { afterLine: 4000 }));
+  });
+});
+
+describe("searchLogsParallel", () => {
+  it("matches the sequential search output", async () => {
+    const options = { includeContext: true, timestamps: true };
+    const expected = searchLogsFromLine(logPath, "value=\\d*7$", options);
+    const result = await searchLogsParallel(logPath, "value=\\d*7$", { ...options, workers: 4, minBytes: 0 });
+    expect(result).toEqual(expected);
+  });
+
+  it("truncates at the same byte budget and reports remaining matches", async () => {
+    const expected = searchLogsFromLine(logPath, "value");
+    expect(expected.hasMore).toBe(true);
+    expect(await searchLogsParallel(logPath, "value", { workers: 5, minBytes: 0 })).toEqual(expected);
+  });
+
+  it("merges filter statistics from custom rule sets", async () => {
+    const filterRules = compileRuleSet([
+      { action: "exclude", type: "prefix", pattern: "Info:", source: "test" },
+      { action: "exclude", type: "contains", pattern: "value=1", source: "test" },
+    ]);
+    const options = { filterRules, filterStats: true };
+    const expected = searchLogsFromLine(logPath, "value", options);
+    const result = await searchLogsParallel(logPath, "value", { ...options, workers: 3, minBytes: 0 });
+    expect(result).toEqual(expected);
+  });
+
+  it("reports per-pattern counts and lines for several patterns like the sequential search", async () => {
+    const patterns = ["value", "value=\\d*7$", "value=1\\d$", "no such line"];
+    const expected = searchLogsFromLine(logPath, patterns);
+    // 输出被截断：第一个模式的命中数大于本页行数
+    expect(expected.patterns[0].count).toBeGreaterThan(expected.patterns[0].lines.length);
+    expect(await searchLogsParallel(logPath, patterns, { workers: 4, minBytes: 0 })).toEqual(expected);
+  });
+
+  it("returns an error for invalid patterns", async () => {
+    const result = await searchLogsParallel(logPath, "[invalid", { workers: 2, minBytes: 0 });
+    expect(result.error).toBeDefined();
+  });
+});
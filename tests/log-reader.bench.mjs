@@ -0,0 +1,76 @@
+import { bench, describe } from "vitest";
+import { writeFileSync, mkdirSync, statSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { readLogLines, readLogLineRanges } from "../src/log-reader.mjs";
+import { createLogLineMatcher, createGameStateDetector, parseGameStateChange } from "../src/log-utils.mjs";
+
+// 典型 Studio 日志：大部分行属于非默认类别，约 1% 为警告，偶尔切换游戏状态
+const TOTAL_LINES = 200_000;
+const NOISE = ["FLog::StudioKeyEvents", "DFLog::HttpTraceLight", "FLog::RobloxIDEDoc", "FLog::Network"];
+const STATES = ["PlayServer", "PlayClient", "Edit"];
+
+const tmpDir = join(tmpdir(), "rspo-log-reader-bench");
+mkdirSync(tmpDir, { recursive: true });
+const logPath = join(tmpDir, "mixed.log");
+
+const lines = [];
+for (let i = 0; i < TOTAL_LINES; i++) {
+  const head = `${new Date(Date.UTC(2026, 1, 3, 8, 0, 0) + i * 10).toISOString()},${i}.125000,1996c,${i % 12}`;
+  if (i % 5000 === 4999) {
+    const state = STATES[Math.floor(i / 5000) % STATES.length];
+    lines.push(`${head} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${state}`);
+  } else if (i % 97 === 0) {
+    lines.push(`${head},Warning [FLog::Output] Workspace.Part${i % 13}.Script:${i % 50}: attempt to index nil with 'Position'`);
+  } else if (i % 5 === 0) {
+    lines.push(`${head} [FLog::Output] print value=${i} some user output`);
+  } else {
+    lines.push(`${head} [${NOISE[i % NOISE.length]}] message number ${i} with some payload text and more`);
+  }
+}
+writeFileSync(logPath, lines.join("\n") + "\n", "utf-8");
+
+// 吞吐量 MB/s = hz × 文件大小
+const MB = (statSync(logPath).size / 1024 / 1024).toFixed(1);
+
+// 旧实现：每行先解码为字符串，再判断状态切换与类别
+function scanDecoded(options) {
+  const match = createLogLineMatcher(options);
+  let kept = 0;
+  for (const { text, lineNum } of readLogLines(logPath)) {
+    parseGameStateChange(text);
+    if (match(text, lineNum)) kept++;
+  }
+  return kept;
+}
+
+function scanBytes(options) {
+  const match = createLogLineMatcher(options);
+  const stateChange = createGameStateDetector();
+  let kept = 0;
+  for (const line of readLogLineRanges(logPath)) {
+    stateChange(line);
+    if (match.acceptsBytes(line.buf, line.start, line.end) && match(line.text, line.lineNum)) kept++;
+  }
+  return kept;
+}
+
+describe(`default categories (${MB} MB, 20% kept; MB/s = hz × ${MB})`, () => {
+  bench("decode every line (previous)", () => {
+    scanDecoded({});
+  });
+
+  bench("byte-level prefilter, decode kept lines", () => {
+    scanBytes({});
+  });
+});
+
+describe(`errors only (${MB} MB, 1% kept; MB/s = hz × ${MB})`, () => {
+  bench("decode every line (previous)", () => {
+    scanDecoded({ errorsOnly: true });
+  });
+
+  bench("byte-level prefilter, decode kept lines", () => {
+    scanBytes({ errorsOnly: true });
+  });
+});
@@ -0,0 +1,108 @@
+import { describe, it, expect, beforeAll } from "vitest";
+import { writeFileSync, mkdirSync, rmSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import { readLogLines, readLogLineRanges, readLogLinesReverse } from "../src/log-reader.mjs";
+
+let tmpDir;
+
+beforeAll(() => {
+  tmpDir = join(tmpdir(), "rspo-log-reader-test-" + Date.now());
+  mkdirSync(tmpDir, { recursive: true });
+  return () => {
+    rmSync(tmpDir, { recursive: true, force: true });
+  };
+});
+
+describe("readLogLines", () => {
+  it("matches split('\\n') line numbering", () => {
+    const content = "first\nsecond\r\n\nfourth";
+    const logPath = join(tmpDir, "basic.log");
+    writeFileSync(logPath, content, "utf-8");
+
+    const lines = [...readLogLines(logPath)];
+    expect(lines.map((l) => l.text)).toEqual(content.split("\n"));
+    expect(lines.map((l) => l.lineNum)).toEqual([1, 2, 3, 4]);
+  });
+
+  it("handles lines and multibyte characters spanning chunk boundaries", () => {
+    const content = ["已创建自动恢复文件", "a".repeat(37), "日志行 ✓", "", "tail"].join("\n");
+    const logPath = join(tmpDir, "chunks.log");
+    writeFileSync(logPath, content, "utf-8");
+
+    for (const chunkSize of [1, 3, 7, 16]) {
+      const texts = [...readLogLines(logPath, { chunkSize })].map((l) => l.text);
+      expect(texts).toEqual(content.split("\n"));
+    }
+  });
+
+  it("reports byte offsets of each line", () => {
+    const content = "ab\n日志\ncd";
+    const logPath = join(tmpDir, "offsets.log");
+    writeFileSync(logPath, content, "utf-8");
+
+    const offsets = [...readLogLines(logPath, { chunkSize: 4 })].map((l) => l.offset);
+    expect(offsets).toEqual([0, 3, 3 + Buffer.byteLength("日志\n")]);
+  });
+
+  it("resumes from a byte offset and line number", () => {
+    const logPath = join(tmpDir, "resume.log");
+    writeFileSync(logPath, "one\ntwo\nthree\n", "utf-8");
+
+    const lines = [...readLogLines(logPath, { startOffset: 4, startLine: 2 })];
+    expect(lines[0]).toEqual({ text: "two", lineNum: 2, offset: 4, next: 8 });
+    expect(lines[1].lineNum).toBe(3);
+  });
+
+  it("marks an unterminated last line with next = null", () => {
+    const logPath = join(tmpDir, "partial.log");
+    writeFileSync(logPath, "done\nwriting", "utf-8");
+
+    const lines = [...readLogLines(logPath)];
+    expect(lines[0].next).toBe(5);
+    expect(lines[1].next).toBeNull();
+  });
+
+  it("yields nothing for an empty file", () => {
+    const logPath = join(tmpDir, "empty.log");
+    writeFileSync(logPath, "", "utf-8");
+    expect([...readLogLines(logPath)]).toEqual([]);
+  });
+});
+
+describe("readLogLineRanges", () => {
+  it("yields byte ranges that decode to the same lines as readLogLines", () => {
+    const content = ["已创建自动恢复文件", "a".repeat(37), "日志行 ✓\r", "", "tail"].join("\n");
+    const logPath = join(tmpDir, "ranges.log");
+    writeFileSync(logPath, content, "utf-8");
+
+    for (const chunkSize of [1, 3, 7, 16, 64 * 1024]) {
+      const ranges = [];
+      for (const line of readLogLineRanges(logPath, { chunkSize })) {
+        expect(line.end - line.start).toBe(Buffer.byteLength(line.text));
+        ranges.push({ text: line.text, lineNum: line.lineNum, offset: line.offset, next: line.next });
+      }
+      expect(ranges).toEqual([...readLogLines(logPath, { chunkSize })]);
+    }
+  });
+});
+
+describe("readLogLinesReverse", () => {
+  it("yields the same lines, offsets and next positions in reverse order", () => {
+    const contents = ["", "\n", "a\n\n", "first\nsecond\r\n\nfourth", ["已创建自动恢复文件", "a".repeat(37), "日志行 ✓", "", "tail\n"].join("\n")];
+    for (const [i, content] of contents.entries()) {
+      const logPath = join(tmpDir, `reverse-${i}.log`);
+      writeFileSync(logPath, content, "utf-8");
+      const forward = [...readLogLines(logPath)].map(({ text, offset, next }) => ({ text, offset, next }));
+      for (const chunkSize of [1, 3, 7, 64]) {
+        expect([...readLogLinesReverse(logPath, { chunkSize })].reverse()).toEqual(forward);
+      }
+    }
+  });
+
+  it("starts from an end offset", () => {
+    const logPath = join(tmpDir, "reverse-end.log");
+    writeFileSync(logPath, "one\ntwo\nthree\n", "utf-8");
+    expect([...readLogLinesReverse(logPath, { endOffset: 8 })].map((l) => l.text)).toEqual(["two", "one"]);
+  });
+});
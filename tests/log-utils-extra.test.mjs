@@ -1,5 +1,5 @@
 import { describe, it, expect, beforeAll } from "vitest";
-import { writeFileSync, mkdirSync, rmSync } from "node:fs";
+import { writeFileSync, appendFileSync, mkdirSync, rmSync, readFileSync, statSync, utimesSync, existsSync, readdirSync } from "node:fs";
 import { join } from "node:path";
 import { tmpdir } from "node:os";
 import {
@@ -7,7 +7,20 @@ import {
   searchLogsFromLine,
   findErrors,
   getLogsByDate,
+  buildGameStateIndex,
+  findLineBeforeTime,
+  loadLogCheckpoints,
+  findCheckpoint,
+  recordCheckpoint,
+  getLogStats,
+  createLogLineMatcher,
+  getLogLastLine,
+  clearLogResultCache,
+  cleanOldLogs,
+  listPlaySessions,
+  resolvePlaySession,
 } from "../src/log-utils.mjs";
+import { readLogLines } from "../src/log-reader.mjs";
 
 // Larger sample log for testing truncation and edge cases
 const LINES = [];
@@ -73,6 +86,236 @@ describe("getLogsFromLine - MAX_BYTES truncation", () => {
   });
 });
 
+describe("getLogsFromLine - last option", () => {
+  it("returns the last N lines with correct line numbers and contexts", () => {
+    const all = getLogsFromLine(tmpLogPath, { includeContext: true, timestamps: true });
+    const result = getLogsFromLine(tmpLogPath, { last: 45, includeContext: true, timestamps: true });
+    expect(result.logs).toBe(all.logs.split("\n").slice(-45).join("\n"));
+    expect(result.lastLine).toBe(100);
+    expect(result.startLine).toBe(55);
+    expect(result.hasMore).toBe(true);
+    expect(result.remaining).toBeNull();
+  });
+
+  it("applies runContext, beforeLine and afterLine while reading backwards", () => {
+    const result = getLogsFromLine(tmpLogPath, { last: 5, runContext: "play", beforeLine: 50 });
+    expect(result.startLine).toBe(45);
+    expect(result.lastLine).toBe(49);
+    const bounded = getLogsFromLine(tmpLogPath, { last: 50, afterLine: 95 });
+    expect(bounded.startLine).toBe(96);
+    expect(bounded.hasMore).toBe(false);
+    expect(bounded.remaining).toBe(0);
+  });
+
+  it("keeps the newest lines when the byte budget is hit", () => {
+    const result = getLogsFromLine(join(tmpDir, "big.log"), { last: 500 });
+    expect(result.lastLine).toBe(500);
+    expect(result.logs.endsWith("line500")).toBe(true);
+    expect(result.hasMore).toBe(true);
+  });
+
+  it("includes an unterminated last line and a state change on it", () => {
+    const logPath = join(tmpDir, "last-tail.log");
+    writeFileSync(
+      logPath,
+      [
+        "2026-02-03T08:00:01.000Z,1.000,1000,1 [FLog::Output] first",
+        "2026-02-03T08:00:02.000Z,2.000,1000,2 [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_PlayClient",
+        "2026-02-03T08:00:03.000Z,3.000,1000,3 [FLog::Output] writing",
+      ].join("\n"),
+      "utf-8",
+    );
+    const result = getLogsFromLine(logPath, { last: 2, includeContext: true });
+    expect(result.logs).toBe("[E] first\n[P] writing");
+    expect([result.startLine, result.lastLine]).toEqual([1, 3]);
+  });
+});
+
+describe("pagination cursors", () => {
+  const pageThrough = (query) => {
+    const pages = [];
+    let cursor = null;
+    do {
+      const page = query(cursor);
+      pages.push(page);
+      cursor = page.cursor;
+    } while (pages[pages.length - 1].hasMore);
+    return pages;
+  };
+
+  it("resumes exactly after the last returned line until the log is exhausted", () => {
+    const bigLogPath = join(tmpDir, "big.log");
+    for (const count of [true, false]) {
+      const pages = pageThrough((cursor) => getLogsFromLine(bigLogPath, { cursor, count }));
+      expect(pages.length).toBeGreaterThan(2);
+      const lines = pages.flatMap((p) => p.logs.split("\n"));
+      expect(lines.length).toBe(500);
+      expect(lines.every((l, i) => l.endsWith(` line${i + 1}`))).toBe(true);
+      expect(pages[1].startLine).toBe(pages[0].lastLine + 1);
+      expect(pages[0].remaining).toBe(count ? 500 - pages[0].logs.split("\n").length : null);
+    }
+  });
+
+  it("pages through errors and search results", () => {
+    const errorPages = pageThrough((cursor) => findErrors(tmpLogPath, { cursor, maxErrors: 1, count: false }));
+    expect(errorPages.map((p) => p.errors.map((e) => e.line))).toEqual([[41], [42]]);
+    expect(errorPages[0].errorCount).toBeNull();
+    expect(errorPages[1].errorCount).toBe(1);
+
+    const all = searchLogsFromLine(tmpLogPath, "line \\d+5$", { includeContext: true });
+    const first = searchLogsFromLine(tmpLogPath, "line \\d+5$", { includeContext: true, afterLine: 40 });
+    const resumed = searchLogsFromLine(tmpLogPath, "line \\d+5$", { includeContext: true, cursor: first.cursor });
+    expect(resumed.logs).toBe("");
+    expect(all.logs.endsWith(first.logs)).toBe(true);
+  });
+
+  it("carries the run context across a resumed scan", () => {
+    const first = getLogsFromLine(tmpLogPath, { beforeLine: 45, includeContext: true });
+    const rest = getLogsFromLine(tmpLogPath, { cursor: first.cursor, beforeLine: 62, includeContext: true });
+    expect(rest.startLine).toBe(45);
+    expect(rest.logs.split("\n")[0]).toBe("[P] Message line 45");
+    expect(rest.logs.split("\n").pop()).toBe("[P] Message line 60");
+  });
+
+  it("returns only newly appended lines when resuming from the end", () => {
+    const logPath = join(tmpDir, "cursor-grow.log");
+    writeFileSync(logPath, LINES.slice(0, 10).join("\n") + "\n", "utf-8");
+    const first = getLogsFromLine(logPath);
+    expect(first.lastLine).toBe(10);
+    expect(getLogsFromLine(logPath, { cursor: first.cursor }).logs).toBe("");
+    appendFileSync(logPath, LINES.slice(10, 12).join("\n") + "\n", "utf-8");
+    const next = getLogsFromLine(logPath, { cursor: first.cursor });
+    expect([next.startLine, next.lastLine]).toEqual([11, 12]);
+    expect(getLogsFromLine(logPath, { last: 1 }).cursor).toBe(next.cursor);
+  });
+
+  it("rejects cursors from other logs, truncated logs and garbage", () => {
+    const cursor = getLogsFromLine(tmpLogPath, { beforeLine: 50 }).cursor;
+    expect(getLogsFromLine(join(tmpDir, "big.log"), { cursor }).error).toMatch(/cursor/);
+    expect(findErrors(tmpLogPath, { cursor: "not-a-cursor" }).error).toMatch(/cursor/);
+    const logPath = join(tmpDir, "cursor-truncate.log");
+    writeFileSync(logPath, LINES.join("\n"), "utf-8");
+    const late = getLogsFromLine(logPath, { afterLine: 90 }).cursor;
+    writeFileSync(logPath, LINES.slice(0, 5).join("\n"), "utf-8");
+    expect(getLogsFromLine(logPath, { cursor: late }).error).toMatch(/cursor/);
+  });
+});
+
+describe("incremental result cache", () => {
+  const line = (i, rest) => `2026-02-03T09:00:${String(i % 60).padStart(2, "0")}.000Z,${i}.000,1000,${i} ${rest}`;
+  const error = (i) => line(i, `[FLog::Error] Workspace.Part${i % 3}.Script:${i % 5}: boom ${i}`);
+  const stack = (i) => [
+    line(i, "[FLog::Output] Stack Begin"),
+    line(i, `[FLog::Output] Script 'Workspace.Gun', Line ${i} - function fire`),
+    line(i, "[FLog::Output] Stack End"),
+  ];
+  let logPath;
+  const write = (lines) => writeFileSync(logPath, lines.join("\n") + "\n", "utf-8");
+  const append = (lines) => appendFileSync(logPath, lines.join("\n") + "\n", "utf-8");
+
+  beforeAll(() => {
+    logPath = join(tmpDir, "cached.log");
+  });
+
+  it("merges appended lines into cached results exactly like a full rescan", () => {
+    clearLogResultCache();
+    write([line(1, "[FLog::Output] hello"), error(2), ...stack(3)]);
+    const queries = [
+      (o) => findErrors(logPath, o),
+      (o) => findErrors(logPath, { ...o, group: true }),
+      (o) => findErrors(logPath, { ...o, byScript: true }),
+      (o) => searchLogsFromLine(logPath, ["boom", "hello"], o),
+    ];
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+
+    // 最后一行是错误，堆栈随后才写入
+    append([error(10)]);
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+    append([...stack(11), line(12, "[FLog::Output] hello again"), error(13)]);
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+  });
+
+  it("reads only the bytes appended since the previous query", () => {
+    clearLogResultCache();
+    write([line(1, `[FLog::Output] ${"header ".repeat(12)}`), line(2, "[FLog::Output] first"), error(3)]);
+    expect(findErrors(logPath, { cache: true }).errorCount).toBe(1);
+
+    // 原地改写已扫描过的行（长度不变，开头不变）：增量查询不会重新读取它
+    const { mtime } = statSync(logPath);
+    writeFileSync(logPath, readFileSync(logPath, "utf-8").replace("[FLog::Output] first", "[FLog::Error]  first"), "utf-8");
+    utimesSync(logPath, mtime, mtime);
+    append([error(4)]);
+    expect(findErrors(logPath, { cache: true }).errorCount).toBe(2);
+    expect(findErrors(logPath).errorCount).toBe(3);
+  });
+
+  it("includes a line still being written like the uncached scan, and caches it once its newline arrives", () => {
+    clearLogResultCache();
+    write([error(1)]);
+    appendFileSync(logPath, error(2), "utf-8");
+    const queries = [(o) => findErrors(logPath, o), (o) => searchLogsFromLine(logPath, ["boom", "hello"], o)];
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+    expect(findErrors(logPath, { cache: true }).errorCount).toBe(2);
+
+    // 末行是普通输出：错误查询的字节预筛排除它，直接返回缓存结果
+    appendFileSync(logPath, "\n" + line(3, "[FLog::Output] partial"), "utf-8");
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+    appendFileSync(logPath, "\n", "utf-8");
+    for (const q of queries) expect(q({ cache: true })).toEqual(q({}));
+  });
+
+  it("drops the cached scan when the log is truncated or replaced", () => {
+    clearLogResultCache();
+    write([error(1), error(2), error(3)]);
+    expect(findErrors(logPath, { cache: true }).errorCount).toBe(3);
+    write([error(4)]);
+    expect(findErrors(logPath, { cache: true }).errors.map((e) => e.line)).toEqual([1]);
+
+    write([error(5), error(6), error(7), line(8, "[FLog::Output] padding so the file grows")]);
+    expect(findErrors(logPath, { cache: true }).errorCount).toBe(3);
+    write([line(9, "[FLog::Output] new session"), error(10), error(11), error(12), error(13)]);
+    expect(findErrors(logPath, { cache: true })).toEqual(findErrors(logPath));
+  });
+});
+
+describe("getLogStats", () => {
+  it("summarises a log in one pass", () => {
+    const stats = getLogStats(tmpLogPath);
+    expect([stats.lines, stats.unparsed, stats.errors, stats.playSessions]).toEqual([100, 0, 2, 1]);
+    expect(stats.bytes).toBe(Buffer.byteLength(SAMPLE_LOG) + 1);
+    expect(stats.categories).toEqual({ "FLog::Output": 97, "FLog::AssetDataModelManager": 2, "FLog::Error": 1 });
+    expect(stats.levels).toEqual({ Info: 99, Warning: 1 });
+    expect(stats.output.lines + stats.filtered.lines).toBe(98);
+    expect([stats.firstTimestamp, stats.lastTimestamp]).toEqual(["2026-02-03T08:00:00.000Z", "2026-02-03T08:01:39.000Z"]);
+    expect(stats.rate.bucketSeconds).toBe(2);
+    expect(stats.rate.buckets.length).toBe(50);
+    expect(stats.rate.buckets[0]).toEqual({ start: "2026-02-03T08:00:00.000Z", lines: 2, perSecond: 1 });
+  });
+
+  it("applies line bounds and counts filtered output", () => {
+    const logPath = join(tmpDir, "stats-filtered.log");
+    writeFileSync(logPath, [LINES[0], LINES[1].replace("Message", "Info: internal"), LINES[2]].join("\n"), "utf-8");
+    const stats = getLogStats(logPath);
+    expect([stats.output.lines, stats.filtered.lines]).toEqual([2, 1]);
+    expect(getLogStats(tmpLogPath, { afterLine: 40, beforeLine: 61 }).lines).toBe(20);
+    expect(getLogStats(join(tmpDir, "missing.log")).lines).toBe(0);
+  });
+
+  it("applies the time window to lines without a timestamp", () => {
+    const logPath = join(tmpDir, "stats-window.log");
+    const at = (s, msg) => `2026-02-03T08:00:${String(s).padStart(2, "0")}.000Z,${s}.000,1000,1 [FLog::Output] ${msg}`;
+    writeFileSync(
+      logPath,
+      [at(1, "before"), "  continuation before", at(5, "inside"), "  continuation inside", at(9, "after"), "  continuation after"].join("\n"),
+      "utf-8",
+    );
+    const window = { startDate: "2026-02-03T08:00:03Z", endDate: "2026-02-03T08:00:07Z" };
+    const stats = getLogStats(logPath, window);
+    expect([stats.lines, stats.unparsed]).toEqual([2, 1]);
+    expect(stats.output.lines).toBe(getLogsFromLine(logPath, window).logs.split("\n").length);
+  });
+});
+
 describe("getLogsFromLine - applyFilter option", () => {
   it("includes system logs when applyFilter is false", () => {
     const logPath = join(tmpDir, "nofilter.log");
@@ -149,6 +392,35 @@ describe("searchLogsFromLine - additional cases", () => {
     expect(result.matchCount).toBeGreaterThan(0);
     expect(result.matchCount).toBeLessThan(100);
   });
+
+  it("searches several patterns in one pass with per-pattern counts and lines", () => {
+    const result = searchLogsFromLine(tmpLogPath, ["line 7$", "test (error|warning)", "99", "line 8\\d$"]);
+    expect(result.patterns).toEqual([
+      { pattern: "line 7$", count: 1, lines: [7] },
+      { pattern: "test (error|warning)", count: 2, lines: [41, 42] },
+      { pattern: "99", count: 1, lines: [99] },
+      { pattern: "line 8\\d$", count: 10, lines: [80, 81, 82, 83, 84, 85, 86, 87, 88, 89] },
+    ]);
+    expect(result.matchCount).toBe(14);
+    expect(result.logs.split("\n").map((l) => parseInt(l, 10))).toEqual([7, 41, 42, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 99]);
+    expect(searchLogsFromLine(tmpLogPath, ["line 7$", "(unclosed"]).error).toMatch(/unclosed/);
+  });
+
+  it("matches the single-pattern results for each pattern and backreferences", () => {
+    const patterns = ["message line 1", "(\\d)\\1$", "LINE 5"];
+    const multi = searchLogsFromLine(tmpLogPath, patterns);
+    patterns.forEach((pattern, k) => {
+      const single = searchLogsFromLine(tmpLogPath, pattern);
+      expect(multi.patterns[k].count).toBe(single.matchCount);
+      expect(multi.patterns[k].lines).toEqual(single.logs.split("\n").map((l) => parseInt(l, 10)));
+    });
+  });
+
+  it("accepts patterns that cannot be combined into one regex (duplicate group names)", () => {
+    const result = searchLogsFromLine(tmpLogPath, ["(?<n>line 7)$", "(?<n>line 9)$"]);
+    expect(result.error).toBeUndefined();
+    expect(result.patterns.map((p) => p.lines)).toEqual([[7], [9]]);
+  });
 });
 
 describe("findErrors - additional cases", () => {
@@ -187,6 +459,45 @@ describe("findErrors - additional cases", () => {
   });
 });
 
+describe("byte-level prefilter", () => {
+  const head = "2026-02-03T08:00:00.000Z,0.5,1000,1";
+  const samples = [
+    `${head} [FLog::Output] kept`,
+    `  ${head} [FLog::Output] leading spaces\r`,
+    `${head},Warning [FLog::Output] warned`,
+    `${head},ERROR  [FLog::Studio] shouted`,
+    `${head},Info [FLog::Error] error category`,
+    `${head},Warnings [FLog::Studio] not a level`,
+    `${head},Wärning [FLog::Studio] non-ASCII level`,
+    `${head} [FLog::OutputX] longer category`,
+    `${head} [FLog::Outp`,
+    `${head} [FLog::日志] custom`,
+    `${head} [DFLog::HttpTraceLight] noise`,
+    "no category at all",
+    "",
+  ];
+
+  it("never rejects a line the full matcher keeps, and skips other categories", () => {
+    const matchers = [{}, { errorsOnly: true }, { categories: ["FLog::日志", "FLog::Output"] }, { categories: [] }];
+    for (const options of matchers) {
+      const match = createLogLineMatcher({ ...options, applyFilter: false });
+      for (const text of samples) {
+        const buf = Buffer.from(`x\n${text}\ny`);
+        const accepted = match.acceptsBytes(buf, 2, buf.length - 2);
+        if (match(text, 1)) expect(accepted, `${JSON.stringify(options)} ${text}`).toBe(true);
+        if (text.includes("HttpTraceLight") && options.categories?.length !== 0) expect(accepted).toBe(false);
+      }
+    }
+  });
+
+  it("gives the same query results as decoding every line", () => {
+    const match = createLogLineMatcher({ errorsOnly: true });
+    const expected = [...readLogLines(tmpLogPath)].filter(({ text, lineNum }) => match(text, lineNum));
+    expect(expected.length).toBeGreaterThan(0);
+    expect(findErrors(tmpLogPath).errors.map((e) => e.line)).toEqual(expected.map((l) => l.lineNum));
+  });
+});
+
 describe("getLogsByDate", () => {
   it("delegates to getLogsFromLine with date params", () => {
     const result = getLogsByDate(tmpLogPath, {
@@ -212,3 +523,288 @@ describe("getLogsByDate", () => {
     expect(result.logs).toBe("");
   });
 });
+
+describe("checkpoint index", () => {
+  let cpLogPath;
+
+  beforeAll(() => {
+    cpLogPath = join(tmpDir, "checkpoints.log");
+    const lines = [];
+    for (let i = 0; i < 2500; i++) {
+      lines.push(`2026-02-03T09:00:00.000Z,${i}.000,1000,${i + 1} [FLog::Output] Checkpoint line ${i + 1}`);
+    }
+    writeFileSync(cpLogPath, lines.join("\n"), "utf-8");
+  });
+
+  it("persists one small record per log under RSPO_STATE_DIR", () => {
+    getLogLastLine(cpLogPath);
+    const dir = join(process.env.RSPO_STATE_DIR, ".rspo_checkpoints");
+    expect(readdirSync(dir).filter((f) => f.startsWith("checkpoints.log"))).toEqual(["checkpoints.log.json"]);
+    expect(loadLogCheckpoints(cpLogPath).lines).toBe(2499);
+  });
+
+  it("rebuilds the index when the log is replaced with longer content at the same path", () => {
+    const logPath = join(tmpDir, "replaced.log");
+    const make = (prefix, total, errorAt) => {
+      const lines = [];
+      for (let i = 1; i <= total; i++) {
+        const level = i === errorAt ? ",Error" : "";
+        lines.push(`2026-02-03T09:00:00.000Z,${i}.000,1000,${i}${level} [FLog::Output] ${prefix} line ${i}`);
+      }
+      return lines.join("\n") + "\n";
+    };
+    writeFileSync(logPath, make("first", 2500, 2200), "utf-8");
+    expect(findErrors(logPath, { afterLine: 2100 }).errors.map((e) => e.line)).toEqual([2200]);
+
+    // 新内容更长，行的长度也不同：沿用旧检查点会让行号错位
+    writeFileSync(logPath, make("second session, longer text", 2600, 2150), "utf-8");
+    expect(findErrors(logPath, { afterLine: 2100 }).errors.map((e) => e.line)).toEqual([2150]);
+    expect(getLogsFromLine(logPath, { afterLine: 2598 }).logs).toBe("second session, longer text line 2599\nsecond session, longer text line 2600");
+    expect(getLogLastLine(logPath)).toBe(2601);
+  });
+
+  it("drops the records of logs removed or archived by cleanOldLogs", () => {
+    const logDir = join(tmpDir, "clean");
+    mkdirSync(logDir, { recursive: true });
+    const oldLog = join(logDir, "old.log");
+    const newLog = join(logDir, "new.log");
+    writeFileSync(oldLog, LINES.slice(0, 10).join("\n") + "\n", "utf-8");
+    writeFileSync(newLog, LINES.slice(0, 10).join("\n") + "\n", "utf-8");
+    utimesSync(oldLog, new Date("2026-01-01T00:00:00Z"), new Date("2026-01-01T00:00:00Z"));
+    getLogLastLine(oldLog);
+    getLogLastLine(newLog);
+
+    const dir = join(process.env.RSPO_STATE_DIR, ".rspo_checkpoints");
+    expect(existsSync(join(dir, "old.log.json"))).toBe(true);
+    expect(cleanOldLogs(7, { logDir })).toBe(1);
+    expect(existsSync(join(dir, "old.log.json"))).toBe(false);
+    expect(existsSync(join(dir, "new.log.json"))).toBe(true);
+  });
+
+  it("records the byte offset of every Nth line while scanning", () => {
+    const rec = loadLogCheckpoints(cpLogPath);
+    for (const line of readLogLines(cpLogPath)) {
+      recordCheckpoint(rec, line);
+    }
+    // 最后一行没有换行，不计入已索引前缀
+    expect(rec.lines).toBe(2499);
+    expect(rec.checkpoints.length).toBe(Math.ceil(2499 / rec.interval));
+
+    const offsets = new Map([...readLogLines(cpLogPath)].map((l) => [l.lineNum, l.offset]));
+    rec.checkpoints.forEach((offset, k) => {
+      expect(offset).toBe(offsets.get(k * rec.interval + 1));
+    });
+  });
+
+  it("seeks to the nearest checkpoint before afterLine", () => {
+    const rec = loadLogCheckpoints(cpLogPath);
+    for (const line of readLogLines(cpLogPath)) {
+      recordCheckpoint(rec, line);
+    }
+    expect(findCheckpoint(rec, null)).toEqual({ startOffset: 0, startLine: 1 });
+    expect(findCheckpoint(rec, 1500).startLine).toBe(rec.interval + 1);
+    expect(findCheckpoint(rec, 5000)).toEqual({ startOffset: rec.offset, startLine: 2500 });
+  });
+
+  it("returns the same lines when seeking via checkpoints", () => {
+    getLogsFromLine(cpLogPath);
+    const result = getLogsFromLine(cpLogPath, { afterLine: 2000, beforeLine: 2004 });
+    expect(result.logs).toBe("Checkpoint line 2001\nCheckpoint line 2002\nCheckpoint line 2003");
+    expect(result.startLine).toBe(2001);
+
+    const errors = findErrors(cpLogPath, { afterLine: 2400 });
+    expect(errors.errorCount).toBe(0);
+  });
+
+  it("reports the last line number like split('\\n') as the log grows", () => {
+    const growPath = join(tmpDir, "grow.log");
+    writeFileSync(growPath, "", "utf-8");
+    let content = "";
+    for (const chunk of ["", "partial", " line\n", "a\nb\n\n", "日志\r\nmore"]) {
+      appendFileSync(growPath, chunk, "utf-8");
+      content += chunk;
+      expect(getLogLastLine(growPath)).toBe(content.split("\n").length);
+    }
+    expect(getLogLastLine(cpLogPath)).toBe(2500);
+    expect(getLogLastLine(join(tmpDir, "missing.log"))).toBe(0);
+  });
+});
+
+describe("time range bisection", () => {
+  let tlLogPath;
+  // 每秒一行，共 3500 行；每 7 行插入一条不在默认类别里的行
+  const ts = (i) => new Date(Date.UTC(2026, 1, 3, 10, 0, 0) + i * 1000).toISOString();
+
+  beforeAll(() => {
+    tlLogPath = join(tmpDir, "timeline.log");
+    const lines = [];
+    for (let i = 0; i < 3500; i++) {
+      const cat = i % 7 === 0 ? "FLog::StudioKeyEvents" : "FLog::Output";
+      lines.push(`${ts(i)},${i}.000,1000,${i + 1} [${cat}] Timeline line ${i + 1}`);
+    }
+    writeFileSync(tlLogPath, lines.join("\n") + "\n", "utf-8");
+  });
+
+  it("skips only whole checkpoint intervals before the start time", () => {
+    expect(findLineBeforeTime(tlLogPath, ts(2500))).toBe(2000);
+    expect(findLineBeforeTime(tlLogPath, ts(2000))).toBe(1000);
+    expect(findLineBeforeTime(tlLogPath, ts(10))).toBe(0);
+    expect(findLineBeforeTime(tlLogPath, ts(9999))).toBe(3000);
+  });
+
+  it("returns the same lines as a full scan", () => {
+    const startDate = ts(2345).slice(0, 19);
+    const endDate = ts(2360).slice(0, 19);
+    const result = getLogsFromLine(tlLogPath, { startDate, endDate });
+    const expected = [];
+    for (let i = 2345; i <= 2360; i++) if (i % 7 !== 0) expected.push(`Timeline line ${i + 1}`);
+    expect(result.logs).toBe(expected.join("\n"));
+    expect(result.startLine).toBe(2347); // 2345 % 7 === 0，第 2346 行不在默认类别中
+    expect(result.hasMore).toBe(false);
+  });
+
+  it("combines with afterLine and date-only end bounds", () => {
+    const result = getLogsFromLine(tlLogPath, { afterLine: 3490, startDate: "2026-02-03", endDate: "2026-02-03" });
+    expect(result.startLine).toBe(3491);
+    expect(result.lastLine).toBe(3500);
+  });
+});
+
+describe("game state index caching", () => {
+  const stateLine = (n, state) =>
+    `2026-02-03T09:00:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${state}`;
+  const outLine = (n, msg) => `2026-02-03T09:00:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n} [FLog::Output] ${msg}`;
+
+  it("records transitions with byte offsets while indexing", () => {
+    const rec = loadLogCheckpoints(tmpLogPath);
+    for (const line of readLogLines(tmpLogPath)) recordCheckpoint(rec, line);
+    expect(rec.transitions.map((t) => [t.line, t.state])).toEqual([[31, "PlayServer"], [61, "Edit"]]);
+    expect(rec.transitions[0].time).toBe("2026-02-03T08:00:30.000Z");
+  });
+
+  it("picks up transitions appended after the last scan, including an unterminated last line", () => {
+    const logPath = join(tmpDir, "states-grow.log");
+    writeFileSync(logPath, [outLine(1, "edit"), stateLine(2, "PlayServer"), outLine(3, "play"), ""].join("\n"), "utf-8");
+    expect(buildGameStateIndex(logPath).map((r) => r.state)).toEqual(["Edit", "PlayServer"]);
+
+    appendFileSync(logPath, stateLine(4, "Edit"));
+    const ranges = buildGameStateIndex(logPath);
+    expect(ranges.map((r) => r.state)).toEqual(["Edit", "PlayServer", "Edit"]);
+    expect(ranges[1]).toEqual({
+      state: "PlayServer",
+      startLine: 2,
+      endLine: 3,
+      startTime: "2026-02-03T09:00:02.000Z",
+      endTime: "2026-02-03T09:00:04.000Z",
+    });
+  });
+
+  it("tags context correctly when the scan starts mid-session", () => {
+    const result = getLogsFromLine(tmpLogPath, { afterLine: 45, beforeLine: 65, includeContext: true });
+    const labels = result.logs.split("\n").map((l) => l.slice(0, 3));
+    expect(labels.slice(0, 14).every((l) => l === "[P]")).toBe(true);
+    expect(labels.slice(-3).every((l) => l === "[E]")).toBe(true);
+  });
+});
+
+describe("play sessions", () => {
+  const stateLine = (n, state) =>
+    `2026-02-03T10:00:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${state}`;
+  const outLine = (n, msg, level = "") => `2026-02-03T10:00:${String(n).padStart(2, "0")}.000Z,${n}.000,1000,${n}${level} [FLog::Output] ${msg}`;
+  const SESSION_LINES = [
+    outLine(1, "before"),
+    stateLine(2, "PlayServer"),
+    outLine(3, "first run"),
+    outLine(4, "first boom", ",Error"),
+    stateLine(5, "PlayClient"),
+    stateLine(6, "Edit"),
+    outLine(7, "edit boom", ",Error"),
+    stateLine(8, "PlayServer"),
+    outLine(9, "second run"),
+    outLine(10, "second boom", ",Error"),
+    outLine(11, "second bang", ",Error"),
+  ];
+
+  it("lists each Edit -> Play -> Edit run with ranges, duration and error count", () => {
+    const logPath = join(tmpDir, "sessions.log");
+    writeFileSync(logPath, SESSION_LINES.join("\n") + "\n", "utf-8");
+    const { sessions } = listPlaySessions(logPath);
+    expect(sessions.map((s) => [s.id, s.startLine, s.endLine, s.errorCount, s.running])).toEqual([
+      [1, 2, 5, 1, false],
+      [2, 8, null, 2, true],
+    ]);
+    expect(sessions[0].states).toEqual(["PlayServer", "PlayClient"]);
+    expect(sessions[0].durationMs).toBe(4000);
+    expect(readFileSync(logPath).subarray(sessions[0].startOffset, sessions[0].endOffset).toString()).toBe(
+      SESSION_LINES.slice(1, 5).join("\n") + "\n",
+    );
+    expect(listPlaySessions(tmpLogPath).sessions.map((s) => [s.startLine, s.endLine, s.errorCount])).toEqual([[31, 60, 2]]);
+    expect(listPlaySessions(join(tmpDir, "missing.log"))).toEqual({ sessions: [] });
+  });
+
+  it("scopes logs and errors to one run by seeking to its start", () => {
+    const logPath = join(tmpDir, "sessions-scope.log");
+    writeFileSync(logPath, SESSION_LINES.join("\n") + "\n", "utf-8");
+
+    const first = resolvePlaySession(logPath, 1);
+    expect(first.beforeLine).toBe(6);
+    const logs = getLogsFromLine(logPath, { cursor: first.cursor, beforeLine: first.beforeLine, includeContext: true });
+    expect(logs.logs).toBe("[P] first run\n[P] first boom");
+
+    const last = resolvePlaySession(logPath, "last");
+    expect(last.session.id).toBe(2);
+    expect(last.beforeLine).toBeNull();
+    expect(findErrors(logPath, { cursor: last.cursor }).errors.map((e) => e.message)).toEqual(["second boom", "second bang"]);
+
+    expect(resolvePlaySession(logPath, 3).error).toMatch(/Unknown session: 3/);
+    expect(resolvePlaySession(join(tmpDir, "missing.log"), "last").error).toMatch(/No play sessions/);
+  });
+});
+
+describe("output shaping", () => {
+  const outLine = (n, msg) =>
+    `2026-02-03T11:00:${String(Math.floor(n / 10)).padStart(2, "0")}.${String(n % 10).padStart(3, "0")}Z,${n}.000,1000,${n} [FLog::Output] ${msg}`;
+  let logPath;
+
+  beforeAll(() => {
+    // Heartbeat 循环中的 print：每 10 行一条不同的事件
+    const lines = [];
+    for (let n = 1; n <= 200; n++) lines.push(outLine(n, n % 10 === 0 ? `event ${n} ${"x".repeat(300)}` : `tick ${n}`));
+    logPath = join(tmpDir, "heartbeat.log");
+    writeFileSync(logPath, lines.join("\n") + "\n", "utf-8");
+  });
+
+  it("collapses runs of near-identical messages", () => {
+    const result = getLogsFromLine(logPath, { collapse: true, beforeLine: 31 });
+    expect(result.logs.split("\n").map((l) => l.slice(0, 40))).toEqual([
+      "tick 1 (x9, lines 1–9)",
+      `event 10 ${"x".repeat(31)}`,
+      "tick 11 (x9, lines 11–19)",
+      `event 20 ${"x".repeat(31)}`,
+      "tick 21 (x9, lines 21–29)",
+      `event 30 ${"x".repeat(31)}`,
+    ]);
+    expect([result.startLine, result.lastLine, result.remaining, result.hasMore]).toEqual([1, 30, 0, false]);
+  });
+
+  it("truncates long messages and fits more distinct lines into the budget", () => {
+    const result = getLogsFromLine(logPath, { collapse: true, maxLineLength: 20 });
+    expect(result.logs.split("\n")[1]).toBe(`event 10 ${"x".repeat(11)}… [+289 chars]`);
+    expect(result.logs.split("\n").length).toBe(40);
+    expect(getLogsFromLine(logPath).logs.split("\n").length).toBe(200);
+  });
+
+  it("samples high-rate messages per second and reports dropped lines", () => {
+    const result = getLogsFromLine(logPath, { sample: 2, maxLineLength: 20 });
+    // 每秒 9 条 tick 只保留 2 条，事件各 1 条
+    expect(result.logs.split("\n").length).toBe(20 * 2 + 20);
+    expect(result.dropped).toBe(200 - 60);
+    expect(result.remaining).toBe(0);
+  });
+
+  it("shapes the last N lines read from the end", () => {
+    const result = getLogsFromLine(logPath, { last: 2, collapse: true, maxLineLength: 10 });
+    expect(result.logs).toBe("tick 191 (x9, lines 191–199)\nevent 200 … [+300 chars]");
+    expect([result.startLine, result.lastLine, result.hasMore]).toEqual([191, 200, true]);
+  });
+});
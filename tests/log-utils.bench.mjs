@@ -0,0 +1,143 @@
+import { bench, describe } from "vitest";
+import { writeFileSync, mkdirSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+import {
+  buildGameStateIndex,
+  getRunContextForLine,
+  getLogsFromLine,
+  parseLogLine,
+  locateLogCategory,
+  hasLogCategory,
+  parseLogLineAt,
+  compileSearchPattern,
+} from "../src/log-utils.mjs";
+
+// 模拟频繁开始/停止游戏的会话：数千次 Edit → PlayServer → PlayClient → Edit 切换
+const TOTAL_LINES = 200_000;
+const SESSIONS = 1500;
+const STATES = ["PlayServer", "PlayClient", "Edit"];
+
+const tmpDir = join(tmpdir(), "rspo-log-utils-bench");
+mkdirSync(tmpDir, { recursive: true });
+const logPath = join(tmpDir, "transitions.log");
+
+const lines = [];
+const step = Math.floor(TOTAL_LINES / (SESSIONS * STATES.length));
+for (let i = 0; i < TOTAL_LINES; i++) {
+  const ts = `2026-02-03T08:00:00.${String(i % 1000).padStart(3, "0")}Z,${i}.000,1000,${i + 1}`;
+  if (i > 0 && i % step === 0) {
+    const state = STATES[(i / step - 1) % STATES.length];
+    lines.push(`${ts} [FLog::AssetDataModelManager] Setting StudioGameStateType to StudioGameStateType_${state}`);
+  } else {
+    lines.push(`${ts} [FLog::Output] print ${i + 1}`);
+  }
+}
+writeFileSync(logPath, lines.join("\n"), "utf-8");
+
+const ranges = buildGameStateIndex(logPath);
+
+// 旧实现：对每一行线性遍历全部区间
+function getRunContextLinear(lineNum, stateRanges) {
+  for (const r of stateRanges) {
+    if (r.startLine <= lineNum && (r.endLine === -1 || lineNum <= r.endLine)) {
+      const state = r.state.toLowerCase();
+      if (state.includes("server") || state.includes("client")) return "play";
+      if (state.includes("edit")) return "edit";
+    }
+  }
+  return "unknown";
+}
+
+describe(`run-context tagging (${TOTAL_LINES} lines, ${ranges.length} ranges)`, () => {
+  bench("linear scan (previous)", () => {
+    for (let line = 1; line <= TOTAL_LINES; line++) getRunContextLinear(line, ranges);
+  }, { iterations: 3 });
+
+  bench("binary search", () => {
+    for (let line = 1; line <= TOTAL_LINES; line++) getRunContextForLine(line, ranges);
+  });
+});
+
+describe("getLogsFromLine with includeContext", () => {
+  bench("full log", () => {
+    getLogsFromLine(logPath, { includeContext: true });
+  });
+});
+
+// 旧实现：每行执行正则并构造完整对象
+const LOG_LINE_RE =
+  /^(\d{4}-\d{2}-\d{2}T[\d:.]+Z),[\d.]+,[a-f0-9]+,\d+(?:,(\w+))?\s*\[([^\]]+)\]\s*(.*)$/;
+
+function parseLogLineRegex(line, lineNum = 0) {
+  const m = LOG_LINE_RE.exec(line);
+  if (!m) return null;
+  return {
+    timestamp: m[1],
+    level: m[2] || "Info",
+    category: m[3],
+    message: m[4],
+    raw: line,
+    lineNum,
+    runContext: "unknown",
+  };
+}
+
+// 典型 Studio 日志：大部分行属于非默认类别，会在类别判断处被丢弃
+const CATEGORIES = ["FLog::Output", "FLog::Warning", "FLog::Error"];
+const NOISE = ["FLog::StudioKeyEvents", "DFLog::HttpTraceLight", "FLog::RobloxIDEDoc", "FLog::AssetDataModelManager"];
+const mixedLines = [];
+for (let i = 0; i < TOTAL_LINES; i++) {
+  const ts = `2026-02-03T08:00:00.${String(i % 1000).padStart(3, "0")}Z,${i}.125000,1996c,${i % 12}`;
+  const cat = i % 5 === 0 ? "FLog::Output" : NOISE[i % NOISE.length];
+  // 与从文件解码出的行一样使用扁平字符串
+  const line = `${ts}${i % 50 === 0 ? ",Warning" : ""} [${cat}] message number ${i} with some payload text`;
+  mixedLines.push(Buffer.from(line).toString());
+}
+
+describe(`log line parsing (${TOTAL_LINES} lines, 20% kept by category)`, () => {
+  bench("regex + full object (previous)", () => {
+    for (let i = 0; i < mixedLines.length; i++) {
+      const entry = parseLogLineRegex(mixedLines[i], i + 1);
+      if (!entry || !CATEGORIES.includes(entry.category)) continue;
+    }
+  });
+
+  bench("positional parseLogLine", () => {
+    for (let i = 0; i < mixedLines.length; i++) {
+      const entry = parseLogLine(mixedLines[i], i + 1);
+      if (!entry || !CATEGORIES.includes(entry.category)) continue;
+    }
+  });
+
+  bench("category first, parse kept lines only", () => {
+    for (let i = 0; i < mixedLines.length; i++) {
+      const line = mixedLines[i];
+      const catStart = locateLogCategory(line);
+      if (catStart === -1 || !hasLogCategory(line, catStart, CATEGORIES)) continue;
+      parseLogLineAt(line, catStart, i + 1);
+    }
+  });
+});
+
+// 搜索模式匹配：只有没有大小写之分的字面量走 includes，含字母的字面量仍用 /i 正则
+const messages = mixedLines.map((line) => parseLogLine(line).message);
+for (const pattern of ["1234", "payload"]) {
+  describe(`search pattern "${pattern}" (${messages.length} messages)`, () => {
+    const regex = new RegExp(pattern, "i");
+    const lower = pattern.toLowerCase();
+    const matcher = compileSearchPattern(pattern);
+
+    bench("regex /i", () => {
+      for (const message of messages) regex.test(message);
+    });
+
+    bench("toLowerCase + includes", () => {
+      for (const message of messages) message.toLowerCase().includes(lower);
+    });
+
+    bench("compileSearchPattern", () => {
+      for (const message of messages) matcher.test(message);
+    });
+  });
+}
@@ -4,14 +4,22 @@ import { join } from "node:path";
 import { tmpdir } from "node:os";
 import {
   parseLogLine,
+  locateLogCategory,
+  hasLogCategory,
+  parseLogLineAt,
+  isErrorLogLine,
   parseTimestamp,
   isTimestampInRange,
+  compileTimeRange,
+  timeRangePosition,
   isErrorLog,
   buildGameStateIndex,
   getRunContextForLine,
   getLogsFromLine,
   searchLogsFromLine,
   findErrors,
+  errorSignature,
+  parseStackFrame,
 } from "../src/log-utils.mjs";
 
 // Sample log content for testing
@@ -75,6 +83,63 @@ describe("parseLogLine", () => {
   });
 });
 
+describe("positional log line parser", () => {
+  // 与旧的正则实现逐行对照
+  const LOG_LINE_RE = /^(\d{4}-\d{2}-\d{2}T[\d:.]+Z),[\d.]+,[a-f0-9]+,\d+(?:,(\w+))?\s*\[([^\]]+)\]\s*(.*)$/;
+  const cases = [
+    ...SAMPLE_LOG.split("\n"),
+    "2026-02-03T08:52:02.095Z,128.095795,1996c,12 [FLog::Output]",
+    "2026-02-03T08:52:02.095Z,128.095795,1996c,12[FLog::Output]   spaced  ",
+    "2026-02-03T08:52:02.095Z,128.095795,1996c,12,Error\t[DFLog::HttpTraceError] [nested] brackets",
+    "2026-02-03T08:52:02.095Z,128.095795,1996c,12, [FLog::Output] empty level",
+    "2026-02-03T08:52:02.095Z,128.095795,1996C,12 [FLog::Output] upper-case thread",
+    "2026-02-03T08:52:02.095Z,128.095795,1996c,12 [] empty category",
+    "2026-02-03T08:52:02.095Z,,1996c,12 [FLog::Output] missing seconds",
+    "2026-02-03 08:52:02.095Z,1.0,1,1 [FLog::Output] space separator",
+    "2026-02-03T08:52:02.095,1.0,1,1 [FLog::Output] no Z",
+    "2026-02-03T08:52:02.095Z,1.0,1,1 [FLog::Output",
+    "plain text",
+    "",
+  ];
+
+  it("matches the regex parser field by field", () => {
+    for (const line of cases) {
+      const m = LOG_LINE_RE.exec(line);
+      const entry = parseLogLine(line, 7);
+      if (!m) {
+        expect(entry, line).toBeNull();
+        continue;
+      }
+      expect(entry, line).toEqual({
+        timestamp: m[1],
+        level: m[2] || "Info",
+        category: m[3],
+        message: m[4],
+        raw: line,
+        lineNum: 7,
+        runContext: "unknown",
+      });
+    }
+  });
+
+  it("checks categories before parsing the header", () => {
+    const line = "2026-02-03T08:52:02.095Z,1.0,1,1 [FLog::Output] hi";
+    const catStart = locateLogCategory(line);
+    expect(line.slice(catStart)).toBe("FLog::Output] hi");
+    expect(hasLogCategory(line, catStart, ["FLog::Error", "FLog::Output"])).toBe(true);
+    expect(hasLogCategory(line, catStart, ["FLog::Out", "FLog::Output2"])).toBe(false);
+    expect(parseLogLineAt(line, catStart, 3).message).toBe("hi");
+    expect(locateLogCategory("no category")).toBe(-1);
+  });
+
+  it("agrees with isErrorLog", () => {
+    for (const line of cases) {
+      const entry = parseLogLine(line);
+      if (entry) expect(isErrorLogLine(line, locateLogCategory(line)), line).toBe(isErrorLog(entry));
+    }
+  });
+});
+
 describe("parseTimestamp", () => {
   it("parses ISO with milliseconds", () => {
     const ts = parseTimestamp("2026-02-03T08:52:02.095Z");
@@ -131,6 +196,26 @@ describe("isTimestampInRange", () => {
   });
 });
 
+describe("compileTimeRange", () => {
+  it("normalizes bounds to ISO strings once", () => {
+    expect(compileTimeRange()).toBeNull();
+    expect(compileTimeRange("2026-02-03T12:00:00", "2026-02-03")).toEqual({
+      start: "2026-02-03T12:00:00.000Z",
+      end: "2026-02-03T23:59:59.999Z",
+    });
+    expect(compileTimeRange("garbage", null)).toEqual({ start: null, end: null });
+  });
+
+  it("positions timestamps relative to the window", () => {
+    const range = compileTimeRange("2026-02-03T12:00:00", "2026-02-03T13:00:00");
+    expect(timeRangePosition("2026-02-03T11:59:59.999Z", range)).toBe(-1);
+    expect(timeRangePosition("2026-02-03T12:30:00.000Z", range)).toBe(0);
+    expect(timeRangePosition("2026-02-03T12:30:00Z", range)).toBe(0);
+    expect(timeRangePosition("2026-02-03T13:00:00.001Z", range)).toBe(1);
+    expect(timeRangePosition("not a time", range)).toBe(-1);
+  });
+});
+
 describe("isErrorLog", () => {
   it("detects Warning level", () => {
     expect(isErrorLog({ level: "Warning", category: "FLog::Output" })).toBe(true);
@@ -181,6 +266,10 @@ describe("getRunContextForLine", () => {
     // Line 14 is in Edit range
     expect(getRunContextForLine(14, ranges)).toBe("edit");
   });
+
+  it("returns unknown for empty ranges", () => {
+    expect(getRunContextForLine(10, [])).toBe("unknown");
+  });
 });
 
 describe("getLogsFromLine", () => {
@@ -227,6 +316,14 @@ describe("getLogsFromLine", () => {
     expect(result.logs).toMatch(/\[\d{2}:\d{2}:\d{2}\]/);
   });
 
+  it("reports filter rule hits with filterStats", () => {
+    const result = getLogsFromLine(tmpLogPath, { filterStats: true });
+    const byPattern = Object.fromEntries(result.filterStats.map((s) => [s.pattern, s.hits]));
+    expect(byPattern["Info:"]).toBe(1);
+    expect(byPattern["Flag "]).toBe(1);
+    expect(getLogsFromLine(tmpLogPath).filterStats).toBeUndefined();
+  });
+
   it("returns empty for non-existent file", () => {
     const result = getLogsFromLine("/nonexistent.log");
     expect(result.logs).toBe("");
@@ -257,6 +354,14 @@ describe("findErrors", () => {
     expect(categories).toContain("FLog::Error");
   });
 
+  it("labels every error with its run context even without a runContext filter", () => {
+    const result = findErrors(tmpLogPath);
+    const runtime = result.errors.find((e) => e.message === "Runtime error in script");
+    expect(runtime.line).toBe(9);
+    expect(runtime.context).toBe("play");
+    expect(result.errors.every((e) => e.context === "play" || e.context === "edit")).toBe(true);
+  });
+
   it("respects maxErrors", () => {
     const result = findErrors(tmpLogPath, { maxErrors: 1 });
     expect(result.errors.length).toBeLessThanOrEqual(1);
@@ -268,3 +373,108 @@ describe("findErrors", () => {
     expect(result.errors).toEqual([]);
   });
 });
+
+describe("errorSignature", () => {
+  it("strips numbers, instance paths and GUIDs", () => {
+    expect(errorSignature("Workspace.Enemies.Zombie12.AI:57: attempt to index nil with 'Humanoid'")).toBe(
+      "<path>:#: attempt to index nil with 'Humanoid'",
+    );
+    expect(errorSignature("Asset {0f8fad5b-d9cb-469f-a165-70867728950e} failed after 3.5s (0x7ff3a2)")).toBe(
+      "Asset <guid> failed after #s (<hex>)",
+    );
+    expect(errorSignature("Infinite yield possible on 'Players.Player1.PlayerGui:WaitForChild(\"Hud\")'")).toBe(
+      errorSignature("Infinite yield possible on 'Players.Player2.PlayerGui:WaitForChild(\"Hud\")'"),
+    );
+  });
+});
+
+describe("findErrors - group option", () => {
+  it("groups repeated errors by signature, most frequent first", () => {
+    const logPath = join(tmpdir(), "roblox-studio-tools-test", "grouped.log");
+    const lines = [];
+    for (let i = 1; i <= 50; i++) {
+      const message =
+        i % 10 === 0
+          ? `[FLog::Error] DataStore request ${i} was throttled`
+          : `[FLog::Error] Workspace.Part${i}.Script:${i}: attempt to index nil`;
+      lines.push(`2026-02-03T08:52:${String(i).padStart(2, "0")}.000Z,${i}.000,1000,${i} ${message}`);
+    }
+    lines.push("2026-02-03T08:53:00.000Z,60.000,1000,51 [FLog::Warning] Rare warning");
+    writeFileSync(logPath, lines.join("\n"), "utf-8");
+
+    const result = findErrors(logPath, { group: true });
+    expect([result.errorCount, result.groupCount, result.hasMore]).toEqual([51, 3, false]);
+    expect(result.groups.map(({ signature, count, firstLine, lastLine }) => [signature, count, firstLine, lastLine])).toEqual([
+      ["<path>:#: attempt to index nil", 45, 1, 49],
+      ["DataStore request # was throttled", 5, 10, 50],
+      ["Rare warning", 1, 51, 51],
+    ]);
+    expect(result.groups[0].sample.message).toBe("Workspace.Part1.Script:1: attempt to index nil");
+
+    const limited = findErrors(logPath, { group: true, maxErrors: 2 });
+    expect([limited.groups.length, limited.groupCount, limited.hasMore]).toEqual([2, 3, true]);
+  });
+});
+
+describe("Lua stack traces", () => {
+  const ts = (i) => `2026-02-03T08:53:${String(i).padStart(2, "0")}.000Z,${i}.000,1000,${i}`;
+  let logPath;
+
+  beforeAll(() => {
+    logPath = join(tmpdir(), "roblox-studio-tools-test", "stacks.log");
+    const messages = [
+      ",Error [FLog::Output] ServerScriptService.Main:27: attempt to index nil with 'Position'",
+      " [FLog::Output] Stack Begin",
+      " [FLog::Output] Script 'ServerScriptService.Main', Line 27 - function move",
+      " [FLog::Output] Script 'ServerScriptService.Main', Line 40",
+      " [FLog::Output] Stack End",
+      ",Warning [FLog::Output] Infinite yield possible on 'ReplicatedStorage:WaitForChild(\"Remotes\")'",
+      ",Error [FLog::Output] Stack Begin",
+      ",Error [FLog::Output] Script 'StarterPlayer.StarterPlayerScripts.Client', Line 5",
+      ",Error [FLog::Output] Stack End",
+      " [FLog::Output] Hello",
+      ",Error [FLog::Output] ServerScriptService.Main:27: attempt to index nil with 'Position'",
+      " [FLog::Output] Stack Begin",
+      " [FLog::Output] Script 'ServerScriptService.Main', Line 27 - function move",
+      " [FLog::Output] Stack End",
+      ",Error [FLog::Output] Workspace.Door.Script:3: bad argument",
+    ];
+    writeFileSync(logPath, messages.map((m, i) => ts(i + 1) + m).join("\n"), "utf-8");
+  });
+
+  it("parses stack frames", () => {
+    expect(parseStackFrame("Script 'Workspace.Model.Script', Line 12 - function onTouched")).toEqual({
+      script: "Workspace.Model.Script",
+      line: 12,
+      function: "onTouched",
+    });
+    expect(parseStackFrame("Script 'Workspace.Script', Line 3")).toEqual({ script: "Workspace.Script", line: 3 });
+    expect(parseStackFrame("Stack Begin")).toBeNull();
+  });
+
+  it("attaches frames to the preceding error and never reports stack lines as errors", () => {
+    const { errors } = findErrors(logPath);
+    expect(errors.map((e) => e.line)).toEqual([1, 6, 11, 15]);
+    expect(errors[0].stack).toEqual([
+      { script: "ServerScriptService.Main", line: 27, function: "move" },
+      { script: "ServerScriptService.Main", line: 40 },
+    ]);
+    expect(errors[1].stack).toEqual([{ script: "StarterPlayer.StarterPlayerScripts.Client", line: 5 }]);
+    expect(errors[3].stack).toBeUndefined();
+  });
+
+  it("indexes errors per script and line", () => {
+    const result = findErrors(logPath, { byScript: true });
+    expect([result.errorCount, result.scriptCount, result.unattributed]).toEqual([4, 3, 0]);
+    expect(result.scripts[0]).toEqual({
+      script: "ServerScriptService.Main",
+      count: 2,
+      lines: [{ line: 27, count: 2, firstLogLine: 1, lastLogLine: 11, message: "ServerScriptService.Main:27: attempt to index nil with 'Position'" }],
+    });
+    expect(result.scripts.map((s) => s.script)).toEqual([
+      "ServerScriptService.Main",
+      "StarterPlayer.StarterPlayerScripts.Client",
+      "Workspace.Door.Script",
+    ]);
+  });
+});
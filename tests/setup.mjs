@@ -0,0 +1,14 @@
+import { beforeEach, afterAll } from "vitest";
+import { mkdirSync, rmSync } from "node:fs";
+import { join } from "node:path";
+import { tmpdir } from "node:os";
+
+// 检查点、倒排索引、命名游标等派生数据写到临时目录，不写入真实的 Roblox 日志目录
+const stateDir = join(tmpdir(), `rspo-test-state-${process.pid}-${Date.now()}`);
+beforeEach(() => {
+  mkdirSync(stateDir, { recursive: true });
+  process.env.RSPO_STATE_DIR = stateDir;
+});
+afterAll(() => {
+  rmSync(stateDir, { recursive: true, force: true });
+});
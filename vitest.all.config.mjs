@@ -3,6 +3,7 @@ import { defineConfig } from "vitest/config";
 export default defineConfig({
   test: {
     include: ["tests/**/*.test.mjs"],
+    setupFiles: ["tests/setup.mjs"],
     testTimeout: 30000,
   },
 });
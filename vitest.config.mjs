@@ -4,6 +4,7 @@ export default defineConfig({
   test: {
     include: ["tests/**/*.test.mjs"],
     exclude: ["tests/**/*.native.test.mjs"],
+    setupFiles: ["tests/setup.mjs"],
     testTimeout: 30000,
   },
 });